@@ -0,0 +1,110 @@
+import argparse
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+import time
+
+from ..models.simulate_bracket import (
+    build_bracket,
+    build_probability_matrix,
+    simulate_tournaments,
+)
+
+REGIONS = ["W", "X", "Y", "Z"]
+PLAY_IN_SEEDS = ["W16", "X11", "Y16", "Z11"]
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the bracket simulator")
+    parser.add_argument(
+        "--n-sims", type=int, default=1000000, help="The number of tournaments"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=100000, help="Tournaments per batch"
+    )
+    parser.add_argument("--n-jobs", type=int, default=1, help="Worker processes")
+    return parser.parse_args()
+
+
+def make_bracket(seed=0):
+    """
+    Create a synthetic 68-team bracket in Kaggle's seeds and slots layout, with predictions.
+
+    Args:
+        seed (int, optional): Seed for the random number generator. Default is 0.
+
+    Returns:
+        tuple: Seeds (Seed, TeamID), slots (Slot, StrongSeed, WeakSeed) and
+            predictions (ID, Pred) for every pair of teams, with Pred the probability
+            that T1 wins, as predict_matchups writes it.
+    """
+    rng = np.random.default_rng(seed)
+
+    seed_labels = []
+    for region in REGIONS:
+        for s in range(1, 17):
+            label = f"{region}{s:02d}"
+            if label in PLAY_IN_SEEDS:
+                seed_labels += [label + "a", label + "b"]
+            else:
+                seed_labels.append(label)
+    team_ids = rng.choice(np.arange(1101, 1500), len(seed_labels), replace=False)
+    seeds = pd.DataFrame({"Seed": seed_labels, "TeamID": team_ids})
+
+    slots = [(label, label + "a", label + "b") for label in PLAY_IN_SEEDS]
+    for region in REGIONS:
+        for s in range(1, 9):
+            slots.append(
+                (f"R1{region}{s}", f"{region}{s:02d}", f"{region}{17 - s:02d}")
+            )
+        for s in range(1, 5):
+            slots.append((f"R2{region}{s}", f"R1{region}{s}", f"R1{region}{9 - s}"))
+        for s in range(1, 3):
+            slots.append((f"R3{region}{s}", f"R2{region}{s}", f"R2{region}{5 - s}"))
+        slots.append((f"R4{region}1", f"R3{region}1", f"R3{region}2"))
+    slots += [
+        ("R5WX", "R4W1", "R4X1"),
+        ("R5YZ", "R4Y1", "R4Z1"),
+        ("R6CH", "R5WX", "R5YZ"),
+    ]
+    slots = pd.DataFrame(slots, columns=["Slot", "StrongSeed", "WeakSeed"])
+
+    # Team strengths give spreads, and a normal CDF gives probabilities
+    ordered = np.sort(team_ids)
+    strength = dict(zip(ordered, rng.normal(scale=8, size=len(ordered))))
+    t1, t2 = np.triu_indices(len(ordered), k=1)
+    spreads = np.array(
+        [strength[a] - strength[b] for a, b in zip(ordered[t1], ordered[t2])]
+    )
+    predictions = pd.DataFrame(
+        {
+            "ID": [f"2025_{a}_{b}" for a, b in zip(ordered[t1], ordered[t2])],
+            "Pred": norm.cdf(spreads / 11),
+        }
+    )
+
+    return seeds, slots, predictions
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    seeds, slots, predictions = make_bracket()
+
+    bracket = build_bracket(seeds, slots)
+    P = build_probability_matrix(predictions, bracket["team_ids"])
+
+    start = time.perf_counter()
+    advancement = simulate_tournaments(
+        bracket, P, args.n_sims, batch_size=args.batch_size, n_jobs=args.n_jobs
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.n_sims} tournaments in {elapsed:.1f}s ({args.n_jobs} workers)")
+    print(f"Champion probabilities sum to {advancement['R6'].sum():.4f}")
+    print(advancement.sort_values("R6", ascending=False).head(8).to_string(index=False))
@@ -0,0 +1,84 @@
+import argparse
+import numpy as np
+import time
+
+from ..models.train_model import train_and_evaluate_models
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark serial against parallel cross-validation"
+    )
+    parser.add_argument(
+        "--rows", type=int, default=20000, help="The number of training rows"
+    )
+    parser.add_argument(
+        "--repeat-cv", type=int, default=3, help="Cross-validation repeats"
+    )
+    parser.add_argument("--n-jobs", type=int, default=3, help="Worker processes")
+    parser.add_argument(
+        "--threads-per-worker", type=int, default=1, help="XGBoost threads per worker"
+    )
+    return parser.parse_args()
+
+
+def make_training_matrix(n_rows, n_features=42, seed=0):
+    """
+    Create a synthetic feature matrix and point spreads with a known linear signal.
+
+    Args:
+        n_rows (int): The number of rows to generate.
+        n_features (int, optional): The number of features. Default is 42.
+        seed (int, optional): Seed for the random number generator. Default is 0.
+
+    Returns:
+        tuple: A tuple containing features (X) and target variable (y).
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    y = X[:, :5].sum(axis=1) * 4 + rng.normal(scale=10, size=n_rows)
+    return X, np.round(y)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    X, y = make_training_matrix(args.rows)
+
+    param = {
+        "eval_metric": "mae",
+        "booster": "gbtree",
+        "eta": 0.05,
+        "subsample": 0.35,
+        "colsample_bytree": 0.7,
+        "num_parallel_tree": 3,
+        "min_child_weight": 40,
+        "gamma": 10,
+        "max_depth": 3,
+        "nthread": args.threads_per_worker,
+    }
+
+    start = time.perf_counter()
+    serial_results = train_and_evaluate_models(X, y, param, repeat_cv=args.repeat_cv)
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel_results = train_and_evaluate_models(
+        X,
+        y,
+        param,
+        repeat_cv=args.repeat_cv,
+        n_jobs=args.n_jobs,
+        threads_per_worker=args.threads_per_worker,
+    )
+    parallel_time = time.perf_counter() - start
+
+    print(f"Serial:   {serial_time:.1f}s")
+    print(f"Parallel: {parallel_time:.1f}s ({args.n_jobs} workers)")
+    print(f"Speedup:  {serial_time / parallel_time:.2f}x")
+    print(f"Identical results: {serial_results == parallel_results}")
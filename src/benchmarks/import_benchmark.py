@@ -0,0 +1,169 @@
+import argparse
+import subprocess
+import sys
+
+from ..cli import COMMANDS
+
+# Import time budget in seconds for each liddar command, and modules it must not
+# import before it has parsed its arguments
+IMPORT_BUDGETS = {
+    "ingest": (1.0, ["sportsdataverse", "kaggle", "xgboost", "scipy"]),
+    "build-features": (1.0, ["xgboost", "scipy"]),
+    "train": (4.0, []),
+    "predict": (1.0, ["xgboost", "scipy", "sklearn"]),
+    "simulate": (1.0, ["xgboost", "scipy.stats"]),
+    "pipeline": (1.0, ["xgboost", "scipy"]),
+}
+
+# Import time budget in seconds for a real run of a command, which also imports
+# the modules it defers until it does its work, e.g. xgboost once games are scored
+RUN_IMPORT_BUDGETS = {
+    "predict": (2.5, ["xgboost", "scipy.interpolate"]),
+}
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Check each liddar command's imports against its budget"
+    )
+    parser.add_argument(
+        "commands",
+        nargs="*",
+        default=list(IMPORT_BUDGETS),
+        help="The commands to check. Default is every command",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per command; the fastest is compared to the budget",
+    )
+    parser.add_argument(
+        "--top", type=int, default=5, help="The slowest imports to list per command"
+    )
+    return parser.parse_args()
+
+
+def measure_imports(command, deferred=None):
+    """
+    Import a liddar command's module with python -X importtime.
+
+    By default the command is run with --help, so it imports its module and exits
+    after parsing its arguments without touching the database. When deferred is
+    given, the command's module is imported together with those modules instead,
+    as a real run imports them once it starts its work.
+
+    Args:
+        command (str): A liddar subcommand.
+        deferred (list, optional): Modules the command imports when it does its work.
+
+    Returns:
+        dict: Cumulative import time in seconds of every imported module, by name.
+    """
+    if deferred is None:
+        python_args = ["-m", "src.cli", command, "--help"]
+    else:
+        modules = ["src.cli", "src.utils", COMMANDS[command][0]] + deferred
+        python_args = ["-c", "; ".join(f"import {module}" for module in modules)]
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + python_args,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing liddar {command} failed:\n{result.stderr}")
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented below the one that imported them
+        imports[name[1:].rstrip()] = int(cumulative) / 1e6
+    return imports
+
+
+def check_command(command, repeat=3, top=5):
+    """
+    Check one command's fastest import time and imported modules against its budget.
+
+    The command's real run is also checked against RUN_IMPORT_BUDGETS, if it has one.
+
+    Args:
+        command (str): A liddar subcommand.
+        repeat (int, optional): Runs of the command. Default is 3.
+        top (int, optional): The slowest top-level imports to print. Default is 5.
+
+    Returns:
+        bool: True if the command is within its budgets.
+    """
+    budget, forbidden = IMPORT_BUDGETS[command]
+    passed = check_imports(command, budget, forbidden, repeat=repeat, top=top)
+    if command in RUN_IMPORT_BUDGETS:
+        budget, deferred = RUN_IMPORT_BUDGETS[command]
+        passed &= check_imports(
+            command, budget, deferred=deferred, repeat=repeat, top=top
+        )
+    return passed
+
+
+def check_imports(command, budget, forbidden=(), deferred=None, repeat=3, top=5):
+    """
+    Check the fastest of several import measurements of a command against a budget.
+
+    Args:
+        command (str): A liddar subcommand.
+        budget (float): The import time budget in seconds.
+        forbidden (list, optional): Modules the command must not import.
+        deferred (list, optional): Modules the command imports when it does its work.
+            Default is None, which measures the command's --help.
+        repeat (int, optional): Runs of the command. Default is 3.
+        top (int, optional): The slowest top-level imports to print. Default is 5.
+
+    Returns:
+        bool: True if the command is within the budget.
+    """
+    # Top-level imports are the unindented names; their cumulative times add up
+    runs = [measure_imports(command, deferred) for _ in range(repeat)]
+    totals = [
+        sum(t for name, t in imports.items() if not name.startswith(" "))
+        for imports in runs
+    ]
+    imports = runs[totals.index(min(totals))]
+    modules = {name.strip() for name in imports}
+    imported = [
+        module
+        for module in forbidden
+        if module in modules or any(m.startswith(module + ".") for m in modules)
+    ]
+
+    passed = min(totals) <= budget and not imported
+    label = "--help" if deferred is None else "run"
+    print(
+        f"liddar {command} {label}: {min(totals):.3f}s of imports"
+        f" (budget {budget:.1f}s) {'ok' if passed else 'FAILED'}"
+    )
+    slowest = sorted(
+        ((t, name) for name, t in imports.items() if not name.startswith(" ")),
+        reverse=True,
+    )
+    for t, name in slowest[:top]:
+        print(f"    {t:.3f}s {name}")
+    if imported:
+        print(f"    imports {', '.join(imported)}, which it should defer")
+    return passed
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    results = [check_command(c, args.repeat, args.top) for c in args.commands]
+    if not all(results):
+        sys.exit(1)
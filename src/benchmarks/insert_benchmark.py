@@ -0,0 +1,139 @@
+import argparse
+from dotenv import load_dotenv
+import numpy as np
+import pandas as pd
+from psycopg2.extensions import register_adapter, AsIs
+import time
+
+from ..utils import copy_dataframe, execute_sql_query, insert_dataframe, load_config
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark DataFrame loading paths")
+    parser.add_argument(
+        "--rows", type=int, default=20000, help="The number of rows to load"
+    )
+    parser.add_argument(
+        "--csv",
+        type=str,
+        default=None,
+        help="Optional Kaggle boxscore CSV to load instead of synthetic rows",
+    )
+    return parser.parse_args()
+
+
+def make_boxscore_frame(n_rows, seed=0):
+    """
+    Create a synthetic DataFrame shaped like MRegularSeasonDetailedResults.csv.
+
+    Args:
+        n_rows (int): The number of rows to generate.
+        seed (int, optional): Seed for the random number generator. Default is 0.
+
+    Returns:
+        pandas.DataFrame: A DataFrame with the boxscores_kaggle columns.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "Season": rng.integers(2003, 2025, n_rows),
+            "DayNum": rng.integers(0, 133, n_rows),
+            "WTeamID": rng.integers(1101, 1480, n_rows),
+            "WScore": rng.integers(60, 100, n_rows),
+            "LTeamID": rng.integers(1101, 1480, n_rows),
+            "LScore": rng.integers(40, 60, n_rows),
+            "WLoc": rng.choice(["H", "A", "N"], n_rows),
+            "NumOT": rng.integers(0, 2, n_rows),
+        }
+    )
+    for side in ["W", "L"]:
+        for stat in [
+            "FGM",
+            "FGA",
+            "FGM3",
+            "FGA3",
+            "FTM",
+            "FTA",
+            "OR",
+            "DR",
+            "Ast",
+            "TO",
+            "Stl",
+            "Blk",
+            "PF",
+        ]:
+            df[side + stat] = rng.integers(0, 60, n_rows)
+    return df
+
+
+def time_load(load_function, df, table_name, config):
+    """
+    Time a single load of a DataFrame into an empty table.
+
+    Args:
+        load_function (callable): Either insert_dataframe or copy_dataframe.
+        df (pandas.DataFrame): The DataFrame to be loaded.
+        table_name (str): The name of the table to load the data into.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+
+    Returns:
+        float: The load rate in rows per second.
+
+    Raises:
+        RuntimeError: If the table does not hold every row afterwards, as the load
+            functions print their errors instead of raising them.
+    """
+    execute_sql_query(**config, query=f"TRUNCATE {table_name}")
+    start = time.perf_counter()
+    load_function(df, table_name, config)
+    elapsed = time.perf_counter() - start
+
+    results = execute_sql_query(**config, query=f"SELECT COUNT(*) FROM {table_name}")
+    loaded = results[0][0] if results else 0
+    if loaded != len(df):
+        raise RuntimeError(
+            f"{load_function.__name__} loaded {loaded} of {len(df)} rows into {table_name}"
+        )
+    return len(df) / elapsed
+
+
+if __name__ == "__main__":
+    # Load up args, configs, environment vars
+    args = parse_arguments()
+    load_dotenv()
+    config = load_config()
+
+    # Adapt pandas NAs to postgres NULLs for the row-by-row path
+    register_adapter(pd._libs.missing.NAType, lambda i: AsIs("NULL"))
+
+    if args.csv:
+        df = pd.read_csv(args.csv).head(args.rows)
+    else:
+        df = make_boxscore_frame(args.rows)
+
+    # Scratch table with the same layout as boxscores_kaggle
+    from ..data.initialize_datasets import create_kaggle_boxscore_table
+
+    create_kaggle_boxscore_table(config)
+    table_name = "benchmark_boxscores_kaggle"
+    execute_sql_query(**config, query=f"DROP TABLE IF EXISTS {table_name}")
+    execute_sql_query(
+        **config,
+        query=f"CREATE TABLE {table_name} (LIKE boxscores_kaggle INCLUDING DEFAULTS)",
+    )
+
+    insert_rate = time_load(insert_dataframe, df, table_name, config)
+    copy_rate = time_load(copy_dataframe, df, table_name, config)
+
+    print(f"Rows loaded:             {len(df)}")
+    print(f"insert_dataframe (rows/s): {insert_rate:,.0f}")
+    print(f"copy_dataframe   (rows/s): {copy_rate:,.0f}")
+    print(f"Speedup:                 {copy_rate / insert_rate:.1f}x")
+
+    execute_sql_query(**config, query=f"DROP TABLE {table_name}")
@@ -0,0 +1,106 @@
+import argparse
+import numpy as np
+import time
+import xgboost as xgb
+
+from ..models.train_model import CauchyObjective, cauchyobj
+from .cv_benchmark import make_training_matrix
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the training objectives")
+    parser.add_argument(
+        "--rows", type=int, default=100000, help="The number of training rows"
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=100, help="Boosting rounds per training run"
+    )
+    parser.add_argument(
+        "--jit", action="store_true", help="Also benchmark the numba kernel"
+    )
+    return parser.parse_args()
+
+
+def time_objective_calls(obj, preds, dtrain, n_calls=200):
+    """
+    Time repeated calls of an objective on the same predictions.
+
+    Args:
+        obj (callable): The objective, called as obj(preds, dtrain).
+        preds (numpy.ndarray): Predictions to compute grad/hess for.
+        dtrain (xgb.DMatrix): The training data.
+        n_calls (int, optional): The number of calls to time. Default is 200.
+
+    Returns:
+        float: Milliseconds per call.
+    """
+    obj(preds, dtrain)
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        obj(preds, dtrain)
+    return (time.perf_counter() - start) / n_calls * 1000
+
+
+def time_training_rounds(param, dtrain, obj, rounds):
+    """
+    Time a training run with a given objective.
+
+    Args:
+        param (dict): Parameters for XGBoost model.
+        dtrain (xgb.DMatrix): The training data.
+        obj (callable or None): The custom objective, or None for a built-in one.
+        rounds (int): The number of boosting rounds.
+
+    Returns:
+        float: Milliseconds per boosting round.
+    """
+    start = time.perf_counter()
+    xgb.train(params=param, dtrain=dtrain, obj=obj, num_boost_round=rounds)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    X, y = make_training_matrix(args.rows)
+    dtrain = xgb.DMatrix(X, label=y)
+    preds = np.random.default_rng(1).normal(size=args.rows).astype(np.float32)
+
+    objectives = {
+        "cauchyobj": cauchyobj,
+        "CauchyObjective": CauchyObjective(),
+    }
+    if args.jit:
+        objectives["CauchyObjective(jit=True)"] = CauchyObjective(jit=True)
+
+    param = {
+        "eval_metric": "mae",
+        "booster": "gbtree",
+        "eta": 0.05,
+        "subsample": 0.35,
+        "colsample_bytree": 0.7,
+        "num_parallel_tree": 3,
+        "min_child_weight": 40,
+        "gamma": 10,
+        "max_depth": 3,
+    }
+
+    print("Objective call (ms):")
+    for name, obj in objectives.items():
+        print(f"  {name:<28}{time_objective_calls(obj, preds, dtrain):.3f}")
+
+    print("Boosting round (ms):")
+    for name, obj in objectives.items():
+        print(
+            f"  {name:<28}{time_training_rounds(param, dtrain, obj, args.rounds):.3f}"
+        )
+    huber_param = dict(param, objective="reg:pseudohubererror")
+    print(
+        f"  {'reg:pseudohubererror':<28}"
+        f"{time_training_rounds(huber_param, dtrain, None, args.rounds):.3f}"
+    )
@@ -0,0 +1,530 @@
+import argparse
+import datetime
+from dotenv import load_dotenv
+import json
+import os
+import pandas as pd
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from ..features import feature_engine
+from ..models.predict_model import build_game_features, predict_spreads
+from ..models.train_model import (
+    get_objective,
+    load_training_dmatrix,
+    preprocess_data,
+    train_and_evaluate_models,
+)
+from ..utils import (
+    copy_dataframe,
+    execute_sql_query,
+    get_run_id,
+    load_config,
+    peak_rss_bytes,
+)
+from .synthetic_data import make_synthetic_seasons
+
+RESULTS_PATH = "data/benchmarks/pipeline_results.jsonl"
+
+# Models are trained on the games from this day on, as in load_training_data
+TRAINING_FIRST_DAYNUM = 90
+
+# The tables bulk loaded from the synthetic seasons
+LOADED_TABLES = ["boxscores_kaggle", "boxscores_sdv", "schedule_sdv"]
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark every pipeline stage on synthetic seasons"
+    )
+    parser.add_argument("--seasons", type=int, default=5, help="The number of seasons")
+    parser.add_argument("--teams", type=int, default=360, help="Teams per season")
+    parser.add_argument(
+        "--games-per-team", type=int, default=30, help="Games each team plays a season"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Timed runs per step after its memory-traced run; the fastest is kept",
+    )
+    parser.add_argument(
+        "--repeat-cv", type=int, default=1, help="Cross-validation repeats"
+    )
+    parser.add_argument(
+        "--nthread", type=int, default=None, help="XGBoost threads. Default is all"
+    )
+    parser.add_argument(
+        "--database",
+        type=str,
+        default=None,
+        help="Run the SQL stages in this disposable database, whose tables are overwritten."
+        " Default is the in-process pandas stand-in",
+    )
+    parser.add_argument(
+        "--results",
+        type=str,
+        default=RESULTS_PATH,
+        help="The JSON lines file results are appended to and compared against",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative slowdown or memory growth reported as a regression",
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="Compare without appending the results"
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit non-zero if a step regressed against the previous commit",
+    )
+    return parser.parse_args()
+
+
+class NullConnection:
+    """
+    An in-process stand-in for a psycopg2 connection that discards COPY input.
+
+    copy_dataframe still prepares and writes every CSV chunk, so bulk loads are
+    timed up to the point the chunks would be sent to the server.
+    """
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def copy_expert(self, sql, buffer):
+        buffer.read()
+
+
+def scheduled_games(sdv_schedule):
+    """
+    Get the final season's games from TRAINING_FIRST_DAYNUM on, as get_scheduled_games returns them.
+
+    Args:
+        sdv_schedule (pandas.DataFrame): The schedule from make_sdv_schedule.
+
+    Returns:
+        pandas.DataFrame: One row per game with season, daynum, t1_teamid, t2_teamid and location.
+    """
+    games = sdv_schedule[
+        (sdv_schedule["season"] == sdv_schedule["season"].max())
+        & (sdv_schedule["daynum"] >= TRAINING_FIRST_DAYNUM)
+    ]
+    return pd.DataFrame(
+        {
+            "season": games["season"].values,
+            "daynum": games["daynum"].values,
+            "t1_teamid": games["home_id"].values,
+            "t2_teamid": games["away_id"].values,
+            "location": (~games["neutral_site"]).astype(int).values,
+        }
+    )
+
+
+def train_models(training_data, param, repeat_cv=1):
+    """
+    Cross-validate and train one model per repeat, like run_training without saving them.
+
+    Args:
+        training_data (pandas.DataFrame): Training data from the Kaggle boxscores.
+        param (dict): Parameters for XGBoost model.
+        repeat_cv (int, optional): Number of times to repeat cross-validation. Default is 1.
+
+    Returns:
+        list: The trained XGBoost models.
+    """
+    import xgboost as xgb
+
+    X, y = preprocess_data(training_data)
+    iteration_counts, _ = train_and_evaluate_models(X, y, param, repeat_cv=repeat_cv)
+    dtrain = load_training_dmatrix(X, y)
+    return [
+        xgb.train(
+            param,
+            dtrain,
+            num_boost_round=int(iterations),
+            obj=get_objective(param),
+        )
+        for iterations in iteration_counts
+    ]
+
+
+def memory_steps(param, repeat_cv=1):
+    """
+    Build the benchmark steps on the in-process stand-ins for the SQL stages.
+
+    The feature_engine functions mirror the pipeline's SQL, so each step does the
+    same work as its stage in STAGES without a database. Bulk loads go through
+    copy_dataframe into a NullConnection.
+
+    Args:
+        param (dict): Parameters for XGBoost model.
+        repeat_cv (int, optional): Number of times to repeat cross-validation. Default is 1.
+
+    Returns:
+        list: (name, function) pairs in pipeline order. Each function reads and adds
+            to a dict of the run's DataFrames and returns the rows it produced.
+    """
+
+    def bulk_insert(data):
+        for table_name in LOADED_TABLES:
+            copy_dataframe(data[table_name], table_name, {}, conn=NullConnection())
+        return sum(len(data[table_name]) for table_name in LOADED_TABLES)
+
+    def transform(output, function, source):
+        def step(data):
+            data[output] = function(data[source])
+            return len(data[output])
+
+        return step
+
+    def team_feature_snapshot(data):
+        training_data = data["training_data_sdv"]
+        season = training_data["season"].max()
+        data["team_features_sdv"] = feature_engine.get_team_features(
+            training_data, season, training_data["daynum"].max() + 1
+        )
+        return len(data["team_features_sdv"])
+
+    def train(data):
+        training_data = data["training_data_kaggle"]
+        training_data = training_data[training_data["daynum"] >= TRAINING_FIRST_DAYNUM]
+        data["models"] = train_models(training_data, param, repeat_cv)
+        return len(training_data)
+
+    def predict(data):
+        games = scheduled_games(data["schedule_sdv"])
+        team_features = []
+        for (season, daynum), _ in games.groupby(["season", "daynum"]):
+            features = feature_engine.get_team_features(
+                data["training_data_sdv"], season, daynum
+            )
+            team_features.append(features.assign(daynum=daynum))
+        X = build_game_features(games, pd.concat(team_features, ignore_index=True))
+        predict_spreads(data["models"], X)
+        return len(games)
+
+    return [
+        ("bulk_insert", bulk_insert),
+        (
+            "sdv_kagglestyle",
+            transform(
+                "boxscores_sdv_kagglestyle",
+                feature_engine.sdv_to_kaggle,
+                "boxscores_sdv",
+            ),
+        ),
+        (
+            "kaggle_recipricol",
+            transform(
+                "boxscores_kaggle_recipricol",
+                feature_engine.swap_boxscores,
+                "boxscores_kaggle",
+            ),
+        ),
+        (
+            "sdv_recipricol",
+            transform(
+                "boxscores_sdv_kagglestyle_recipricol",
+                feature_engine.swap_boxscores,
+                "boxscores_sdv_kagglestyle",
+            ),
+        ),
+        (
+            "kaggle_training_data",
+            transform(
+                "training_data_kaggle",
+                feature_engine.create_training_data,
+                "boxscores_kaggle_recipricol",
+            ),
+        ),
+        (
+            "sdv_training_data",
+            transform(
+                "training_data_sdv",
+                feature_engine.create_training_data,
+                "boxscores_sdv_kagglestyle_recipricol",
+            ),
+        ),
+        ("team_feature_snapshot", team_feature_snapshot),
+        ("train", train),
+        ("predict", predict),
+    ]
+
+
+def postgres_steps(config, param, repeat_cv=1):
+    """
+    Build the benchmark steps on a PostgreSQL database, running the pipeline's own stages.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        param (dict): Parameters for XGBoost model.
+        repeat_cv (int, optional): Number of times to repeat cross-validation. Default is 1.
+
+    Returns:
+        list: (name, function) pairs in pipeline order, like memory_steps. SQL stages
+            return None, as their outputs stay in the database.
+    """
+    from ..data.initialize_datasets import (
+        create_kaggle_boxscore_table,
+        create_sdv_boxscore_table,
+        create_sdv_schedule_table,
+    )
+    from ..models.predict_model import get_game_features
+    from ..models.train_model import load_training_data
+    from ..pipeline import STAGES
+
+    create_kaggle_boxscore_table(config)
+    create_sdv_boxscore_table(config)
+    create_sdv_schedule_table(config)
+
+    def bulk_insert(data):
+        execute_sql_query(**config, query=f"TRUNCATE {', '.join(LOADED_TABLES)};")
+        for table_name in LOADED_TABLES:
+            copy_dataframe(data[table_name], table_name, config)
+        return sum(len(data[table_name]) for table_name in LOADED_TABLES)
+
+    def stage(name):
+        def step(data):
+            STAGES[name]["run"](config)
+
+        return step
+
+    def train(data):
+        training_data = load_training_data(config, method="copy")
+        data["models"] = train_models(training_data, param, repeat_cv)
+        return len(training_data)
+
+    def predict(data):
+        games = scheduled_games(data["schedule_sdv"])
+        predict_spreads(data["models"], get_game_features(games, config))
+        return len(games)
+
+    sql_stages = [name for name in STAGES if name != "train"]
+    return (
+        [("bulk_insert", bulk_insert)]
+        + [(name, stage(name)) for name in sql_stages]
+        + [("train", train), ("predict", predict)]
+    )
+
+
+def run_step(name, function, data, repeat=1):
+    """
+    Run a step once with tracemalloc to find its peak memory, then time it.
+
+    Args:
+        name (str): The step's name.
+        function (callable): The step, from memory_steps or postgres_steps.
+        data (dict): The run's DataFrames, passed to the step.
+        repeat (int, optional): Timed runs after the traced run. Default is 1.
+
+    Returns:
+        dict: The step's fastest wall time, peak traced and resident memory, and rows.
+    """
+    tracemalloc.start()
+    rows = function(data)
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(data)
+        times.append(time.perf_counter() - start)
+
+    return {
+        "step": name,
+        "seconds": min(times),
+        "peak_traced_bytes": peak_traced,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "rows": rows,
+    }
+
+
+def git_commit():
+    """
+    Get the commit the benchmark runs on.
+
+    Returns:
+        tuple: The commit hash, or None outside a git checkout, and whether tracked
+            files have uncommitted changes.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, bool(status.strip())
+
+
+def load_results(path):
+    """
+    Load earlier benchmark results.
+
+    Args:
+        path (str): The JSON lines results file.
+
+    Returns:
+        list: One dict per step of every earlier run, oldest first.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as fd:
+        return [json.loads(line) for line in fd if line.strip()]
+
+
+def save_results(results, path):
+    """
+    Append benchmark results to the results file.
+
+    Args:
+        results (list): One dict per step.
+        path (str): The JSON lines results file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as fd:
+        for result in results:
+            fd.write(json.dumps(result) + "\n")
+
+
+def compare_results(results, history, threshold=0.2, min_seconds=0.05):
+    """
+    Compare each step against the latest earlier result from another commit on the same data.
+
+    Results match when they share the backend, the synthetic data's size and the step.
+    Slowdowns of less than min_seconds are ignored, as they are within timing noise.
+
+    Args:
+        results (list): This run's results.
+        history (list): Earlier results from load_results.
+        threshold (float, optional): The relative growth reported as a regression. Default is 0.2.
+        min_seconds (float, optional): The smallest slowdown reported. Default is 0.05.
+
+    Returns:
+        list: A description of every regression.
+    """
+    key_fields = ["backend", "seasons", "teams", "games_per_team", "step"]
+    regressions = []
+    for result in results:
+        key = [result[field] for field in key_fields]
+        earlier = [
+            h
+            for h in history
+            if [h.get(field) for field in key_fields] == key
+            and (h["commit"] != result["commit"] or result["commit"] is None)
+        ]
+        if not earlier:
+            continue
+        baseline = earlier[-1]
+
+        time_ratio = result["seconds"] / max(baseline["seconds"], 1e-9)
+        memory_ratio = result["peak_traced_bytes"] / max(
+            baseline["peak_traced_bytes"], 1
+        )
+        print(
+            f"{result['step']:<22} {time_ratio:6.2f}x time {memory_ratio:6.2f}x memory"
+            f" vs {(baseline['commit'] or 'unknown')[:10]}"
+        )
+        if (
+            time_ratio > 1 + threshold
+            and result["seconds"] - baseline["seconds"] >= min_seconds
+        ):
+            regressions.append(f"{result['step']} is {time_ratio:.2f}x slower")
+        if memory_ratio > 1 + threshold:
+            regressions.append(f"{result['step']} uses {memory_ratio:.2f}x the memory")
+    return regressions
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    param = {
+        "eval_metric": "mae",
+        "booster": "gbtree",
+        "eta": 0.05,
+        "subsample": 0.35,
+        "colsample_bytree": 0.7,
+        "num_parallel_tree": 3,
+        "min_child_weight": 40,
+        "gamma": 10,
+        "max_depth": 3,
+    }
+    if args.nthread is not None:
+        param["nthread"] = args.nthread
+
+    kaggle_boxscores, sdv_boxscores, sdv_schedule = make_synthetic_seasons(
+        args.seasons, args.teams, args.games_per_team, seed=args.seed
+    )
+    data = {
+        "boxscores_kaggle": kaggle_boxscores,
+        "boxscores_sdv": sdv_boxscores,
+        "schedule_sdv": sdv_schedule,
+    }
+
+    if args.database:
+        # Every table the pipeline writes in this database is overwritten
+        load_dotenv()
+        config = load_config()
+        config["database"] = args.database
+        steps = postgres_steps(config, param, args.repeat_cv)
+        backend = "postgres"
+    else:
+        steps = memory_steps(param, args.repeat_cv)
+        backend = "memory"
+
+    commit, dirty = git_commit()
+    run = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "dirty": dirty,
+        "run_id": get_run_id(),
+        "backend": backend,
+        "seasons": args.seasons,
+        "teams": args.teams,
+        "games_per_team": args.games_per_team,
+        "repeat": args.repeat,
+    }
+
+    results = []
+    for name, function in steps:
+        result = dict(run, **run_step(name, function, data, args.repeat))
+        results.append(result)
+        print(
+            f"{name:<22} {result['seconds']:8.3f}s"
+            f" {result['peak_traced_bytes'] / 2**20:9.1f} MiB traced"
+            f" {result['peak_rss_bytes'] / 2**20:9.1f} MiB peak RSS"
+        )
+
+    regressions = compare_results(results, load_results(args.results), args.threshold)
+    for regression in regressions:
+        print("Regression:", regression)
+
+    if not args.no_save:
+        save_results(results, args.results)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
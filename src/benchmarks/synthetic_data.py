@@ -0,0 +1,343 @@
+import argparse
+import numpy as np
+import os
+import pandas as pd
+
+from ..features.feature_engine import BOXSCORE_STATS, SDV_BOXSCORE_STATS
+
+# Mean per-team count of each boxscore statistic that is not derived from the score
+STAT_MEANS = {
+    "FGA3": 21,
+    "FTA": 19,
+    "OR": 10,
+    "DR": 24,
+    "Ast": 13,
+    "TO": 12,
+    "Stl": 6,
+    "Blk": 3,
+    "PF": 17,
+}
+
+FIRST_TEAM_ID = 1101
+SEASON_DAYS = 133
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Write synthetic Kaggle and SportsDataVerse boxscores and schedules"
+    )
+    parser.add_argument("--seasons", type=int, default=5, help="The number of seasons")
+    parser.add_argument(
+        "--first-season", type=int, default=2003, help="The first season"
+    )
+    parser.add_argument("--teams", type=int, default=360, help="Teams per season")
+    parser.add_argument(
+        "--games-per-team", type=int, default=30, help="Games each team plays a season"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default="data/synthetic",
+        help="Where to write the Kaggle CSV and the SportsDataVerse season files",
+    )
+    return parser.parse_args()
+
+
+def make_kaggle_boxscores(
+    n_seasons=5, n_teams=360, games_per_team=30, first_season=2003, seed=0
+):
+    """
+    Create synthetic boxscores shaped like MRegularSeasonDetailedResults.csv.
+
+    Each season every team plays games_per_team games against randomly drawn
+    opponents, spread evenly over the season's days. Margins follow a latent team
+    strength plus home advantage and noise, and each team's shooting is drawn so
+    that its points add up to its score.
+
+    Args:
+        n_seasons (int, optional): The number of seasons. Default is 5.
+        n_teams (int, optional): The number of teams in every season. Default is 360.
+        games_per_team (int, optional): The games each team plays a season. Default is 30.
+        first_season (int, optional): The first season. Default is 2003.
+        seed (int, optional): Seed for the random number generator. Default is 0.
+
+    Returns:
+        pandas.DataFrame: One row per game with the boxscores_kaggle columns.
+    """
+    rng = np.random.default_rng(seed)
+    team_ids = np.arange(FIRST_TEAM_ID, FIRST_TEAM_ID + n_teams)
+
+    # Every round pairs off the shuffled teams, so each team plays once per round
+    seasons, daynums, t1_index, t2_index = [], [], [], []
+    for season in range(first_season, first_season + n_seasons):
+        for round_number in range(games_per_team):
+            order = rng.permutation(n_teams)
+            n_games = n_teams // 2
+            seasons.append(np.full(n_games, season))
+            daynums.append(
+                np.full(n_games, round_number * SEASON_DAYS // games_per_team)
+            )
+            t1_index.append(order[0 : 2 * n_games : 2])
+            t2_index.append(order[1 : 2 * n_games : 2])
+    seasons = np.concatenate(seasons)
+    daynums = np.concatenate(daynums)
+    t1_index = np.concatenate(t1_index)
+    t2_index = np.concatenate(t2_index)
+    n_games = len(seasons)
+
+    # T1 is at home (1), away (-1) or on a neutral court (0)
+    strength = rng.normal(scale=8, size=(n_seasons, n_teams))
+    season_index = seasons - first_season
+    location = rng.choice([1, -1, 0], n_games, p=[0.45, 0.45, 0.1])
+    margin = np.round(
+        strength[season_index, t1_index]
+        - strength[season_index, t2_index]
+        + 3.5 * location
+        + rng.normal(scale=11, size=n_games)
+    ).astype(np.int64)
+    margin[margin == 0] = rng.choice([-1, 1], (margin == 0).sum())
+    total = np.round(rng.normal(140, 14, n_games)).astype(np.int64)
+    t1_score = (total + margin) // 2
+    t2_score = t1_score - margin
+
+    t1_wins = margin > 0
+    winner = np.where(t1_wins, t1_index, t2_index)
+    loser = np.where(t1_wins, t2_index, t1_index)
+    winner_location = np.where(t1_wins, location, -location)
+
+    df = pd.DataFrame(
+        {
+            "Season": seasons,
+            "DayNum": daynums,
+            "WTeamID": team_ids[winner],
+            "WScore": np.maximum(t1_score, t2_score),
+            "LTeamID": team_ids[loser],
+            "LScore": np.minimum(t1_score, t2_score),
+            "WLoc": np.select(
+                [winner_location == 1, winner_location == -1], ["H", "A"], "N"
+            ),
+            "NumOT": rng.binomial(1, 0.06, n_games),
+        }
+    )
+    for side in ["W", "L"]:
+        stats = _make_team_stats(df[side + "Score"].values, rng)
+        for stat in BOXSCORE_STATS:
+            df[side + stat] = stats[stat]
+    return df
+
+
+def _make_team_stats(score, rng):
+    """
+    Draw one team's boxscore statistics for each of its scores.
+
+    Args:
+        score (numpy.ndarray): The team's points in each game.
+        rng (numpy.random.Generator): The random number generator.
+
+    Returns:
+        dict: An integer array for each of BOXSCORE_STATS.
+    """
+    n_games = len(score)
+    stats = {stat: rng.poisson(mean, n_games) for stat, mean in STAT_MEANS.items()}
+    stats["FGM3"] = np.minimum(rng.binomial(stats["FGA3"], 0.34), score // 3)
+    stats["FTM"] = np.minimum(
+        rng.binomial(stats["FTA"], 0.7), score - 3 * stats["FGM3"]
+    )
+
+    # Points are 2 * FGM + FGM3 + FTM; leftover odd points become free throws
+    stats["FGM"] = (score - stats["FTM"] - stats["FGM3"]) // 2
+    stats["FTM"] = score - 2 * stats["FGM"] - stats["FGM3"]
+    stats["FTA"] = np.maximum(stats["FTA"], stats["FTM"])
+    stats["FGA"] = stats["FGM"] + rng.poisson(32, n_games)
+    stats["FGA3"] = np.minimum(stats["FGA3"], stats["FGA"])
+    return stats
+
+
+def season_start_date(season):
+    """
+    Get the date of a synthetic season's first day.
+
+    Args:
+        season (int): The season, named for the year it ends in.
+
+    Returns:
+        pandas.Timestamp: November 4th of the previous year.
+    """
+    return pd.Timestamp(year=season - 1, month=11, day=4)
+
+
+def make_sdv_boxscores(kaggle_boxscores):
+    """
+    Convert synthetic Kaggle boxscores to team boxscores in the layout of boxscores_sdv.
+
+    Args:
+        kaggle_boxscores (pandas.DataFrame): Boxscores from make_kaggle_boxscores.
+
+    Returns:
+        pandas.DataFrame: Two rows per game, one for each team, with game_ids that are
+            the row numbers of the Kaggle boxscores.
+    """
+    games = kaggle_boxscores.reset_index(drop=True)
+    game_date = games["Season"].map(season_start_date) + pd.to_timedelta(
+        games["DayNum"], unit="D"
+    )
+
+    # SportsDataVerse has a home and an away team even on neutral courts
+    home_away = {"H": ("home", "away"), "A": ("away", "home"), "N": ("home", "away")}
+
+    def one_side(team, opponent, is_winner):
+        team_home_away = games["WLoc"].map(
+            {loc: sides[0 if is_winner else 1] for loc, sides in home_away.items()}
+        )
+        df = pd.DataFrame(
+            {
+                "game_id": games.index.values + 1,
+                "season": games["Season"].values,
+                "season_type": 2,
+                "game_date": game_date.dt.date.values,
+                "game_date_time": (game_date + pd.Timedelta(hours=19)).values,
+                "team_id": games[f"{team}TeamID"].values,
+                "team_display_name": "Team " + games[f"{team}TeamID"].astype(str),
+                "team_short_display_name": games[f"{team}TeamID"].astype(str),
+                "team_home_away": team_home_away.values,
+                "team_score": games[f"{team}Score"].values,
+                "team_winner": is_winner,
+            }
+        )
+        for stat, sdv_column in SDV_BOXSCORE_STATS.items():
+            df[sdv_column] = games[team + stat].values
+        df["field_goal_pct"] = (
+            100 * df["field_goals_made"] / df["field_goals_attempted"]
+        )
+        df["three_point_field_goal_pct"] = (
+            100
+            * df["three_point_field_goals_made"]
+            / df["three_point_field_goals_attempted"].where(
+                df["three_point_field_goals_attempted"] > 0
+            )
+        )
+        df["free_throw_pct"] = (
+            100
+            * df["free_throws_made"]
+            / df["free_throws_attempted"].where(df["free_throws_attempted"] > 0)
+        )
+        df["total_rebounds"] = df["offensive_rebounds"] + df["defensive_rebounds"]
+        df["total_turnovers"] = df["turnovers"]
+        df["opponent_team_id"] = games[f"{opponent}TeamID"].values
+        df["opponent_team_display_name"] = (
+            "Team " + games[f"{opponent}TeamID"].astype(str)
+        ).values
+        df["opponent_team_score"] = games[f"{opponent}Score"].values
+        return df
+
+    boxscores = pd.concat(
+        [one_side("W", "L", True), one_side("L", "W", False)], ignore_index=True
+    )
+    return boxscores.sort_values(["game_id", "team_winner"], ignore_index=True)
+
+
+def make_sdv_schedule(kaggle_boxscores):
+    """
+    Convert synthetic Kaggle boxscores to a schedule in the layout of schedule_sdv.
+
+    Args:
+        kaggle_boxscores (pandas.DataFrame): Boxscores from make_kaggle_boxscores.
+
+    Returns:
+        pandas.DataFrame: One row per game, with the game_ids of make_sdv_boxscores.
+    """
+    games = kaggle_boxscores.reset_index(drop=True)
+    start_date = games["Season"].map(season_start_date)
+    game_date = start_date + pd.to_timedelta(games["DayNum"], unit="D")
+
+    winner_home = games["WLoc"] != "A"
+    home_id = games["WTeamID"].where(winner_home, games["LTeamID"])
+    away_id = games["LTeamID"].where(winner_home, games["WTeamID"])
+    home_score = games["WScore"].where(winner_home, games["LScore"])
+    away_score = games["LScore"].where(winner_home, games["WScore"])
+
+    return pd.DataFrame(
+        {
+            "id": games.index.values + 1,
+            "game_id": games.index.values + 1,
+            "season": games["Season"].values,
+            "season_type": 2,
+            "start_date": (game_date + pd.Timedelta(hours=19)).dt.tz_localize("UTC"),
+            "neutral_site": (games["WLoc"] == "N").values,
+            "home_id": home_id.values,
+            "home_display_name": ("Team " + home_id.astype(str)).values,
+            "home_short_display_name": home_id.astype(str).values,
+            "home_score": home_score.values,
+            "home_winner": winner_home.values,
+            "away_id": away_id.values,
+            "away_display_name": ("Team " + away_id.astype(str)).values,
+            "away_short_display_name": away_id.astype(str).values,
+            "away_score": away_score.values,
+            "away_winner": (~winner_home).values,
+            "status_type_completed": True,
+            "game_date": game_date.dt.date.values,
+            "season_start_date": start_date.dt.tz_localize("UTC"),
+            "daynum": games["DayNum"].values,
+        }
+    )
+
+
+def make_synthetic_seasons(
+    n_seasons=5, n_teams=360, games_per_team=30, first_season=2003, seed=0
+):
+    """
+    Create the same synthetic games in the Kaggle and SportsDataVerse formats.
+
+    Args:
+        n_seasons (int, optional): The number of seasons. Default is 5.
+        n_teams (int, optional): The number of teams in every season. Default is 360.
+        games_per_team (int, optional): The games each team plays a season. Default is 30.
+        first_season (int, optional): The first season. Default is 2003.
+        seed (int, optional): Seed for the random number generator. Default is 0.
+
+    Returns:
+        tuple: Kaggle boxscores, SportsDataVerse team boxscores and the SportsDataVerse schedule.
+    """
+    kaggle_boxscores = make_kaggle_boxscores(
+        n_seasons, n_teams, games_per_team, first_season, seed
+    )
+    return (
+        kaggle_boxscores,
+        make_sdv_boxscores(kaggle_boxscores),
+        make_sdv_schedule(kaggle_boxscores),
+    )
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    kaggle_boxscores, sdv_boxscores, sdv_schedule = make_synthetic_seasons(
+        args.seasons, args.teams, args.games_per_team, args.first_season, args.seed
+    )
+
+    # The Kaggle file loads with ingest's --csv, the season files match its cache layout
+    os.makedirs(os.path.join(args.output_dir, "sdv"), exist_ok=True)
+    kaggle_boxscores.to_csv(
+        os.path.join(args.output_dir, "MRegularSeasonDetailedResults.csv"), index=False
+    )
+    for season, df in sdv_boxscores.groupby("season"):
+        df.to_parquet(
+            os.path.join(args.output_dir, "sdv", f"boxscores_{season}.parquet"),
+            index=False,
+        )
+    for season, df in sdv_schedule.groupby("season"):
+        df.to_parquet(
+            os.path.join(args.output_dir, "sdv", f"schedule_{season}.parquet"),
+            index=False,
+        )
+
+    print(f"Games:                  {len(kaggle_boxscores)}")
+    print(f"SportsDataVerse rows:   {len(sdv_boxscores)}")
+    print(f"Written to:             {args.output_dir}")
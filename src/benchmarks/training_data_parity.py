@@ -0,0 +1,204 @@
+import argparse
+from dotenv import load_dotenv
+import numpy as np
+import sys
+
+from ..features import build_features, feature_engine
+from ..utils import copy_dataframe, copy_sql_query, execute_sql_query, load_config
+from .synthetic_data import make_kaggle_boxscores
+
+# Scratch tables, dropped when the check finishes
+BOXSCORE_TABLE = "parity_boxscores"
+RECIPRICOL_TABLE = "parity_recipricol"
+WINDOWED_TABLE = "parity_training_windowed"
+DAILY_TABLE = "parity_training_daily"
+INCREMENTAL_TABLE = "parity_training_incremental"
+
+# Identifies a training data row
+ROW_KEY = ["season", "daynum", "t1_teamid", "t2_teamid"]
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Check that every way of building the training data gives the same rows"
+    )
+    parser.add_argument(
+        "database",
+        type=str,
+        help="A disposable database to build the scratch tables in",
+    )
+    parser.add_argument("--seasons", type=int, default=2, help="The number of seasons")
+    parser.add_argument("--teams", type=int, default=60, help="Teams per season")
+    parser.add_argument(
+        "--games-per-team", type=int, default=20, help="Games each team plays a season"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the scratch tables for inspection"
+    )
+    return parser.parse_args()
+
+
+def load_boxscores(boxscores, config):
+    """
+    Load Kaggle-format boxscores into the scratch boxscore table and build its recipricol table.
+
+    Args:
+        boxscores (pandas.DataFrame): Boxscores in the layout of boxscores_kaggle.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+    """
+    from ..data.initialize_datasets import create_kaggle_boxscore_table
+
+    create_kaggle_boxscore_table(config)
+    execute_sql_query(
+        **config,
+        query=f"""
+        DROP TABLE IF EXISTS {BOXSCORE_TABLE}, {RECIPRICOL_TABLE};
+        CREATE TABLE {BOXSCORE_TABLE} (LIKE boxscores_kaggle INCLUDING DEFAULTS);
+        """,
+    )
+    copy_dataframe(boxscores, BOXSCORE_TABLE, config)
+    build_features.transform_boxscore_to_recipricol(BOXSCORE_TABLE, RECIPRICOL_TABLE)
+
+
+def make_stale_boxscores(boxscores, late_days=5, fraction=0.02, seed=0):
+    """
+    Take boxscores back to an earlier state that an incremental refresh has to catch up from.
+
+    The final season's last late_days days are removed, as are a fraction of the
+    other games, as if they were loaded late, and another fraction of the games have
+    different statistics, as if they were corrected by a later upsert.
+
+    Args:
+        boxscores (pandas.DataFrame): Boxscores in the layout of boxscores_kaggle.
+        late_days (int, optional): Days removed from the end of the final season. Default is 5.
+        fraction (float, optional): The fraction of games removed and of games changed.
+            Default is 0.02.
+        seed (int, optional): Seed for the random number generator. Default is 0.
+
+    Returns:
+        pandas.DataFrame: The earlier boxscores.
+    """
+    rng = np.random.default_rng(seed)
+    final_season = boxscores["Season"] == boxscores["Season"].max()
+    last_days = (
+        boxscores["DayNum"] > boxscores["DayNum"][final_season].max() - late_days
+    )
+    late = rng.random(len(boxscores)) < fraction
+    stale = boxscores[~(final_season & last_days) & ~late].copy()
+
+    changed = rng.random(len(stale)) < fraction
+    stale.loc[changed, "WFGA"] += 5
+    stale.loc[changed, "LTO"] += 3
+    return stale
+
+
+def count_frame_differences(sql_training_data, training_data):
+    """
+    Count the rows of two training data DataFrames that differ.
+
+    Rows are matched on ROW_KEY and compared on the columns of the SQL table, with
+    a tolerance for the rounding of NUMERIC means.
+
+    Args:
+        sql_training_data (pandas.DataFrame): Training data read from a table.
+        training_data (pandas.DataFrame): Training data from feature_engine.
+
+    Returns:
+        int: The rows missing from either DataFrame or with a differing value.
+    """
+    columns = list(sql_training_data.columns)
+    merged = sql_training_data.merge(
+        training_data[columns],
+        how="outer",
+        on=ROW_KEY,
+        suffixes=("_sql", "_engine"),
+        indicator=True,
+    )
+    different = (merged["_merge"] != "both").to_numpy(copy=True)
+    for col in columns:
+        if col in ROW_KEY:
+            continue
+        sql_values = merged[col + "_sql"].to_numpy(dtype=np.float64)
+        engine_values = merged[col + "_engine"].to_numpy(dtype=np.float64)
+        different |= ~np.isclose(sql_values, engine_values, equal_nan=True)
+    return int(different.sum())
+
+
+def drop_scratch_tables(config):
+    """
+    Drop the check's scratch tables.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+    """
+    execute_sql_query(
+        **config,
+        query=f"""
+        DROP TABLE IF EXISTS {BOXSCORE_TABLE}, {RECIPRICOL_TABLE}, {WINDOWED_TABLE},
+            {DAILY_TABLE}, {INCREMENTAL_TABLE}, {WINDOWED_TABLE}_team_hashes,
+            {INCREMENTAL_TABLE}_team_hashes;
+        """,
+    )
+
+
+if __name__ == "__main__":
+    # Load up args, configs, environment vars
+    args = parse_arguments()
+    load_dotenv()
+    config = load_config()
+    config["database"] = args.database
+
+    # build_features reads the configuration from a module global
+    build_features.config = config
+
+    boxscores = make_kaggle_boxscores(
+        args.seasons, args.teams, args.games_per_team, seed=args.seed
+    )
+    drop_scratch_tables(config)
+
+    # Build the incremental table from an earlier state of the boxscores
+    load_boxscores(make_stale_boxscores(boxscores, seed=args.seed), config)
+    build_features.create_training_data_table_windowed(
+        RECIPRICOL_TABLE, INCREMENTAL_TABLE
+    )
+
+    # Then bring it up to date, and build the other tables from scratch
+    load_boxscores(boxscores, config)
+    n_teams = build_features.update_training_data_table(
+        RECIPRICOL_TABLE, INCREMENTAL_TABLE
+    )
+    print(f"Incremental refresh rebuilt {n_teams} team seasons")
+    build_features.create_training_data_table_windowed(RECIPRICOL_TABLE, WINDOWED_TABLE)
+    build_features.create_training_data_table(RECIPRICOL_TABLE, DAILY_TABLE)
+
+    differences = {
+        "windowed SQL vs per-day SQL": build_features.count_training_data_differences(
+            WINDOWED_TABLE, DAILY_TABLE
+        ),
+        "incremental refresh vs full rebuild": (
+            build_features.count_training_data_differences(
+                INCREMENTAL_TABLE, WINDOWED_TABLE
+            )
+        ),
+        "windowed SQL vs feature_engine": count_frame_differences(
+            copy_sql_query(config, f"SELECT * FROM {WINDOWED_TABLE}"),
+            feature_engine.create_training_data(
+                feature_engine.swap_boxscores(boxscores)
+            ),
+        ),
+    }
+
+    for name, count in differences.items():
+        print(f"{name:<36} {count} rows differ")
+
+    if not args.keep:
+        drop_scratch_tables(config)
+    if any(differences.values()):
+        sys.exit(1)
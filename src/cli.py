@@ -0,0 +1,77 @@
+import argparse
+import runpy
+import sys
+
+# Subcommand: (module run as the command, help). Modules are only imported when
+# their command runs, so each command pays for its own imports and no others.
+COMMANDS = {
+    "ingest": (
+        "src.data.ingest",
+        "Load seasons of boxscores and schedules into the database",
+    ),
+    "build-features": (
+        "src.features.build_features",
+        "Build the recipricol boxscores, training data and team feature snapshot",
+    ),
+    "train": ("src.models.train_model", "Cross-validate, train and save models"),
+    "predict": (
+        "src.models.predict_model",
+        "Predict the scheduled games of a date or date range",
+    ),
+    "simulate": (
+        "src.models.simulate_bracket",
+        "Simulate a tournament bracket from matchup predictions",
+    ),
+    "pipeline": (
+        "src.pipeline",
+        "Rebuild the feature tables and models whose inputs or code changed",
+    ),
+}
+
+
+def parse_arguments(argv=None):
+    """
+    Parse the subcommand, leaving its arguments to the subcommand's own parser.
+
+    Args:
+        argv (list, optional): The command-line arguments. Default is sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The command and the arguments that follow it.
+    """
+    parser = argparse.ArgumentParser(
+        prog="liddar",
+        description="Run a stage of the liddar pipeline",
+        epilog="Run 'liddar <command> --help' for a command's arguments.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(command, help=help_text, add_help=False)
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+
+    args, remaining = parser.parse_known_args(argv)
+    args.args = remaining + args.args
+    return args
+
+
+def main(argv=None):
+    """
+    Run a pipeline stage as if it were started with python -m <module>.
+
+    Args:
+        argv (list, optional): The command-line arguments. Default is sys.argv[1:].
+    """
+    args = parse_arguments(argv)
+    module, _ = COMMANDS[args.command]
+
+    # pandas and psycopg2 come with utils, so only import it once a command runs
+    from .utils import stage_metrics
+
+    # The stage parses its own arguments and reports as 'liddar <command>'
+    sys.argv = [f"liddar {args.command}"] + args.args
+    with stage_metrics(args.command):
+        runpy.run_module(module, run_name="__main__", alter_sys=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import os
+import pandas as pd
+
+from ..utils import (
+    copy_dataframe,
+    execute_sql_query,
+    get_pool_max_connections,
+    load_config,
+    pooled_connection,
+)
+
+RAW_CACHE_DIR = "data/raw"
+
+# The columns that identify a row of each loaded table
+NATURAL_KEYS = {
+    "boxscores_sdv": ["game_id", "team_id"],
+    "boxscores_kaggle": ["season", "daynum", "wteamid", "lteamid"],
+    "schedule_sdv": ["game_id"],
+}
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Load seasons of boxscores and schedules into the database"
+    )
+    parser.add_argument(
+        "source",
+        choices=["sdv_boxscores", "sdv_schedule", "kaggle_boxscores"],
+        help="The table to load",
+    )
+    parser.add_argument(
+        "--seasons", type=int, nargs="+", help="The seasons to (re)load"
+    )
+    parser.add_argument(
+        "--csv",
+        type=str,
+        help="The Kaggle detailed results CSV, for kaggle_boxscores",
+    )
+    parser.add_argument(
+        "--n-workers",
+        type=int,
+        default=4,
+        help="Seasons fetched and loaded at the same time",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Download the seasons again instead of reading the local file cache",
+    )
+    args = parser.parse_args()
+    if args.source == "kaggle_boxscores" and args.csv is None:
+        parser.error("--csv is required for kaggle_boxscores")
+    if args.source != "kaggle_boxscores" and args.seasons is None:
+        parser.error("--seasons is required for SportsDataVerse sources")
+    return args
+
+
+def _cached_season(path, fetch, refresh=False):
+    """
+    Read a season shard from the local file cache, fetching and caching it if missing.
+
+    Args:
+        path (str): The Parquet file of the shard.
+        fetch (callable): Returns the shard's DataFrame when it is not cached.
+        refresh (bool, optional): If True, fetch the shard even if it is cached. Default is False.
+
+    Returns:
+        pandas.DataFrame: The season's rows.
+    """
+    if os.path.exists(path) and not refresh:
+        return pd.read_parquet(path)
+
+    df = fetch()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return df
+
+
+def fetch_sdv_boxscore_season(season, cache_dir=RAW_CACHE_DIR, refresh=False):
+    """
+    Fetch one season of SportsDataVerse team boxscores in the layout of boxscores_sdv.
+
+    Args:
+        season (int): The season to fetch.
+        cache_dir (str, optional): The local file cache. Default is data/raw.
+        refresh (bool, optional): If True, download the season even if it is cached.
+
+    Returns:
+        pandas.DataFrame: The season's boxscores.
+    """
+
+    def fetch():
+        import sportsdataverse
+
+        df = sportsdataverse.mbb.load_mbb_team_boxscore(
+            seasons=[season], return_as_pandas=True
+        )
+
+        # Boxscores before 2024 do not have these columns
+        if season < 2024:
+            df["fast_break_points"] = None
+            df["points_in_paint"] = None
+            df["turnover_points"] = None
+        return df
+
+    path = os.path.join(cache_dir, "sdv", f"boxscores_{season}.parquet")
+    return _cached_season(path, fetch, refresh=refresh)
+
+
+def fetch_sdv_schedule_season(season, cache_dir=RAW_CACHE_DIR, refresh=False):
+    """
+    Fetch one season of the SportsDataVerse schedule in the layout of schedule_sdv.
+
+    Args:
+        season (int): The season to fetch.
+        cache_dir (str, optional): The local file cache. Default is data/raw.
+        refresh (bool, optional): If True, download the season even if it is cached.
+
+    Returns:
+        pandas.DataFrame: The season's schedule with a DayNum column.
+    """
+
+    def fetch():
+        import sportsdataverse
+
+        # TODO: fix for pre-2024
+        df = sportsdataverse.mbb.load_mbb_schedule(
+            seasons=[season], return_as_pandas=True
+        )
+
+        # Caluclate a DayNum for the season
+        df["start_date"] = pd.to_datetime(df["start_date"])
+        df["season_start_date"] = df["start_date"].min()
+        df["DayNum"] = (df["start_date"] - df["season_start_date"]).dt.days
+        return df
+
+    path = os.path.join(cache_dir, "sdv", f"schedule_{season}.parquet")
+    return _cached_season(path, fetch, refresh=refresh)
+
+
+def split_kaggle_seasons(csv_path, cache_dir=RAW_CACHE_DIR):
+    """
+    Split a Kaggle detailed results CSV into one cached shard per season.
+
+    Args:
+        csv_path (str): The path of e.g. MRegularSeasonDetailedResults.csv.
+        cache_dir (str, optional): The local file cache. Default is data/raw.
+
+    Returns:
+        list: The seasons in the file.
+    """
+    shard_dir = os.path.join(cache_dir, "kaggle")
+    os.makedirs(shard_dir, exist_ok=True)
+
+    seasons = []
+    for season, df in pd.read_csv(csv_path).groupby("Season"):
+        path = os.path.join(shard_dir, f"boxscores_{season}.parquet")
+        df.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        seasons.append(int(season))
+    return seasons
+
+
+def fetch_kaggle_boxscore_season(season, cache_dir=RAW_CACHE_DIR, refresh=False):
+    """
+    Read one season of Kaggle boxscores split by split_kaggle_seasons.
+
+    Args:
+        season (int): The season to read.
+        cache_dir (str, optional): The local file cache. Default is data/raw.
+        refresh (bool, optional): Unused, as Kaggle shards are rewritten by split_kaggle_seasons.
+
+    Returns:
+        pandas.DataFrame: The season's boxscores.
+    """
+    return pd.read_parquet(
+        os.path.join(cache_dir, "kaggle", f"boxscores_{season}.parquet")
+    )
+
+
+def create_natural_key_index(table_name, config):
+    """
+    Add a unique index on a table's natural key, removing duplicate rows first.
+
+    Tables loaded by earlier versions of initialize_datasets may hold the same row
+    several times; all but one copy of each key are deleted so the index can be built.
+
+    Args:
+        table_name (str): The table, one of NATURAL_KEYS.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+    """
+    key_columns = NATURAL_KEYS[table_name]
+    same_key = " AND ".join(f"a.{col} = b.{col}" for col in key_columns)
+    execute_sql_query(
+        **config,
+        query=f"""
+        DELETE FROM {table_name} a USING {table_name} b
+        WHERE a.ctid < b.ctid AND {same_key};
+        CREATE UNIQUE INDEX IF NOT EXISTS {table_name}_natural_key
+            ON {table_name} ({", ".join(key_columns)});
+        """,
+    )
+
+
+def load_season_shard(df, table_name, key_columns, config, batch_size=50000):
+    """
+    Upsert one season's shard into a table on its natural key.
+
+    The shard is copied into a temporary staging table on its own pooled
+    connection in batches of batch_size rows. Each batch is merged with
+    INSERT ... ON CONFLICT DO UPDATE, which only writes rows that are new or
+    whose values changed, so reloading a season is safe and leaves unchanged
+    rows untouched. If any step fails the whole shard is rolled back and the
+    error is raised.
+
+    Args:
+        df (pandas.DataFrame): The season's rows.
+        table_name (str): The table to load into.
+        key_columns (list): The table's natural key, e.g. NATURAL_KEYS[table_name].
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        batch_size (int, optional): Rows staged and merged at a time. Default is 50000.
+
+    Returns:
+        pandas.DataFrame: The key columns of every row that was inserted or updated.
+
+    Raises:
+        psycopg2.Error: If staging or merging the shard fails.
+    """
+    staging_table_name = f"{table_name}_staging"
+    keys = ", ".join(key_columns)
+    cols = ", ".join(df.columns)
+    value_cols = [col for col in df.columns if col.lower() not in key_columns]
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in value_cols)
+    current = ", ".join(f"{table_name}.{col}" for col in value_cols)
+    excluded = ", ".join(f"EXCLUDED.{col}" for col in value_cols)
+
+    changed = []
+    with pooled_connection(config) as conn:
+        execute_sql_query(
+            **config,
+            query=f"""
+            CREATE TEMP TABLE {staging_table_name}
+                (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP;
+            """,
+            conn=conn,
+        )
+        for start in range(0, len(df), batch_size):
+            execute_sql_query(
+                **config, query=f"TRUNCATE {staging_table_name};", conn=conn
+            )
+            copy_dataframe(
+                df.iloc[start : start + batch_size],
+                staging_table_name,
+                config,
+                conn=conn,
+            )
+            # Keep one row per key, as a key can only be merged once per statement
+            changed.append(
+                execute_sql_query(
+                    **config,
+                    query=f"""
+                    INSERT INTO {table_name} ({cols})
+                    SELECT DISTINCT ON ({keys}) {cols} FROM {staging_table_name}
+                    ON CONFLICT ({keys}) DO UPDATE SET {updates}
+                    WHERE ({current}) IS DISTINCT FROM ({excluded})
+                    RETURNING {keys};
+                    """,
+                    return_pandas=True,
+                    conn=conn,
+                )
+            )
+
+    changed = [batch for batch in changed if len(batch)]
+    if not changed:
+        return pd.DataFrame(columns=key_columns)
+    return pd.concat(changed, ignore_index=True)
+
+
+def ingest_seasons(
+    seasons,
+    fetch_season,
+    table_name,
+    config,
+    n_workers=4,
+    refresh=False,
+):
+    """
+    Fetch and upsert seasons in parallel, one season per task.
+
+    Each worker holds only the season it is loading, so adding a season never
+    needs every season in memory.
+
+    Args:
+        seasons (list): The seasons to load.
+        fetch_season (callable): fetch_season(season, refresh=...) returns one season's rows.
+        table_name (str): The table to load into, one of NATURAL_KEYS.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        n_workers (int, optional): Seasons loaded at the same time. Default is 4.
+        refresh (bool, optional): If True, download seasons even if they are cached.
+
+    Returns:
+        pandas.DataFrame: The natural keys of every row that was inserted or updated.
+            update_training_data_table does not need them, as it finds the team
+            seasons to rebuild from their boxscore hashes.
+
+    Raises:
+        psycopg2.Error: If any season fails to load. Seasons that loaded are kept.
+    """
+    key_columns = NATURAL_KEYS[table_name]
+
+    def ingest_season(season):
+        df = fetch_season(season, refresh=refresh)
+        changed = load_season_shard(df, table_name, key_columns, config)
+        print(
+            f"Loaded {len(df)} rows of season {season} into {table_name}, "
+            f"{len(changed)} new or changed"
+        )
+        return changed
+
+    with ThreadPoolExecutor(
+        max_workers=min(n_workers, get_pool_max_connections())
+    ) as executor:
+        changed = list(executor.map(ingest_season, seasons))
+
+    return pd.concat(changed, ignore_index=True)
+
+
+if __name__ == "__main__":
+    # Load up args, configs, environment vars
+    args = parse_arguments()
+    load_dotenv()
+    config = load_config()
+
+    if args.source == "sdv_boxscores":
+        ingest_seasons(
+            args.seasons,
+            fetch_sdv_boxscore_season,
+            "boxscores_sdv",
+            config,
+            n_workers=args.n_workers,
+            refresh=args.refresh,
+        )
+    elif args.source == "sdv_schedule":
+        ingest_seasons(
+            args.seasons,
+            fetch_sdv_schedule_season,
+            "schedule_sdv",
+            config,
+            n_workers=args.n_workers,
+            refresh=args.refresh,
+        )
+    else:
+        seasons = split_kaggle_seasons(args.csv)
+        ingest_seasons(
+            args.seasons or seasons,
+            fetch_kaggle_boxscore_season,
+            "boxscores_kaggle",
+            config,
+            n_workers=args.n_workers,
+        )
@@ -1,10 +1,17 @@
 from dotenv import load_dotenv
 import pandas as pd
 from psycopg2.extensions import register_adapter, AsIs
-import sportsdataverse
 from zipfile import ZipFile
 
-from ..utils import create_table, insert_dataframe, load_config
+from ..utils import create_table, execute_sql_query, load_config
+from .ingest import (
+    create_natural_key_index,
+    fetch_kaggle_boxscore_season,
+    fetch_sdv_boxscore_season,
+    fetch_sdv_schedule_season,
+    ingest_seasons,
+    split_kaggle_seasons,
+)
 
 
 def create_kaggle_boxscore_table(config):
@@ -16,7 +23,7 @@ def create_kaggle_boxscore_table(config):
     """
     table_name = "boxscores_kaggle"
     table_definition = """
-        CREATE TABLE boxscores_kaggle (
+        CREATE TABLE IF NOT EXISTS boxscores_kaggle (
             Season INTEGER,
             DayNum INTEGER,
             WTeamID INTEGER,
@@ -53,6 +60,7 @@ def create_kaggle_boxscore_table(config):
             LPF INTEGER)
     """
     create_table(**config, table_name=table_name, table_definition=table_definition)
+    create_natural_key_index(table_name, config)
 
 
 def get_and_populate_kaggle_data(config):
@@ -73,11 +81,12 @@ def get_and_populate_kaggle_data(config):
     with ZipFile("data/external/march-machine-learning-mania-2024.zip", "r") as zObject:
         zObject.extractall(path="data/external/march-machine-learning-mania-2024")
 
-    df = pd.read_csv(
+    # Split the results by season and load the seasons in parallel
+    seasons = split_kaggle_seasons(
         "data/external/march-machine-learning-mania-2024/MRegularSeasonDetailedResults.csv"
     )
     table_name = "boxscores_kaggle"
-    insert_dataframe(df, table_name, config)
+    ingest_seasons(seasons, fetch_kaggle_boxscore_season, table_name, config)
 
 
 def create_sdv_boxscore_table(config):
@@ -89,7 +98,7 @@ def create_sdv_boxscore_table(config):
     """
     table_name = "boxscores_sdv"
     table_definition = """
-        CREATE TABLE boxscores_sdv (
+        CREATE TABLE IF NOT EXISTS boxscores_sdv (
             game_id INTEGER,
             season INTEGER,
             season_type INTEGER,
@@ -149,36 +158,22 @@ def create_sdv_boxscore_table(config):
             opponent_team_score INTEGER)
     """
     create_table(**config, table_name=table_name, table_definition=table_definition)
+    create_natural_key_index(table_name, config)
 
 
 def get_and_populate_sdv_data(seasons, config):
     """
     Populate the 'boxscores_sdv' table with data from the SportsDataVerse API.
 
+    Each season is fetched (or read from the local file cache) and upserted on its own,
+    so rerunning only writes new or changed rows.
+
     Args:
         seasons (list): A list of seasons for which to retrieve data.
         config (dict): A dictionary containing the PostgreSQL database configuration parameters.
     """
-    pre_24_seasons = [x for x in seasons if x < 2024]
-    post_24_seasons = [x for x in seasons if x >= 2024]
-
-    # pre 2024
-    pre_mbb_df = sportsdataverse.mbb.load_mbb_team_boxscore(
-        seasons=pre_24_seasons, return_as_pandas=True
-    )
-    pre_mbb_df["fast_break_points"] = None
-    pre_mbb_df["points_in_paint"] = None
-    pre_mbb_df["turnover_points"] = None
-
-    # post 2024
-    post_mbb_df = sportsdataverse.mbb.load_mbb_team_boxscore(
-        seasons=post_24_seasons, return_as_pandas=True
-    )
-
-    sdv_df = pd.concat([pre_mbb_df, post_mbb_df])
-
     table_name = "boxscores_sdv"
-    insert_dataframe(sdv_df, table_name, config)
+    ingest_seasons(seasons, fetch_sdv_boxscore_season, table_name, config)
 
 
 def create_training_run_table(config):
@@ -190,14 +185,16 @@ def create_training_run_table(config):
     """
     table_name = "training_runs"
     table_definition = f"""
-        CREATE TABLE {table_name} (
+        CREATE TABLE IF NOT EXISTS {table_name} (
             trainingTimestamp TIMESTAMP,
             fileLocation VARCHAR,
             iterationCounts INTEGER,
             valMae DOUBLE PRECISION,
-            trainingExamples INTEGER)
+            trainingExamples INTEGER,
+            runId VARCHAR)
     """
     create_table(**config, table_name=table_name, table_definition=table_definition)
+    add_run_id_column(table_name, "runId", config)
 
 
 def create_sdv_schedule_table(config):
@@ -209,7 +206,7 @@ def create_sdv_schedule_table(config):
     """
     table_name = "schedule_sdv"
     table_definition = f"""
-        CREATE TABLE {table_name} (
+        CREATE TABLE IF NOT EXISTS {table_name} (
             id INTEGER,
             uid TEXT,  
             date TEXT,
@@ -299,36 +296,23 @@ def create_sdv_schedule_table(config):
             daynum BIGINT)
     """
     create_table(**config, table_name=table_name, table_definition=table_definition)
+    create_natural_key_index(table_name, config)
 
 
 def get_and_populate_sdv_schedule_data(seasons, config):
     """
     Populate the 'schedule_sdv' table with schedule data from the SportsDataVerse API.
 
+    Each season is fetched (or read from the local file cache) and upserted on its own,
+    so rerunning only writes new or changed rows.
+
     Args:
         seasons (list): A list of seasons for which to retrieve schedule data.
         config (dict): A dictionary containing the PostgreSQL database configuration parameters.
     """
-
-    # TODO: fix for pre-2024
-    sched_df = sportsdataverse.mbb.load_mbb_schedule(
-        seasons=seasons, return_as_pandas=True
-    )
-
-    # Caluclate a DayNum for the season
-    sched_df["start_date"] = pd.to_datetime(sched_df["start_date"])
-    season_start_dates = (
-        sched_df.groupby("season")["start_date"].min().rename("season_start_date")
-    )
-    sched_df = sched_df.merge(
-        season_start_dates, how="left", left_on="season", right_index=True
-    )
-    sched_df["DayNum"] = (
-        sched_df["start_date"] - sched_df["season_start_date"]
-    ).dt.days
-
     table_name = "schedule_sdv"
-    insert_dataframe(sched_df, table_name, config)
+    ingest_seasons(seasons, fetch_sdv_schedule_season, table_name, config)
+
 
 def create_predictions_table(config):
     """
@@ -339,18 +323,51 @@ def create_predictions_table(config):
     """
     table_name = "predictions"
     table_definition = f"""
-        CREATE TABLE {table_name} (
+        CREATE TABLE IF NOT EXISTS {table_name} (
             t1_teamid INTEGER,
             t2_teamid INTEGER,
             pred_spread DOUBLE PRECISION,
+            win_prob DOUBLE PRECISION,
             season INTEGER,
             daynum INTEGER,
             id INTEGER,
             game_id INTEGER,
             home_display_name TEXT,
-            away_display_name TEXT)
+            away_display_name TEXT,
+            run_id TEXT)
     """
-    create_table(**config, table_name=table_name, table_definition=table_definition)    
+    create_table(**config, table_name=table_name, table_definition=table_definition)
+    add_win_prob_column(table_name, config)
+    add_run_id_column(table_name, "run_id", config)
+
+
+def add_win_prob_column(table_name, config):
+    """
+    Add the calibrated win probability column to a predictions table created without it.
+
+    Args:
+        table_name (str): The name of the table.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+    """
+    execute_sql_query(
+        **config,
+        query=f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS win_prob DOUBLE PRECISION;",
+    )
+
+
+def add_run_id_column(table_name, column_name, config):
+    """
+    Add the run id column that links rows to a run's metrics to a table created without it.
+
+    Args:
+        table_name (str): The name of the table.
+        column_name (str): The name of the run id column.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+    """
+    execute_sql_query(
+        **config,
+        query=f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column_name} TEXT;",
+    )
 
 
 if __name__ == "__main__":
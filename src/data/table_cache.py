@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..utils import copy_sql_query, execute_sql_query
+
+CACHE_DIR = "data/cache"
+
+
+def get_source_watermark(config, source_table):
+    """
+    Get a watermark that changes whenever rows of a table are inserted, updated or deleted.
+
+    The watermark is the row count and the newest xmin, the id of the transaction
+    that wrote a row. Every insert or update writes a row with a new xmin and every
+    delete lowers the count, but only the row headers are read, so it costs a small
+    fraction of hashing the rows.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        source_table (str): The name of the table.
+
+    Returns:
+        list or None: The row count and the newest xmin, or None if the table does not exist.
+    """
+    watermark_query = f"""
+    SELECT COUNT(*), MAX(xmin::text::bigint) FROM {source_table};
+    """
+    results = execute_sql_query(**config, query=watermark_query)
+    if not results:
+        return None
+    return [None if value is None else int(value) for value in results[0]]
+
+
+def load_cached_table(config, cache_name, query, source_tables, cache_dir=CACHE_DIR):
+    """
+    Load the results of a query from a local Parquet cache, refreshing it when the sources change.
+
+    The cache is keyed by cache_name, a hash of the query and the watermarks of
+    source_tables, so added, removed and updated rows all invalidate it. When they
+    all match, the Parquet file is memory-mapped and the database is only asked for
+    the watermarks. Otherwise the query is run with COPY TO STDOUT and the cache is
+    rewritten.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        cache_name (str): The name of the cache file, e.g. the table being loaded.
+        query (str): The SELECT query whose results are cached.
+        source_tables (list): Tables whose contents invalidate the cache when they change.
+        cache_dir (str, optional): The directory holding the cache files. Default is data/cache.
+
+    Returns:
+        pandas.DataFrame: The query results.
+
+    Raises:
+        RuntimeError: If a source table does not exist or the query fails.
+    """
+    data_path = os.path.join(cache_dir, f"{cache_name}.parquet")
+    metadata_path = os.path.join(cache_dir, f"{cache_name}.json")
+
+    metadata = {
+        "query_hash": hashlib.sha256(query.encode()).hexdigest(),
+        "watermarks": {
+            table: get_source_watermark(config, table) for table in source_tables
+        },
+    }
+    missing = [
+        table for table, watermark in metadata["watermarks"].items() if not watermark
+    ]
+    if missing:
+        raise RuntimeError(
+            f"Could not find {', '.join(missing)} for the {cache_name} cache"
+        )
+
+    if os.path.exists(data_path) and os.path.exists(metadata_path):
+        with open(metadata_path, "r") as fd:
+            cached_metadata = json.load(fd)
+        if cached_metadata == metadata:
+            return pq.read_table(data_path, memory_map=True).to_pandas()
+
+    # copy_sql_query returns a DataFrame without columns when the query fails
+    results = copy_sql_query(config, query)
+    if results.columns.empty:
+        raise RuntimeError(f"Could not load {cache_name}; the cache was not updated")
+
+    # Write to temporary files first so an interrupted refresh never leaves a bad cache
+    os.makedirs(cache_dir, exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(results), data_path + ".tmp")
+    with open(metadata_path + ".tmp", "w") as fd:
+        json.dump(metadata, fd)
+    os.replace(data_path + ".tmp", data_path)
+    os.replace(metadata_path + ".tmp", metadata_path)
+
+    return results
@@ -1,6 +1,37 @@
+import argparse
 from dotenv import load_dotenv
 
-from ..utils import execute_sql_query, load_config
+from ..utils import (
+    copy_dataframe,
+    copy_sql_query,
+    execute_sql_query,
+    get_pool_stats,
+    load_config,
+    pooled_connection,
+)
+from .feature_engine import (
+    EWM_HALFLIVES,
+    ROLLING_WINDOWS,
+    SEASON_MEAN_FEATURES,
+    compute_rolling_features,
+    rolling_feature_names,
+)
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run the build_features script")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only add training data for game days newer than the existing tables",
+    )
+    return parser.parse_args()
 
 
 def transform_sdv_to_kaggle():
@@ -49,6 +80,8 @@ def transform_boxscore_to_recipricol(
         query=parameterized_recipricol_query,
     )
 
+    create_season_team_indexes(recipricol_boxscore_table_name)
+
 
 def create_training_data_table(recipricol_boxscore_table_name, training_data_tablename):
     """
@@ -84,44 +117,443 @@ def create_training_data_table(recipricol_boxscore_table_name, training_data_tab
     create_statement = f"CREATE TABLE {training_data_tablename} AS "
     insert_statement = f"INSERT INTO {training_data_tablename} "
 
-    for i in range(0, len(season_daynums)):
-        tmp_season = season_daynums[i][0]
-        tmp_daynum = season_daynums[i][1]
+    # All of the per-day queries share one pooled connection and transaction
+    with pooled_connection(config) as conn:
+        for i in range(0, len(season_daynums)):
+            tmp_season = season_daynums[i][0]
+            tmp_daynum = season_daynums[i][1]
+
+            # replace parameters in training data query
+            parameterized_training_data_query = (
+                training_data_query.replace(
+                    "RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER",
+                    recipricol_boxscore_table_name,
+                )
+                .replace("SEASON_PLACEHOLDER", str(tmp_season))
+                .replace("DAYNUM_PLACEHOLDER", str(tmp_daynum))
+            )
+
+            if i == 0:
+                parameterized_training_data_query = (
+                    create_statement + parameterized_training_data_query
+                )
+            else:
+                parameterized_training_data_query = (
+                    insert_statement + parameterized_training_data_query
+                )
 
-        # replace parameters in training data query
-        parameterized_training_data_query = (
-            training_data_query.replace(
-                "RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER",
-                recipricol_boxscore_table_name,
+            execute_sql_query(
+                database=config["database"],
+                user=config["user"],
+                password=config["password"],
+                host=config["host"],
+                port=config["port"],
+                query=parameterized_training_data_query,
+                conn=conn,
             )
-            .replace("SEASON_PLACEHOLDER", str(tmp_season))
-            .replace("DAYNUM_PLACEHOLDER", str(tmp_daynum))
+
+    create_season_team_indexes(training_data_tablename)
+
+
+def create_training_data_table_windowed(
+    recipricol_boxscore_table_name, training_data_tablename
+):
+    """
+    Creates the training data from the recipricol boxscores in a single statement
+
+    Produces the same table as create_training_data_table, but computes the
+    pre-game season means and 14 day win ratios for every game at once with
+    window aggregates instead of running one query per (Season, DayNum).
+
+    Args:
+        recipricol_boxscore_table_name (str): The name of the table with the recipricol boxscores.
+        training_data_tablename (str): The name of the table where the training data will go.
+    """
+    # Load the windowed training data query
+    with open("src/features/create_training_data_window.sql", "r") as fd:
+        training_data_query = fd.read()
+
+    parameterized_training_data_query = (
+        f"CREATE TABLE {training_data_tablename} AS "
+        + training_data_query.replace(
+            "RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER",
+            recipricol_boxscore_table_name,
         )
+    )
 
-        if i == 0:
-            parameterized_training_data_query = (
-                create_statement + parameterized_training_data_query
+    execute_sql_query(
+        database=config["database"],
+        user=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=config["port"],
+        query=parameterized_training_data_query,
+    )
+
+    create_season_team_indexes(training_data_tablename)
+
+    # The incremental refresh starts from the boxscores this table was built from
+    with open("src/features/team_boxscore_hashes.sql", "r") as fd:
+        team_hashes_query = fd.read()
+
+    execute_sql_query(
+        database=config["database"],
+        user=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=config["port"],
+        query=f"""
+        DROP TABLE IF EXISTS {training_data_tablename}_team_hashes;
+        CREATE TABLE {training_data_tablename}_team_hashes AS
+        """
+        + team_hashes_query.replace(
+            "RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER",
+            recipricol_boxscore_table_name,
+        ),
+    )
+
+
+def add_rolling_features(
+    recipricol_boxscore_table_name,
+    training_data_tablename,
+    windows=ROLLING_WINDOWS,
+    halflives=EWM_HALFLIVES,
+):
+    """
+    Adds the trailing window means and EWMAs of every stat to a training data table
+
+    The recipricol boxscores are read once and every rolling feature of every
+    team-day is computed in one sorted pass (see feature_engine._rolling_features).
+    The T1 and T2 columns are then added to the training data if missing and filled
+    from a staging table, only rewriting rows whose values changed.
+
+    Args:
+        recipricol_boxscore_table_name (str): The name of the table with the recipricol boxscores.
+        training_data_tablename (str): The name of the training data table.
+        windows (list, optional): Trailing windows in days. Default is ROLLING_WINDOWS.
+        halflives (list, optional): EWMA half-lives in game days. Default is EWM_HALFLIVES.
+    """
+    source_cols = [source for source, _ in SEASON_MEAN_FEATURES]
+    recipricol = copy_sql_query(
+        config,
+        f"""
+        SELECT Season, DayNum, T1_TeamID, T1_Score, T2_Score, {", ".join(source_cols)}
+        FROM {recipricol_boxscore_table_name}
+        ORDER BY Season, T1_TeamID, DayNum
+        """,
+    )
+    rolling = compute_rolling_features(recipricol, windows, halflives)
+
+    t1_columns = rolling_feature_names(windows, halflives)
+    t2_columns = [col.replace("t1_", "t2_", 1) for col in t1_columns]
+    staging_table_name = f"{training_data_tablename}_rolling_staging"
+
+    add_columns = ",\n".join(
+        f"ADD COLUMN IF NOT EXISTS {col} DOUBLE PRECISION"
+        for col in t1_columns + t2_columns
+    )
+    assignments = ",\n".join(
+        [f"{col} = r1.{col}" for col in t1_columns]
+        + [f"{t2} = r2.{t1}" for t1, t2 in zip(t1_columns, t2_columns)]
+    )
+    current = ", ".join(f"t.{col}" for col in t1_columns + t2_columns)
+    computed = ", ".join(
+        [f"r1.{col}" for col in t1_columns] + [f"r2.{col}" for col in t1_columns]
+    )
+
+    # The new columns and their values are committed together
+    with pooled_connection(config) as conn:
+        execute_sql_query(
+            **config,
+            query=f"""
+            ALTER TABLE {training_data_tablename}
+            {add_columns};
+
+            CREATE TEMP TABLE {staging_table_name} (
+                season INTEGER,
+                t1_teamid INTEGER,
+                daynum INTEGER,
+                {", ".join(f"{col} DOUBLE PRECISION" for col in t1_columns)},
+                PRIMARY KEY (season, t1_teamid, daynum)
+            ) ON COMMIT DROP;
+            """,
+            conn=conn,
+        )
+        copy_dataframe(rolling, staging_table_name, config, conn=conn)
+        execute_sql_query(
+            **config,
+            query=f"""
+            UPDATE {training_data_tablename} t SET
+            {assignments}
+            FROM {staging_table_name} r1, {staging_table_name} r2
+            WHERE t.Season = r1.season AND t.DayNum = r1.daynum AND t.T1_TeamID = r1.t1_teamid
+                AND t.Season = r2.season AND t.DayNum = r2.daynum AND t.T2_TeamID = r2.t1_teamid
+                AND ({current}) IS DISTINCT FROM ({computed});
+            """,
+            conn=conn,
+        )
+
+
+def create_season_team_indexes(table_name):
+    """
+    Creates B-tree indexes on (Season, DayNum) and (Season, T1_TeamID)
+
+    Args:
+        table_name (str): The name of a recipricol boxscore or training data table.
+    """
+    index_query = f"""
+    CREATE INDEX IF NOT EXISTS {table_name}_season_daynum_idx
+        ON {table_name} (Season, DayNum);
+    CREATE INDEX IF NOT EXISTS {table_name}_season_teamid_idx
+        ON {table_name} (Season, T1_TeamID);
+    """
+
+    execute_sql_query(
+        database=config["database"],
+        user=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=config["port"],
+        query=index_query,
+    )
+
+
+def refresh_team_feature_snapshot(training_data_tablename, snapshot_tablename):
+    """
+    Creates or refreshes the materialized view of each team's latest features per day
+
+    The view holds, for every (Season, DayNum) of the season, each team's latest
+    feature vector from games before that day, so feature lookups for predictions
+    are index scans instead of a MAX(DayNum) group-by over the training data.
+    A view without every rolling feature column is dropped and created again.
+
+    Args:
+        training_data_tablename (str): The name of the training data table.
+        snapshot_tablename (str): The name of the materialized view.
+    """
+    rolling_columns = rolling_feature_names()
+
+    if table_exists(snapshot_tablename) and set(rolling_columns) <= set(
+        get_columns(snapshot_tablename)
+    ):
+        snapshot_query = f"REFRESH MATERIALIZED VIEW CONCURRENTLY {snapshot_tablename};"
+    else:
+        with open("src/features/create_team_feature_snapshot.sql", "r") as fd:
+            snapshot_query = fd.read()
+        snapshot_query = (
+            f"DROP MATERIALIZED VIEW IF EXISTS {snapshot_tablename};\n"
+            + snapshot_query.replace(
+                "TRAINING_DATA_TABLE_NAME_PLACEHOLDER", training_data_tablename
             )
-        else:
-            parameterized_training_data_query = (
-                insert_statement + parameterized_training_data_query
+            .replace("SNAPSHOT_TABLE_NAME_PLACEHOLDER", snapshot_tablename)
+            .replace(
+                "LATEST_ROLLING_COLUMNS_PLACEHOLDER",
+                "".join(f", t.{col}" for col in rolling_columns),
+            )
+            .replace(
+                "ROLLING_COLUMNS_PLACEHOLDER",
+                "".join(f", {col}" for col in rolling_columns),
             )
+        )
 
-        execute_sql_query(
+    execute_sql_query(
+        database=config["database"],
+        user=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=config["port"],
+        query=snapshot_query,
+    )
+
+
+def get_columns(table_name):
+    """
+    Lists the columns of a table or materialized view
+
+    Args:
+        table_name (str): The name of the table or view.
+
+    Returns:
+        list: The column names.
+    """
+    results = execute_sql_query(
+        database=config["database"],
+        user=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=config["port"],
+        query=f"""
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = '{table_name}'::regclass AND attnum > 0 AND NOT attisdropped;
+        """,
+    )
+    return [row[0] for row in results]
+
+
+def table_exists(table_name):
+    """
+    Checks whether a table exists in the database
+
+    Args:
+        table_name (str): The name of the table.
+
+    Returns:
+        bool: True if the table exists.
+    """
+    results = execute_sql_query(
+        database=config["database"],
+        user=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=config["port"],
+        query=f"SELECT to_regclass('{table_name}') IS NOT NULL;",
+    )
+    return bool(results) and results[0][0]
+
+
+def drop_table(table_name):
+    """
+    Drops a table from the database if it exists
+
+    Args:
+        table_name (str): The name of the table.
+    """
+    execute_sql_query(
+        database=config["database"],
+        user=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=config["port"],
+        query=f"DROP TABLE IF EXISTS {table_name};",
+    )
+
+
+def update_training_data_table(recipricol_boxscore_table_name, training_data_tablename):
+    """
+    Rebuilds the training data of every team whose boxscores changed since the last build
+
+    A hash of each team's recipricol boxscores per season is kept in
+    <training_data_tablename>_team_hashes. Teams whose hash changed, from new games,
+    games loaded late, upserted boxscores or removed games, have every row they play
+    in deleted and built again with the windowed query over only their own and their
+    opponents' boxscores. Every feature is computed within a team's season, so the
+    rows match a full rebuild.
+
+    Args:
+        recipricol_boxscore_table_name (str): The name of the table with the recipricol boxscores.
+        training_data_tablename (str): The name of the training data table to update.
+
+    Returns:
+        int: The number of team seasons that were rebuilt.
+    """
+    if not table_exists(training_data_tablename):
+        create_training_data_table_windowed(
+            recipricol_boxscore_table_name, training_data_tablename
+        )
+        return 0
+
+    with open("src/features/team_boxscore_hashes.sql", "r") as fd:
+        team_hashes_query = fd.read()
+    with open("src/features/create_training_data_window.sql", "r") as fd:
+        training_data_query = fd.read()
+    with open("src/features/update_training_data.sql", "r") as fd:
+        update_query = fd.read()
+
+    # The windowed query only reads the boxscores of the teams being rebuilt
+    training_data_query = (
+        training_data_query.replace(
+            "RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER", "refresh_boxscores"
+        )
+        .strip()
+        .rstrip(";")
+    )
+
+    parameterized_update_query = (
+        "CREATE TEMPORARY TABLE current_team_hashes ON COMMIT DROP AS "
+        + team_hashes_query
+        + ";\n"
+        + update_query.replace(
+            "WINDOWED_TRAINING_DATA_QUERY_PLACEHOLDER", training_data_query
+        )
+    )
+    parameterized_update_query = (
+        parameterized_update_query.replace(
+            "RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER", recipricol_boxscore_table_name
+        )
+        .replace(
+            "TEAM_HASHES_TABLE_NAME_PLACEHOLDER",
+            f"{training_data_tablename}_team_hashes",
+        )
+        .replace("TRAINING_DATA_TABLE_NAME_PLACEHOLDER", training_data_tablename)
+    )
+
+    # The deleted and rebuilt rows and the new hashes are committed together
+    with pooled_connection(config) as conn:
+        results = execute_sql_query(
             database=config["database"],
             user=config["user"],
             password=config["password"],
             host=config["host"],
             port=config["port"],
-            query=parameterized_training_data_query,
+            query=parameterized_update_query,
+            conn=conn,
+        )
+
+    return results[0][0] if results else 0
+
+
+def count_training_data_differences(training_data_tablename, other_tablename):
+    """
+    Counts the rows that differ between two training data tables
+
+    Used to check that create_training_data_table_windowed reproduces
+    create_training_data_table on the same recipricol boxscores.
+
+    Args:
+        training_data_tablename (str): The name of the first training data table.
+        other_tablename (str): The name of the training data table to compare against.
+
+    Returns:
+        int: The number of rows found in only one of the two tables (0 when they match).
+    """
+    difference_query = f"""
+    SELECT COUNT(*) FROM (
+        (SELECT * FROM {training_data_tablename} EXCEPT ALL SELECT * FROM {other_tablename})
+        UNION ALL
+        (SELECT * FROM {other_tablename} EXCEPT ALL SELECT * FROM {training_data_tablename})
+    ) differences;
+    """
+
+    differences = execute_sql_query(
+        database=config["database"],
+        user=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=config["port"],
+        query=difference_query,
+    )
+    if not differences:
+        raise RuntimeError(
+            f"Could not compare {training_data_tablename} with {other_tablename}"
         )
+    return differences[0][0]
 
 
 if __name__ == "__main__":
-    # Load up configs, environment vars
+    # Load up args, configs, environment vars
+    args = parse_arguments()
     load_dotenv()
     config = load_config()
 
+    # The boxscore tables are cheap to rebuild; only the training data is incremental
+    if args.incremental:
+        for table_name in [
+            "boxscores_sdv_kagglestyle",
+            "boxscores_kaggle_recipricol",
+            "boxscores_sdv_kagglestyle_recipricol",
+        ]:
+            drop_table(table_name)
+
     # Transform SDV data to kaggle format
     transform_sdv_to_kaggle()
 
@@ -132,10 +564,30 @@ if __name__ == "__main__":
         "boxscores_sdv_kagglestyle", "boxscores_sdv_kagglestyle_recipricol"
     )
 
-    # Create training data from the kaggle dataset
-    create_training_data_table("boxscores_kaggle_recipricol", "training_data_kaggle")
+    if args.incremental:
+        # Rebuild the teams whose boxscores changed since the last build
+        for recipricol_table, training_table in [
+            ("boxscores_kaggle_recipricol", "training_data_kaggle"),
+            ("boxscores_sdv_kagglestyle_recipricol", "training_data_sdv"),
+        ]:
+            n_teams = update_training_data_table(recipricol_table, training_table)
+            print(f"Rebuilt {n_teams} team seasons of {training_table}")
+    else:
+        # Create training data from the kaggle dataset
+        create_training_data_table_windowed(
+            "boxscores_kaggle_recipricol", "training_data_kaggle"
+        )
 
-    # Create training data from the sdv dataset
-    create_training_data_table(
-        "boxscores_sdv_kagglestyle_recipricol", "training_data_sdv"
-    )
+        # Create training data from the sdv dataset
+        create_training_data_table_windowed(
+            "boxscores_sdv_kagglestyle_recipricol", "training_data_sdv"
+        )
+
+    # Fill the trailing window and EWMA features of new and changed rows
+    add_rolling_features("boxscores_kaggle_recipricol", "training_data_kaggle")
+    add_rolling_features("boxscores_sdv_kagglestyle_recipricol", "training_data_sdv")
+
+    # Keep the prediction feature snapshot in step with the training data
+    refresh_team_feature_snapshot("training_data_sdv", "team_features_sdv")
+
+    print("Connection pool stats:", get_pool_stats())
@@ -0,0 +1,88 @@
+CREATE MATERIALIZED VIEW SNAPSHOT_TABLE_NAME_PLACEHOLDER AS
+WITH team_days AS (
+    -- One feature vector per team and day played
+    SELECT DISTINCT ON (Season, T1_TeamID, DayNum)
+        Season,
+        DayNum,
+        T1_TeamID,
+        T1_FGMmean,
+        T1_FGAmean,
+        T1_FGM3mean,
+        T1_FGA3mean,
+        T1_ORmean,
+        T1_Astmean,
+        T1_TOmean,
+        T1_Stlmean,
+        T1_PFmean,
+        T1_PointDiffmean,
+        T1_opponent_FGMmean,
+        T1_opponent_FGAmean,
+        T1_opponent_FGM3mean,
+        T1_opponent_FGA3mean,
+        T1_opponent_ORmean,
+        T1_opponent_Astmean,
+        T1_opponent_TOmean,
+        T1_opponent_Stlmean,
+        T1_opponent_Blkmean,
+        T1_win_ratio_14d
+        -- Trailing window and EWMA features, listed by refresh_team_feature_snapshot
+        ROLLING_COLUMNS_PLACEHOLDER
+    FROM
+        TRAINING_DATA_TABLE_NAME_PLACEHOLDER
+    ORDER BY
+        Season, T1_TeamID, DayNum
+), season_days AS (
+    -- Every day a game could be predicted on, through the day after the latest game
+    SELECT
+        Season,
+        generate_series(MIN(DayNum) + 1, MAX(DayNum) + 1) AS DayNum
+    FROM
+        TRAINING_DATA_TABLE_NAME_PLACEHOLDER
+    GROUP BY
+        Season
+)
+SELECT
+    d.Season,
+    d.DayNum,
+    t.T1_TeamID,
+    t.DayNum AS last_DayNum,
+    t.T1_FGMmean,
+    t.T1_FGAmean,
+    t.T1_FGM3mean,
+    t.T1_FGA3mean,
+    t.T1_ORmean,
+    t.T1_Astmean,
+    t.T1_TOmean,
+    t.T1_Stlmean,
+    t.T1_PFmean,
+    t.T1_PointDiffmean,
+    t.T1_opponent_FGMmean,
+    t.T1_opponent_FGAmean,
+    t.T1_opponent_FGM3mean,
+    t.T1_opponent_FGA3mean,
+    t.T1_opponent_ORmean,
+    t.T1_opponent_Astmean,
+    t.T1_opponent_TOmean,
+    t.T1_opponent_Stlmean,
+    t.T1_opponent_Blkmean,
+    t.T1_win_ratio_14d
+    LATEST_ROLLING_COLUMNS_PLACEHOLDER
+FROM
+    season_days d
+    CROSS JOIN LATERAL (
+        -- Each team's latest feature vector before the day
+        SELECT DISTINCT ON (T1_TeamID)
+            *
+        FROM
+            team_days
+        WHERE
+            team_days.Season = d.Season AND team_days.DayNum < d.DayNum
+        ORDER BY
+            T1_TeamID, DayNum DESC
+    ) t;
+
+CREATE UNIQUE INDEX SNAPSHOT_TABLE_NAME_PLACEHOLDER_season_daynum_teamid_idx
+    ON SNAPSHOT_TABLE_NAME_PLACEHOLDER (Season, DayNum, T1_TeamID);
+
+CREATE INDEX SNAPSHOT_TABLE_NAME_PLACEHOLDER_season_teamid_daynum_idx
+    ON SNAPSHOT_TABLE_NAME_PLACEHOLDER (Season, T1_TeamID, DayNum);
\ No newline at end of file
@@ -0,0 +1,97 @@
+WITH team_game_statistics AS (
+    SELECT
+        Season,
+        DayNum,
+        T1_TeamID,
+        AVG(T1_FGM) OVER season_to_date AS T1_FGMmean,
+        AVG(T1_FGA) OVER season_to_date AS T1_FGAmean,
+        AVG(T1_FGM3) OVER season_to_date AS T1_FGM3mean,
+        AVG(T1_FGA3) OVER season_to_date AS T1_FGA3mean,
+        AVG(T1_OR) OVER season_to_date AS T1_ORmean,
+        AVG(T1_Ast) OVER season_to_date AS T1_Astmean,
+        AVG(T1_TO) OVER season_to_date AS T1_TOmean,
+        AVG(T1_Stl) OVER season_to_date AS T1_Stlmean,
+        AVG(T1_PF) OVER season_to_date AS T1_PFmean,
+        AVG(PointDiff) OVER season_to_date AS T1_PointDiffmean,
+        AVG(T2_FGM) OVER season_to_date AS T1_opponent_FGMmean,
+        AVG(T2_FGA) OVER season_to_date AS T1_opponent_FGAmean,
+        AVG(T2_FGM3) OVER season_to_date AS T1_opponent_FGM3mean,
+        AVG(T2_FGA3) OVER season_to_date AS T1_opponent_FGA3mean,
+        AVG(T2_OR) OVER season_to_date AS T1_opponent_ORmean,
+        AVG(T2_Ast) OVER season_to_date AS T1_opponent_Astmean,
+        AVG(T2_TO) OVER season_to_date AS T1_opponent_TOmean,
+        AVG(T2_Stl) OVER season_to_date AS T1_opponent_Stlmean,
+        AVG(T2_Blk) OVER season_to_date AS T1_opponent_Blkmean,
+        AVG(CASE WHEN (t1_score-t2_score) > 0 THEN 1 ELSE 0 END) OVER last14days AS T1_win_ratio_14d
+    FROM
+        RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER
+    WINDOW
+        -- Every earlier game day of the season (DayNum < the game DayNum)
+        season_to_date AS (
+            PARTITION BY Season, T1_TeamID ORDER BY DayNum
+            RANGE BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW EXCLUDE GROUP
+        ),
+        -- Matches create_training_data.sql, which only bounds DayNum from below
+        last14days AS (
+            PARTITION BY Season, T1_TeamID ORDER BY DayNum
+            RANGE BETWEEN 14 PRECEDING AND UNBOUNDED FOLLOWING
+        )
+), team_day_statistics AS (
+    -- Games on the same day share a window frame, so keep one row per team-day
+    SELECT DISTINCT
+        *
+    FROM
+        team_game_statistics
+)
+SELECT
+    b.Season,
+    b.DayNum,
+    b.location,
+    b.T1_TeamID,
+    b.T1_Score,
+    b.T2_TeamID,
+    b.T2_Score,
+    s1.T1_FGMmean,
+    s1.T1_FGAmean,
+    s1.T1_FGM3mean,
+    s1.T1_FGA3mean,
+    s1.T1_ORmean,
+    s1.T1_Astmean,
+    s1.T1_TOmean,
+    s1.T1_Stlmean,
+    s1.T1_PFmean,
+    s1.T1_PointDiffmean,
+    s1.T1_opponent_FGMmean,
+    s1.T1_opponent_FGAmean,
+    s1.T1_opponent_FGM3mean,
+    s1.T1_opponent_FGA3mean,
+    s1.T1_opponent_ORmean,
+    s1.T1_opponent_Astmean,
+    s1.T1_opponent_TOmean,
+    s1.T1_opponent_Stlmean,
+    s1.T1_opponent_Blkmean,
+    s2.T1_FGMmean AS T2_FGMmean,
+    s2.T1_FGAmean AS T2_FGAmean,
+    s2.T1_FGM3mean AS T2_FGM3mean,
+    s2.T1_FGA3mean AS T2_FGA3mean,
+    s2.T1_ORmean AS T2_ORmean,
+    s2.T1_Astmean AS T2_Astmean,
+    s2.T1_TOmean AS T2_TOmean,
+    s2.T1_Stlmean AS T2_Stlmean,
+    s2.T1_PFmean AS T2_PFmean,
+    s2.T1_PointDiffmean AS T2_PointDiffmean,
+    s2.T1_opponent_FGMmean AS T2_opponent_FGMmean,
+    s2.T1_opponent_FGAmean AS T2_opponent_FGAmean,
+    s2.T1_opponent_FGM3mean AS T2_opponent_FGM3mean,
+    s2.T1_opponent_FGA3mean AS T2_opponent_FGA3mean,
+    s2.T1_opponent_ORmean AS T2_opponent_ORmean,
+    s2.T1_opponent_Astmean AS T2_opponent_Astmean,
+    s2.T1_opponent_TOmean AS T2_opponent_TOmean,
+    s2.T1_opponent_Stlmean AS T2_opponent_Stlmean,
+    s2.T1_opponent_Blkmean AS T2_opponent_Blkmean,
+    s1.T1_win_ratio_14d,
+    s2.T1_win_ratio_14d AS T2_win_ratio_14d
+FROM
+    RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER b
+    LEFT JOIN team_day_statistics s1 ON b.Season = s1.Season AND b.DayNum = s1.DayNum AND b.T1_TeamID = s1.T1_TeamID
+    LEFT JOIN team_day_statistics s2 ON b.Season = s2.Season AND b.DayNum = s2.DayNum AND b.T2_TeamID = s2.T1_TeamID;
\ No newline at end of file
@@ -0,0 +1,443 @@
+import numpy as np
+import pandas as pd
+
+BOXSCORE_STATS = [
+    "FGM",
+    "FGA",
+    "FGM3",
+    "FGA3",
+    "FTM",
+    "FTA",
+    "OR",
+    "DR",
+    "Ast",
+    "TO",
+    "Stl",
+    "Blk",
+    "PF",
+]
+
+# The SportsDataVerse column of each boxscore statistic
+SDV_BOXSCORE_STATS = {
+    "FGM": "field_goals_made",
+    "FGA": "field_goals_attempted",
+    "FGM3": "three_point_field_goals_made",
+    "FGA3": "three_point_field_goals_attempted",
+    "FTM": "free_throws_made",
+    "FTA": "free_throws_attempted",
+    "OR": "offensive_rebounds",
+    "DR": "defensive_rebounds",
+    "Ast": "assists",
+    "TO": "turnovers",
+    "Stl": "steals",
+    "Blk": "blocks",
+    "PF": "fouls",
+}
+
+# (source column in the recipricol boxscores, feature name for T1)
+SEASON_MEAN_FEATURES = [
+    ("t1_fgm", "t1_fgmmean"),
+    ("t1_fga", "t1_fgamean"),
+    ("t1_fgm3", "t1_fgm3mean"),
+    ("t1_fga3", "t1_fga3mean"),
+    ("t1_or", "t1_ormean"),
+    ("t1_ast", "t1_astmean"),
+    ("t1_to", "t1_tomean"),
+    ("t1_stl", "t1_stlmean"),
+    ("t1_pf", "t1_pfmean"),
+    ("pointdiff", "t1_pointdiffmean"),
+    ("t2_fgm", "t1_opponent_fgmmean"),
+    ("t2_fga", "t1_opponent_fgamean"),
+    ("t2_fgm3", "t1_opponent_fgm3mean"),
+    ("t2_fga3", "t1_opponent_fga3mean"),
+    ("t2_or", "t1_opponent_ormean"),
+    ("t2_ast", "t1_opponent_astmean"),
+    ("t2_to", "t1_opponent_tomean"),
+    ("t2_stl", "t1_opponent_stlmean"),
+    ("t2_blk", "t1_opponent_blkmean"),
+]
+
+GAME_COLUMNS = [
+    "season",
+    "daynum",
+    "location",
+    "t1_teamid",
+    "t1_score",
+    "t2_teamid",
+    "t2_score",
+]
+
+WIN_RATIO_DAYS = 14
+
+# Trailing windows, in days, and EWMA half-lives, in game days, of the rolling features
+ROLLING_WINDOWS = [7, 14, 30]
+EWM_HALFLIVES = [5]
+
+
+def sdv_to_kaggle(boxscores):
+    """
+    Converts SportsDataVerse team boxscores to Kaggle-format boxscores, mirroring sdv_to_kaggle_query.sql
+
+    Args:
+        boxscores (pandas.DataFrame): Team boxscores in the layout of boxscores_sdv, two
+            rows per game.
+
+    Returns:
+        pandas.DataFrame: One row per game with the columns of MRegularSeasonDetailedResults.csv.
+    """
+    boxscores = boxscores.rename(columns=str.lower)
+
+    # DayNum counts days from each season's first game
+    game_date = pd.to_datetime(boxscores["game_date"])
+    season_start_date = game_date.groupby(boxscores["season"]).transform("min")
+    daynum = (game_date - season_start_date).dt.days
+
+    def one_side(winner, prefix):
+        side = boxscores[boxscores["team_winner"] == winner]
+        columns = {
+            "game_id": side["game_id"].values,
+            "Season": side["season"].values,
+            "DayNum": daynum[side.index].values,
+            f"{prefix}TeamID": side["team_id"].values,
+            f"{prefix}Score": side["team_score"].values,
+        }
+        if winner:
+            columns["WLoc"] = (
+                side["team_home_away"].map({"home": "H", "away": "A"}).fillna("N")
+            ).values
+        for stat, sdv_column in SDV_BOXSCORE_STATS.items():
+            columns[prefix + stat] = side[sdv_column].values
+        return pd.DataFrame(columns)
+
+    games = one_side(True, "W").merge(
+        one_side(False, "L"), how="outer", on=["game_id", "Season", "DayNum"]
+    )
+    games["NumOT"] = 0  # Placeholder, since transformation doesn't calculate it
+
+    stat_columns = [side + stat for side in ["W", "L"] for stat in BOXSCORE_STATS]
+    return games[
+        ["Season", "DayNum", "WTeamID", "WScore", "LTeamID", "LScore", "WLoc", "NumOT"]
+        + stat_columns
+    ]
+
+
+def swap_boxscores(boxscores):
+    """
+    Creates the recipricol boxscores for each game boxscore, mirroring swap_boxscores.sql
+
+    Args:
+        boxscores (pandas.DataFrame): Kaggle-format boxscores (Season, DayNum, WTeamID, ...).
+            Column names are matched case-insensitively.
+
+    Returns:
+        pandas.DataFrame: Two rows per game, one from each team's point of view, with
+            the same lower-case columns as the recipricol boxscore tables.
+    """
+    boxscores = boxscores.rename(columns=str.lower)
+
+    def one_side(t1, t2, location_map):
+        side = pd.DataFrame(
+            {
+                "season": boxscores["season"].values,
+                "daynum": boxscores["daynum"].values,
+                "t2_teamid": boxscores[f"{t2}teamid"].values,
+                "t2_score": boxscores[f"{t2}score"].values,
+                "t1_teamid": boxscores[f"{t1}teamid"].values,
+                "t1_score": boxscores[f"{t1}score"].values,
+                "location": boxscores["wloc"].map(location_map).values,
+                "numot": boxscores["numot"].values,
+            }
+        )
+        for team, prefix in [(t2, "t2_"), (t1, "t1_")]:
+            for stat in BOXSCORE_STATS:
+                side[prefix + stat.lower()] = boxscores[team + stat.lower()].values
+        side["pointdiff"] = side["t1_score"] - side["t2_score"]
+        return side
+
+    w_t1_l_t2 = one_side("w", "l", {"H": 1, "A": -1, "N": 0})
+    w_t2_l_t1 = one_side("l", "w", {"H": -1, "A": 1, "N": 0})
+
+    return pd.concat([w_t1_l_t2, w_t2_l_t1], ignore_index=True)
+
+
+def _team_day_statistics(recipricol):
+    """
+    Aggregates the recipricol boxscores to one row per (season, team, daynum)
+
+    Args:
+        recipricol (pandas.DataFrame): The recipricol boxscores.
+
+    Returns:
+        pandas.DataFrame: Per team-day sums, non-null counts and wins/games, sorted by
+            season, t1_teamid and daynum.
+    """
+    source_cols = [source for source, _ in SEASON_MEAN_FEATURES]
+    team_games = recipricol[["season", "t1_teamid", "daynum"] + source_cols].copy()
+    team_games["win"] = ((recipricol["t1_score"] - recipricol["t2_score"]) > 0).astype(
+        np.int64
+    )
+    team_games["games"] = 1
+
+    grouped = team_games.groupby(["season", "t1_teamid", "daynum"], sort=True)
+    sums = grouped[source_cols + ["win", "games"]].sum(min_count=0)
+    counts = grouped[source_cols].count().add_suffix("_count")
+    return pd.concat([sums, counts], axis=1).reset_index()
+
+
+def _win_ratio_from_day(team_days, first_day):
+    """
+    Computes each team-day's win ratio over the team's games on or after first_day
+
+    Mirrors the last14days_stats_T1 CTE in create_training_data.sql, which only bounds
+    DayNum from below. Uses a single searchsorted over the cumulative wins per team.
+
+    Args:
+        team_days (pandas.DataFrame): Output of _team_day_statistics.
+        first_day (numpy.ndarray): The first DayNum to include for each team-day row.
+
+    Returns:
+        numpy.ndarray: The win ratio for each team-day row.
+    """
+    group_ids = team_days.groupby(["season", "t1_teamid"], sort=False).ngroup().values
+    daynums = team_days["daynum"].values.astype(np.int64)
+
+    # Cumulative wins/games through each day, plus season totals per team
+    cum_wins = team_days.groupby(group_ids)["win"].cumsum().values
+    cum_games = team_days.groupby(group_ids)["games"].cumsum().values
+    total_wins = team_days.groupby(group_ids)["win"].transform("sum").values
+    total_games = team_days.groupby(group_ids)["games"].transform("sum").values
+
+    # Sorted composite key so one searchsorted finds the last day before first_day
+    span = int(daynums.max() - min(daynums.min(), first_day.min())) + 2
+    offset = min(daynums.min(), first_day.min())
+    keys = group_ids.astype(np.int64) * span + (daynums - offset)
+    queries = group_ids.astype(np.int64) * span + (first_day - 1 - offset)
+    positions = np.searchsorted(keys, queries, side="right") - 1
+
+    in_group = (positions >= 0) & (group_ids[np.clip(positions, 0, None)] == group_ids)
+    wins_before = np.where(in_group, cum_wins[np.clip(positions, 0, None)], 0)
+    games_before = np.where(in_group, cum_games[np.clip(positions, 0, None)], 0)
+
+    return (total_wins - wins_before) / (total_games - games_before)
+
+
+def _rolling_sources():
+    """
+    Lists the (sum column, count column, feature) triples the rolling features average
+
+    Returns:
+        list: Every season mean feature plus the win ratio, as t1_winmean.
+    """
+    sources = [
+        (source, source + "_count", feature) for source, feature in SEASON_MEAN_FEATURES
+    ]
+    return sources + [("win", "games", "t1_winmean")]
+
+
+def rolling_feature_names(windows=ROLLING_WINDOWS, halflives=EWM_HALFLIVES):
+    """
+    Names the T1 rolling feature columns
+
+    Args:
+        windows (list, optional): Trailing windows in days. Default is ROLLING_WINDOWS.
+        halflives (list, optional): EWMA half-lives in game days. Default is EWM_HALFLIVES.
+
+    Returns:
+        list: e.g. t1_fgmmean_7d for a 7 day mean and t1_fgmmean_ewm5 for an EWMA.
+    """
+    suffixes = [f"_{window}d" for window in windows] + [
+        f"_ewm{halflife}" for halflife in halflives
+    ]
+    return [
+        feature + suffix for _, _, feature in _rolling_sources() for suffix in suffixes
+    ]
+
+
+def _rolling_features(team_days, windows=ROLLING_WINDOWS, halflives=EWM_HALFLIVES):
+    """
+    Computes trailing window means and EWMAs of every stat for each team-day
+
+    Every feature only sees the team's earlier game days. All of them come from
+    prefix sums over the team-days sorted by (season, team, daynum): a trailing
+    window is the difference of two prefix sums, with its first day found by one
+    searchsorted, and an EWMA is a ratio of exponentially weighted prefix sums.
+
+    Args:
+        team_days (pandas.DataFrame): Output of _team_day_statistics.
+        windows (list, optional): Trailing windows in days. A window of W days covers
+            the game days from DayNum - W to DayNum - 1. Default is ROLLING_WINDOWS.
+        halflives (list, optional): EWMA half-lives in game days, weighting each earlier
+            game day's mean like pandas' ewm(halflife=...). Default is EWM_HALFLIVES.
+
+    Returns:
+        pandas.DataFrame: season, t1_teamid, daynum and rolling_feature_names columns,
+            in the order of team_days.
+    """
+    group_ids = (
+        team_days.groupby(["season", "t1_teamid"], sort=False).ngroup().values
+    ).astype(np.int64)
+    daynums = team_days["daynum"].values.astype(np.int64)
+    n_rows = len(team_days)
+
+    # Row where each team's season starts and each row's game day within it
+    group_starts = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+    first_row = group_starts[group_ids]
+    game_day = np.arange(n_rows) - first_row
+
+    # Sorted composite key so one searchsorted finds each window's first row
+    max_window = max(windows, default=0)
+    offset = daynums.min() - max_window
+    span = int(daynums.max() - offset) + 1
+    keys = group_ids * span + (daynums - offset)
+    window_starts = {
+        window: np.searchsorted(keys, keys - window, side="left") for window in windows
+    }
+
+    def prefix(values):
+        return np.concatenate([[0.0], np.cumsum(values)])
+
+    features = {}
+    rows = np.arange(n_rows)
+    for sum_col, count_col, feature in _rolling_sources():
+        sums = team_days[sum_col].values.astype(np.float64)
+        counts = team_days[count_col].values.astype(np.float64)
+        sum_prefix = prefix(np.nan_to_num(sums))
+        count_prefix = prefix(counts)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for window in windows:
+                start = window_starts[window]
+                window_sum = sum_prefix[rows] - sum_prefix[start]
+                window_count = count_prefix[rows] - count_prefix[start]
+                features[f"{feature}_{window}d"] = np.where(
+                    window_count > 0, window_sum / window_count, np.nan
+                )
+
+            # EWMA of each earlier game day's mean; the weights' common factor cancels
+            means = np.where(counts > 0, sums / counts, np.nan)
+            observed = ~np.isnan(means)
+            for halflife in halflives:
+                weights = np.where(observed, 2.0 ** (game_day / halflife), 0.0)
+                weighted_prefix = prefix(np.where(observed, means, 0.0) * weights)
+                weight_prefix = prefix(weights)
+                weighted_sum = weighted_prefix[rows] - weighted_prefix[first_row]
+                weight_sum = weight_prefix[rows] - weight_prefix[first_row]
+                features[f"{feature}_ewm{halflife}"] = np.where(
+                    weight_sum > 0, weighted_sum / weight_sum, np.nan
+                )
+
+    return pd.concat(
+        [
+            team_days[["season", "t1_teamid", "daynum"]].reset_index(drop=True),
+            pd.DataFrame(features),
+        ],
+        axis=1,
+    )
+
+
+def compute_rolling_features(
+    recipricol, windows=ROLLING_WINDOWS, halflives=EWM_HALFLIVES
+):
+    """
+    Computes the rolling features of every team-day from the recipricol boxscores
+
+    Args:
+        recipricol (pandas.DataFrame): The recipricol boxscores, e.g. from swap_boxscores.
+        windows (list, optional): Trailing windows in days. Default is ROLLING_WINDOWS.
+        halflives (list, optional): EWMA half-lives in game days. Default is EWM_HALFLIVES.
+
+    Returns:
+        pandas.DataFrame: One row per (season, t1_teamid, daynum) with the T1 rolling features.
+    """
+    recipricol = recipricol.rename(columns=str.lower)
+    return _rolling_features(_team_day_statistics(recipricol), windows, halflives)
+
+
+def create_training_data(recipricol):
+    """
+    Creates the training data from the recipricol boxscores, mirroring create_training_data.sql
+
+    Season means are expanding sums and counts per (season, team), shifted by one game
+    day so a game only sees the team's earlier days, which removes the per-day loop.
+    The rolling features from _rolling_features follow the win ratios.
+
+    Args:
+        recipricol (pandas.DataFrame): The recipricol boxscores, e.g. from swap_boxscores.
+
+    Returns:
+        pandas.DataFrame: One row per recipricol boxscore with the same columns as the
+            training_data_kaggle and training_data_sdv tables.
+    """
+    recipricol = recipricol.rename(columns=str.lower)
+    team_days = _team_day_statistics(recipricol)
+    group_ids = team_days.groupby(["season", "t1_teamid"], sort=False).ngroup()
+
+    # Expanding pre-game season means
+    t1_features = team_days[["season", "t1_teamid", "daynum"]].copy()
+    for source, feature in SEASON_MEAN_FEATURES:
+        prior_sum = team_days.groupby(group_ids)[source].cumsum() - team_days[source]
+        prior_count = (
+            team_days.groupby(group_ids)[source + "_count"].cumsum()
+            - team_days[source + "_count"]
+        )
+        t1_features[feature] = (prior_sum / prior_count.where(prior_count > 0)).values
+
+    # 14 day win ratios
+    first_day = team_days["daynum"].values.astype(np.int64) - WIN_RATIO_DAYS
+    t1_features["t1_win_ratio_14d"] = _win_ratio_from_day(team_days, first_day)
+
+    # Trailing window means and EWMAs
+    rolling = _rolling_features(team_days)
+    rolling_columns = rolling_feature_names()
+    t1_features = pd.concat(
+        [t1_features.reset_index(drop=True), rolling[rolling_columns]], axis=1
+    )
+
+    t2_features = t1_features.rename(
+        columns=lambda c: c.replace("t1_", "t2_", 1) if c.startswith("t1_") else c
+    )
+
+    training_data = recipricol[GAME_COLUMNS].merge(
+        t1_features, how="left", on=["season", "daynum", "t1_teamid"]
+    )
+    training_data = training_data.merge(
+        t2_features, how="left", on=["season", "daynum", "t2_teamid"]
+    )
+
+    t1_columns = [feature for _, feature in SEASON_MEAN_FEATURES]
+    t2_columns = [c.replace("t1_", "t2_", 1) for c in t1_columns]
+    return training_data[
+        GAME_COLUMNS
+        + t1_columns
+        + t2_columns
+        + ["t1_win_ratio_14d", "t2_win_ratio_14d"]
+        + rolling_columns
+        + [c.replace("t1_", "t2_", 1) for c in rolling_columns]
+    ]
+
+
+def get_team_features(training_data, season, daynum):
+    """
+    Gets each team's latest pre-game features, mirroring get_team_features.sql
+
+    Args:
+        training_data (pandas.DataFrame): Training data, e.g. from create_training_data.
+        season (int): The season of the games being predicted.
+        daynum (int): The DayNum of the games being predicted.
+
+    Returns:
+        pandas.DataFrame: The latest training row before daynum for each T1 team.
+    """
+    earlier = training_data[
+        (training_data["season"] == season) & (training_data["daynum"] < daynum)
+    ]
+    latest_daynum = earlier.groupby("t1_teamid")["daynum"].transform("max")
+    latest = earlier[earlier["daynum"] == latest_daynum]
+
+    t1_columns = [feature for _, feature in SEASON_MEAN_FEATURES]
+    return latest[
+        ["season", "daynum", "t1_teamid"]
+        + t1_columns
+        + ["t1_win_ratio_14d"]
+        + rolling_feature_names()
+    ]
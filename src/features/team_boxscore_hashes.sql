@@ -0,0 +1,8 @@
+SELECT
+    Season,
+    T1_TeamID,
+    SUM(hashtextextended(b::text, 0)) AS boxscore_hash
+FROM
+    RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER b
+GROUP BY
+    Season, T1_TeamID
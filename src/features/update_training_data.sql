@@ -0,0 +1,55 @@
+-- A table built before team hashes were kept has every team refreshed once
+CREATE TABLE IF NOT EXISTS TEAM_HASHES_TABLE_NAME_PLACEHOLDER (LIKE current_team_hashes);
+
+-- Teams whose boxscores were added, changed or removed since the last build
+CREATE TEMPORARY TABLE changed_teams ON COMMIT DROP AS
+SELECT
+    COALESCE(c.Season, h.Season) AS Season,
+    COALESCE(c.T1_TeamID, h.T1_TeamID) AS T1_TeamID
+FROM
+    current_team_hashes c
+    FULL OUTER JOIN TEAM_HASHES_TABLE_NAME_PLACEHOLDER h ON c.Season = h.Season AND c.T1_TeamID = h.T1_TeamID
+WHERE
+    c.boxscore_hash IS DISTINCT FROM h.boxscore_hash;
+
+-- Every game of the changed teams and of their opponents, whose features those games use
+CREATE TEMPORARY TABLE refresh_boxscores ON COMMIT DROP AS
+SELECT
+    b.*
+FROM
+    RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER b
+WHERE
+    (b.Season, b.T1_TeamID) IN (
+        SELECT Season, T1_TeamID FROM changed_teams
+        UNION
+        SELECT o.Season, o.T2_TeamID
+        FROM RECIPRICOL_BOXSCORE_TABLE_NAME_PLACEHOLDER o
+        JOIN changed_teams c ON o.Season = c.Season AND o.T1_TeamID = c.T1_TeamID
+    );
+
+DELETE FROM TRAINING_DATA_TABLE_NAME_PLACEHOLDER t
+WHERE
+    (t.Season, t.T1_TeamID) IN (SELECT Season, T1_TeamID FROM changed_teams)
+    OR (t.Season, t.T2_TeamID) IN (SELECT Season, T1_TeamID FROM changed_teams);
+
+INSERT INTO TRAINING_DATA_TABLE_NAME_PLACEHOLDER
+SELECT
+    refreshed.*
+FROM
+    (WINDOWED_TRAINING_DATA_QUERY_PLACEHOLDER) refreshed
+WHERE
+    (refreshed.Season, refreshed.T1_TeamID) IN (SELECT Season, T1_TeamID FROM changed_teams)
+    OR (refreshed.Season, refreshed.T2_TeamID) IN (SELECT Season, T1_TeamID FROM changed_teams);
+
+DELETE FROM TEAM_HASHES_TABLE_NAME_PLACEHOLDER h
+USING changed_teams c
+WHERE h.Season = c.Season AND h.T1_TeamID = c.T1_TeamID;
+
+INSERT INTO TEAM_HASHES_TABLE_NAME_PLACEHOLDER
+SELECT
+    h.*
+FROM
+    current_team_hashes h
+    JOIN changed_teams c ON h.Season = c.Season AND h.T1_TeamID = c.T1_TeamID;
+
+SELECT COUNT(*) FROM changed_teams;
@@ -0,0 +1,141 @@
+import json
+import numpy as np
+import os
+
+# Spreads are clipped to this many points before calibration
+SPREAD_CLIP = 25
+
+# Calibrated probabilities are kept within these bounds
+PROB_CLIP = (0.025, 0.975)
+
+
+def fit_spline_calibrator(oof_preds, y, spread_clip=SPREAD_CLIP):
+    """
+    Fit a spline mapping out-of-fold predicted spreads to win probabilities.
+
+    Predictions are sorted once and, where several games share a predicted spread,
+    the last game's result is kept, matching the notebook's dict-based dedup.
+
+    Args:
+        oof_preds (numpy.ndarray): Out-of-fold predicted spreads.
+        y (numpy.ndarray): The actual spreads.
+        spread_clip (float, optional): Spreads are clipped to +/- this value. Default is 25.
+
+    Returns:
+        dict: The spline's knots (t), coefficients (c) and degree (k), and the clip bounds.
+    """
+    from scipy.interpolate import UnivariateSpline
+
+    preds = np.clip(np.asarray(oof_preds, dtype=np.float64), -spread_clip, spread_clip)
+    wins = (np.asarray(y) > 0).astype(np.float64)
+
+    order = np.argsort(preds, kind="stable")
+    preds = preds[order]
+    wins = wins[order]
+    last_of_value = np.append(preds[1:] != preds[:-1], True)
+
+    spline = UnivariateSpline(preds[last_of_value], wins[last_of_value])
+    t, c, k = spline._eval_args
+
+    return {
+        "t": t.tolist(),
+        "c": c.tolist(),
+        "k": int(k),
+        "spread_clip": spread_clip,
+        "prob_clip": list(PROB_CLIP),
+    }
+
+
+def calibration_path(model_path):
+    """
+    Get the calibrator file that sits next to a model file.
+
+    Args:
+        model_path (str): The path of an xgboost_model_*.model file.
+
+    Returns:
+        str: The path of the matching calibration_*.json file.
+    """
+    directory, filename = os.path.split(model_path)
+    filename = filename.replace("xgboost_model_", "calibration_", 1)
+    return os.path.join(directory, os.path.splitext(filename)[0] + ".json")
+
+
+def save_calibrator(calibrator, model_path):
+    """
+    Save a calibrator next to the model it was fit for.
+
+    Args:
+        calibrator (dict): A calibrator from fit_spline_calibrator.
+        model_path (str): The path of the model file.
+    """
+    with open(calibration_path(model_path), "w") as fd:
+        json.dump(calibrator, fd)
+
+
+class SpreadCalibrator:
+    """
+    Maps predicted spreads to win probabilities with a dense lookup table.
+
+    The spline is evaluated once on a grid of step resolution over the clipped
+    spread range, so calibrating a game is a rounding and an array index.
+
+    Args:
+        calibrator (dict): A calibrator from fit_spline_calibrator.
+        resolution (float, optional): The grid step in points. Default is 0.01.
+    """
+
+    def __init__(self, calibrator, resolution=0.01):
+        # scipy is only imported by models that have a calibrator
+        from scipy.interpolate import splev
+
+        self.spread_clip = calibrator["spread_clip"]
+        self.resolution = resolution
+
+        grid = np.arange(
+            -self.spread_clip, self.spread_clip + resolution / 2, resolution
+        )
+        tck = (np.array(calibrator["t"]), np.array(calibrator["c"]), calibrator["k"])
+        self.table = np.clip(splev(grid, tck), *calibrator["prob_clip"])
+
+    @classmethod
+    def load(cls, model_path, resolution=0.01):
+        """
+        Load the calibrator saved next to a model file.
+
+        Args:
+            model_path (str): The path of the model file.
+            resolution (float, optional): The grid step in points. Default is 0.01.
+
+        Returns:
+            SpreadCalibrator or None: The calibrator, or None if the model has none.
+        """
+        path = calibration_path(model_path)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as fd:
+            return cls(json.load(fd), resolution=resolution)
+
+    def __call__(self, spreads):
+        spreads = np.clip(spreads, -self.spread_clip, self.spread_clip)
+        index = np.rint((spreads + self.spread_clip) / self.resolution).astype(np.intp)
+        return self.table[index]
+
+
+def calibrate_predictions(spreads, calibrators):
+    """
+    Turn each model's predicted spreads into a mean win probability.
+
+    Args:
+        spreads (numpy.ndarray): A (models, games) array of predicted spreads.
+        calibrators (list): One SpreadCalibrator (or None) per model.
+
+    Returns:
+        numpy.ndarray or None: The mean win probability of each game, or None if
+            any model has no calibrator.
+    """
+    if not calibrators or any(c is None for c in calibrators):
+        return None
+    return np.mean(
+        [calibrator(s) for calibrator, s in zip(calibrators, spreads)], axis=0
+    )
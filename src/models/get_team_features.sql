@@ -1,39 +1,43 @@
-WITH maxdaynums AS (
-    SELECT 
-        t1_teamid,
-        MAX(daynum) AS max_daynum,
-        MAX(season) AS season
-    FROM training_data_sdv
-    WHERE season = SEASON_PLACEHOLDER 
-      AND daynum < DAYNUM_PLACEHOLDER
-    GROUP BY t1_teamid
+WITH game_days (season, game_daynum) AS (
+    VALUES GAME_DAYS_PLACEHOLDER
+), snapshot_days AS (
+    -- Games past the latest snapshot day use the latest features
+    SELECT
+        g.season,
+        g.game_daynum,
+        LEAST(
+            g.game_daynum,
+            (SELECT MAX(f.daynum) FROM team_features_sdv f WHERE f.season = g.season)
+        ) AS snapshot_daynum
+    FROM game_days g
 )
 SELECT
-    t.Season,
-    t.DayNum,
-    t.T1_TeamID,
-    t.T1_FGMmean,
-    t.T1_FGAmean,
-    t.T1_FGM3mean,
-    t.T1_FGA3mean,
-    t.T1_ORmean,
-    t.T1_Astmean,
-    t.T1_TOmean,
-    t.T1_Stlmean,
-    t.T1_PFmean,
-    t.T1_PointDiffmean,
-    t.T1_opponent_FGMmean,
-    t.T1_opponent_FGAmean,
-    t.T1_opponent_FGM3mean,
-    t.T1_opponent_FGA3mean,
-    t.T1_opponent_ORmean,
-    t.T1_opponent_Astmean,
-    t.T1_opponent_TOmean,
-    t.T1_opponent_Stlmean,
-    t.T1_opponent_Blkmean,
-    t.T1_win_ratio_14d
-FROM maxdaynums m
-LEFT JOIN training_data_sdv t 
-    ON t.t1_teamid = m.t1_teamid 
-   AND m.max_daynum = t.daynum 
-   AND m.season = t.season;
+    s.game_daynum,
+    f.Season,
+    f.last_DayNum AS DayNum,
+    f.T1_TeamID,
+    f.T1_FGMmean,
+    f.T1_FGAmean,
+    f.T1_FGM3mean,
+    f.T1_FGA3mean,
+    f.T1_ORmean,
+    f.T1_Astmean,
+    f.T1_TOmean,
+    f.T1_Stlmean,
+    f.T1_PFmean,
+    f.T1_PointDiffmean,
+    f.T1_opponent_FGMmean,
+    f.T1_opponent_FGAmean,
+    f.T1_opponent_FGM3mean,
+    f.T1_opponent_FGA3mean,
+    f.T1_opponent_ORmean,
+    f.T1_opponent_Astmean,
+    f.T1_opponent_TOmean,
+    f.T1_opponent_Stlmean,
+    f.T1_opponent_Blkmean,
+    f.T1_win_ratio_14d
+FROM snapshot_days s
+JOIN team_features_sdv f
+    ON f.season = s.season
+   AND f.daynum = s.snapshot_daynum
+ORDER BY s.season, s.game_daynum, f.t1_teamid;
@@ -0,0 +1,271 @@
+import argparse
+from dotenv import load_dotenv
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..utils import load_config
+from .calibration import calibrate_predictions
+from .predict_model import (
+    GAME_FEATURES,
+    get_team_features,
+    load_calibrators,
+    load_models,
+    predict_spreads,
+)
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Predict every pairwise matchup between teams on one day"
+    )
+    parser.add_argument("season", type=int, help="The season to predict")
+    parser.add_argument(
+        "daynum", type=int, help="The day the matchups would be played on"
+    )
+    parser.add_argument(
+        "model_id", type=str, help="The ID of the model to use for prediction"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="submission.csv",
+        help="Where to write predictions; a .parquet suffix writes Parquet, otherwise CSV",
+    )
+    parser.add_argument(
+        "--teams",
+        type=str,
+        help="A file with one team ID per line to restrict the matchups to",
+    )
+    parser.add_argument(
+        "--full-matrix",
+        action="store_true",
+        help="Predict both orderings of every pair instead of only T1 < T2",
+    )
+    parser.add_argument(
+        "--location",
+        type=int,
+        default=0,
+        help="The location feature of every matchup (0 is a neutral site)",
+    )
+    parser.add_argument(
+        "--spread-std",
+        type=float,
+        help="For models without calibrators, turn spreads into probabilities with a "
+        "normal CDF of this standard deviation",
+    )
+    return parser.parse_args()
+
+
+def get_team_feature_matrix(season, daynum, config, team_ids=None):
+    """
+    Retrieve each team's latest features before a day as one row per team.
+
+    Args:
+        season (int): The season.
+        daynum (int): The day the matchups would be played on.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        team_ids (list, optional): Only these teams are returned. Default is every team
+            with features on that day.
+
+    Returns:
+        tuple: The sorted team IDs (numpy.ndarray) and their features (pandas.DataFrame),
+            one row per team in the same order.
+    """
+    game_day = pd.DataFrame({"season": [season], "daynum": [daynum]})
+    team_features = get_team_features(game_day, config)
+
+    if team_ids is not None:
+        team_features = team_features[team_features["t1_teamid"].isin(team_ids)]
+    team_features = team_features.sort_values("t1_teamid").reset_index(drop=True)
+
+    return team_features["t1_teamid"].to_numpy(), team_features
+
+
+def build_matchup_features(team_features, t1_index, t2_index, daynum, location=0):
+    """
+    Build the model's feature matrix for matchups by broadcasting the teams' features.
+
+    Each T1_ feature is gathered from the T1 team's row and each T2_ feature from the
+    T2 team's row of the same team feature matrix, so no per-pair merge is needed.
+
+    Args:
+        team_features (pandas.DataFrame): One row per team from get_team_feature_matrix.
+        t1_index (numpy.ndarray): The row of the first team of each matchup.
+        t2_index (numpy.ndarray): The row of the second team of each matchup.
+        daynum (int): The day the matchups would be played on.
+        location (int, optional): The location feature of every matchup. Default is 0.
+
+    Returns:
+        numpy.ndarray: A float32 array of shape (matchups, features) in GAME_FEATURES order.
+    """
+    team_columns = [col for col in GAME_FEATURES if col.startswith("t1_")]
+    team_matrix = team_features[team_columns].to_numpy(dtype=np.float32)
+    column_positions = {col: i for i, col in enumerate(team_columns)}
+
+    t1_positions, t1_sources, t2_positions, t2_sources = [], [], [], []
+    for position, col in enumerate(GAME_FEATURES):
+        if col.startswith("t1_"):
+            t1_positions.append(position)
+            t1_sources.append(column_positions[col])
+        elif col.startswith("t2_"):
+            t2_positions.append(position)
+            t2_sources.append(column_positions[col.replace("t2_", "t1_", 1)])
+
+    X = np.empty((len(t1_index), len(GAME_FEATURES)), dtype=np.float32)
+    X[:, t1_positions] = team_matrix[:, t1_sources][t1_index]
+    X[:, t2_positions] = team_matrix[:, t2_sources][t2_index]
+    X[:, GAME_FEATURES.index("daynum")] = daynum
+    X[:, GAME_FEATURES.index("location")] = location
+
+    return X
+
+
+def predict_matchups(
+    team_ids,
+    team_features,
+    models,
+    season,
+    daynum,
+    full_matrix=False,
+    location=0,
+    calibrators=None,
+    spread_std=None,
+):
+    """
+    Predict every pairwise matchup between the teams.
+
+    Args:
+        team_ids (numpy.ndarray): Sorted team IDs from get_team_feature_matrix.
+        team_features (pandas.DataFrame): The matching team features.
+        models (list): XGBoost boosters returned by load_models.
+        season (int): The season.
+        daynum (int): The day the matchups would be played on.
+        full_matrix (bool, optional): If True, both orderings of every pair are predicted.
+            Otherwise only pairs with T1 < T2, as in the Kaggle submission. Default is False.
+        location (int, optional): The location feature of every matchup. Default is 0.
+        calibrators (list, optional): Calibrators returned by load_calibrators.
+        spread_std (float, optional): Used only when the models have no calibrators, to
+            turn the mean spread into a probability with a normal CDF of this standard
+            deviation.
+
+    Returns:
+        pandas.DataFrame: ID ("season_t1_t2"), t1_teamid, t2_teamid, pred_spread (the mean
+            predicted spread of T1 over T2) and Pred, the probability that T1 wins.
+
+    Raises:
+        ValueError: If the models have no calibrators and spread_std is not given.
+    """
+    n_teams = len(team_ids)
+    if full_matrix:
+        t1_index, t2_index = np.nonzero(~np.eye(n_teams, dtype=bool))
+    else:
+        t1_index, t2_index = np.triu_indices(n_teams, k=1)
+
+    X = build_matchup_features(team_features, t1_index, t2_index, daynum, location)
+
+    # One DMatrix shared by every booster
+    spreads = predict_spreads(models, X)
+    pred_spread = spreads.mean(axis=0)
+    win_prob = calibrate_predictions(spreads, calibrators)
+    if win_prob is None:
+        if spread_std is None:
+            raise ValueError(
+                "The models have no calibrators; pass spread_std to turn spreads into "
+                "probabilities"
+            )
+
+        # scipy.stats is slow to import and only needed for uncalibrated models
+        from scipy.stats import norm
+
+        win_prob = norm.cdf(pred_spread / spread_std)
+
+    t1_teamids = team_ids[t1_index]
+    t2_teamids = team_ids[t2_index]
+    ids = (
+        f"{season}_"
+        + pd.Series(t1_teamids).astype(str)
+        + "_"
+        + pd.Series(t2_teamids).astype(str)
+    )
+
+    return pd.DataFrame(
+        {
+            "ID": ids,
+            "t1_teamid": t1_teamids,
+            "t2_teamid": t2_teamids,
+            "pred_spread": pred_spread,
+            "Pred": win_prob,
+        }
+    )
+
+
+def write_submission(predictions, path, chunk_size=100000):
+    """
+    Write matchup predictions in the Kaggle submission format (ID, Pred).
+
+    Rows are written in chunks of chunk_size, to Parquet when path ends in
+    .parquet and to CSV otherwise.
+
+    Args:
+        predictions (pandas.DataFrame): Predictions from predict_matchups.
+        path (str): The file to write.
+        chunk_size (int, optional): The number of rows written at a time. Default is 100000.
+    """
+    submission = predictions[["ID", "Pred"]]
+
+    if path.endswith(".parquet"):
+        schema = pa.Schema.from_pandas(submission, preserve_index=False)
+        with pq.ParquetWriter(path, schema) as writer:
+            for start in range(0, len(submission), chunk_size):
+                chunk = submission.iloc[start : start + chunk_size]
+                writer.write_table(
+                    pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                )
+    else:
+        with open(path, "w") as fd:
+            fd.write("ID,Pred\n")
+            for start in range(0, len(submission), chunk_size):
+                submission.iloc[start : start + chunk_size].to_csv(
+                    fd, index=False, header=False
+                )
+
+
+if __name__ == "__main__":
+    # Load up args, configs, environment vars
+    args = parse_arguments()
+    load_dotenv()
+    config = load_config()
+
+    team_ids = None
+    if args.teams:
+        with open(args.teams, "r") as fd:
+            team_ids = [int(line) for line in fd if line.strip()]
+
+    # Load team features once and broadcast them over every matchup
+    team_ids, team_features = get_team_feature_matrix(
+        args.season, args.daynum, config, team_ids=team_ids
+    )
+    models = load_models(args.model_id)
+    calibrators = load_calibrators(args.model_id)
+    predictions = predict_matchups(
+        team_ids,
+        team_features,
+        models,
+        args.season,
+        args.daynum,
+        full_matrix=args.full_matrix,
+        location=args.location,
+        calibrators=calibrators,
+        spread_std=args.spread_std,
+    )
+
+    write_submission(predictions, args.output)
+    print(f"Wrote {len(predictions)} matchup predictions to {args.output}")
@@ -1,11 +1,59 @@
 import argparse
 import datetime
 from dotenv import load_dotenv
+import numpy as np
 import os
 import pandas as pd
-import xgboost as xgb
 
-from ..utils import execute_sql_query, insert_dataframe, load_config
+from ..utils import copy_dataframe, execute_sql_query, get_run_id, load_config
+from .calibration import SpreadCalibrator, calibrate_predictions
+
+# Model features, in the column order the models were trained with
+GAME_FEATURES = [
+    "T1_FGMmean",
+    "T1_FGAmean",
+    "T1_FGM3mean",
+    "T1_FGA3mean",
+    "T1_ORmean",
+    "T1_Astmean",
+    "T1_TOmean",
+    "T1_Stlmean",
+    "T1_PFmean",
+    "T1_opponent_FGMmean",
+    "T1_opponent_FGAmean",
+    "T1_opponent_FGM3mean",
+    "T1_opponent_FGA3mean",
+    "T1_opponent_ORmean",
+    "T1_opponent_Astmean",
+    "T1_opponent_TOmean",
+    "T1_opponent_Stlmean",
+    "T1_opponent_Blkmean",
+    "T1_PointDiffmean",
+    "T2_FGMmean",
+    "T2_FGAmean",
+    "T2_FGM3mean",
+    "T2_FGA3mean",
+    "T2_ORmean",
+    "T2_Astmean",
+    "T2_TOmean",
+    "T2_Stlmean",
+    "T2_PFmean",
+    "T2_opponent_FGMmean",
+    "T2_opponent_FGAmean",
+    "T2_opponent_FGM3mean",
+    "T2_opponent_FGA3mean",
+    "T2_opponent_ORmean",
+    "T2_opponent_Astmean",
+    "T2_opponent_TOmean",
+    "T2_opponent_Stlmean",
+    "T2_opponent_Blkmean",
+    "T2_PointDiffmean",
+    "T1_win_ratio_14d",
+    "T2_win_ratio_14d",
+    "DayNum",
+    "location",
+]
+GAME_FEATURES = [f.lower() for f in GAME_FEATURES]
 
 
 def parse_arguments():
@@ -15,18 +63,30 @@ def parse_arguments():
     Returns:
         argparse.Namespace: An object containing the parsed arguments.
 
-    This function initializes an ArgumentParser object and defines two required
-    command-line arguments: 'date' and 'model_id'.
+    This function initializes an ArgumentParser object and defines the command-line
+    arguments: 'date' and 'model_id', or 'model_id' with '--start' and '--end' to
+    predict every game in a date range.
     """
     parser = argparse.ArgumentParser(description="Run the predict_model script")
-    parser.add_argument("date", type=str, help="The date to use for prediction")
+    parser.add_argument(
+        "date", type=str, nargs="?", help="The date to use for prediction"
+    )
     parser.add_argument(
         "model_id", type=str, help="The ID of the model to use for prediction"
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--start", type=str, help="The first date of a range to predict (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--end", type=str, help="The last date of a range to predict (YYYY-MM-DD)"
+    )
+    args = parser.parse_args()
+    if args.date is None and (args.start is None or args.end is None):
+        parser.error("either date or both --start and --end are required")
+    return args
 
 
-def get_scheduled_games(date, config):
+def get_scheduled_games(date, config, end_date=None):
     """
     Retrieve scheduled games for a given date from the schedule_sdv table.
 
@@ -34,23 +94,30 @@ def get_scheduled_games(date, config):
         date (str or datetime.date): The date for which to retrieve scheduled games.
             It can be either a string in the format 'YYYY-MM-DD' or a datetime.date object.
         config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        end_date (str or datetime.date, optional): If given, games from date through
+            end_date (inclusive) are retrieved.
 
     Returns:
         pandas.DataFrame: A DataFrame containing information about the scheduled games.
     """
 
-    # Ensure date is a datetime.date object
+    # Ensure dates are datetime.date objects
     if not isinstance(date, datetime.date):
         date = datetime.datetime.strptime(date, "%Y-%m-%d").date()
+    if end_date is None:
+        end_date = date
+    elif not isinstance(end_date, datetime.date):
+        end_date = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
 
-    # Format the date string
+    # Format the date strings
     formatted_date = date.strftime("%Y-%m-%d")
+    formatted_end_date = end_date.strftime("%Y-%m-%d")
 
     schedule_query = f"""
     SELECT
     *
     FROM schedule_sdv
-    WHERE start_date::DATE = '{formatted_date}' 
+    WHERE start_date::DATE BETWEEN '{formatted_date}' AND '{formatted_end_date}'
     """
 
     schedule_games = execute_sql_query(
@@ -92,21 +159,24 @@ def get_scheduled_games(date, config):
 
 
 # Get features
-def get_game_features(games, config):
+def get_team_features(games, config):
     """
-    Retrieve features for the provided games from a database.
+    Retrieve each team's latest pre-game features for every day the games are played on.
 
     Args:
         games (pandas.DataFrame): A DataFrame containing information about the games.
         config (dict): A dictionary containing the PostgreSQL database configuration parameters.
 
     Returns:
-        numpy.ndarray: An array containing the extracted features for the games.
+        pandas.DataFrame: One row per (season, daynum, t1_teamid), where daynum is the game day.
     """
 
-    # Get the daynum and season of the games
-    DayNum = games["daynum"].values[0]
-    season = games["season"].values[0]
+    # Get every (season, daynum) the games are played on
+    game_days = games[["season", "daynum"]].drop_duplicates()
+    game_days_values = ", ".join(
+        f"({int(season)}, {int(daynum)})"
+        for season, daynum in game_days.itertuples(index=False)
+    )
 
     # Load the feature creation query
     with open("src/models/get_team_features.sql", "r") as fd:
@@ -114,8 +184,8 @@ def get_game_features(games, config):
 
     # Parameterize the feature creation query
     parameterized_team_features_query = team_features_query.replace(
-        "SEASON_PLACEHOLDER", str(season)
-    ).replace("DAYNUM_PLACEHOLDER", str(DayNum))
+        "GAME_DAYS_PLACEHOLDER", game_days_values
+    )
 
     team_features = execute_sql_query(
         database=config["database"],
@@ -127,69 +197,58 @@ def get_game_features(games, config):
         return_pandas=True,
     )
 
-    # Merge team features back onto the games
-    games = games.merge(team_features, how="left", on="t1_teamid")
+    # Key the features by the day they are used on
+    team_features = team_features.drop(columns=["daynum"]).rename(
+        columns={"game_daynum": "daynum"}
+    )
+    return team_features
+
+
+def build_game_features(games, team_features):
+    """
+    Build the model's feature matrix for the games from the teams' features.
+
+    Args:
+        games (pandas.DataFrame): A DataFrame containing information about the games.
+        team_features (pandas.DataFrame): Team features from get_team_features.
+
+    Returns:
+        numpy.ndarray: An array containing the extracted features for the games.
+    """
+
+    # Merge team features back onto the games by the day they are played
+    games = games.merge(team_features, how="left", on=["season", "daynum", "t1_teamid"])
     T2_cols = {
         col: col.replace("t1_", "t2_")
         for col in team_features.columns
         if col.startswith("t1_")
     }
     T2_team_features = team_features.rename(columns=T2_cols)
-    games = games.merge(T2_team_features, how="left", on="t2_teamid")
+    games = games.merge(
+        T2_team_features, how="left", on=["season", "daynum", "t2_teamid"]
+    )
 
     # Return the features back
-    features = [
-        "T1_FGMmean",
-        "T1_FGAmean",
-        "T1_FGM3mean",
-        "T1_FGA3mean",
-        "T1_ORmean",
-        "T1_Astmean",
-        "T1_TOmean",
-        "T1_Stlmean",
-        "T1_PFmean",
-        "T1_opponent_FGMmean",
-        "T1_opponent_FGAmean",
-        "T1_opponent_FGM3mean",
-        "T1_opponent_FGA3mean",
-        "T1_opponent_ORmean",
-        "T1_opponent_Astmean",
-        "T1_opponent_TOmean",
-        "T1_opponent_Stlmean",
-        "T1_opponent_Blkmean",
-        "T1_PointDiffmean",
-        "T2_FGMmean",
-        "T2_FGAmean",
-        "T2_FGM3mean",
-        "T2_FGA3mean",
-        "T2_ORmean",
-        "T2_Astmean",
-        "T2_TOmean",
-        "T2_Stlmean",
-        "T2_PFmean",
-        "T2_opponent_FGMmean",
-        "T2_opponent_FGAmean",
-        "T2_opponent_FGM3mean",
-        "T2_opponent_FGA3mean",
-        "T2_opponent_ORmean",
-        "T2_opponent_Astmean",
-        "T2_opponent_TOmean",
-        "T2_opponent_Stlmean",
-        "T2_opponent_Blkmean",
-        "T2_PointDiffmean",
-        "T1_win_ratio_14d",
-        "T2_win_ratio_14d",
-        "DayNum",
-        "location",
-    ]
-
-    features = [f.lower() for f in features]
-
-    X = games[features].values
+    X = games[GAME_FEATURES].values
 
     return X
 
 
+def get_game_features(games, config):
+    """
+    Retrieve features for the provided games from a database.
+
+    Args:
+        games (pandas.DataFrame): A DataFrame containing information about the games.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+
+    Returns:
+        numpy.ndarray: An array containing the extracted features for the games.
+    """
+    team_features = get_team_features(games, config)
+    return build_game_features(games, team_features)
+
+
 def load_models(model_id):
     """
     Load XGBoost models from the specified directory for a given model ID.
@@ -200,6 +259,9 @@ def load_models(model_id):
     Returns:
         list: A list containing the loaded XGBoost models.
     """
+    # xgboost takes seconds to import, so only commands that score games load it
+    import xgboost as xgb
+
     model_dir = f"src/models/{model_id}/"
 
     models = []
@@ -211,62 +273,141 @@ def load_models(model_id):
     return models
 
 
-def generate_predictions(model_id, X):
+def load_calibrators(model_id):
+    """
+    Load the spread-to-probability calibrator saved next to each model.
+
+    Args:
+        model_id (str): The ID of the model to load.
+
+    Returns:
+        list: One SpreadCalibrator per model, or None for models trained without one.
+    """
+    model_dir = f"src/models/{model_id}/"
+
+    calibrators = []
+    for i in range(3):
+        filename = f"xgboost_model_{model_id}_{str(i)}.model"
+        calibrators.append(SpreadCalibrator.load(os.path.join(model_dir, filename)))
+    return calibrators
+
+
+def predict_spreads(models, X):
+    """
+    Predict the spread of each game with every model.
+
+    Args:
+        models (list): The loaded XGBoost models.
+        X (numpy.ndarray): An array containing the input data for making predictions.
+
+    Returns:
+        numpy.ndarray: A (models, games) array of predicted spreads.
+    """
+    import xgboost as xgb
+
+    dtest = xgb.DMatrix(X)
+    return np.array([model.predict(dtest) for model in models])
+
+
+def generate_predictions(model_id, X, models=None):
     """
     Generate predictions using XGBoost models for the provided data.
 
     Args:
         model_id (str): The ID of the XGBoost model to use for predictions.
         X (numpy.ndarray): An array containing the input data for making predictions.
+        models (list, optional): Models already returned by load_models(model_id).
+            They are loaded from disk when not given.
 
     Returns:
         pandas.Series: A Series containing the mean predictions generated by the models.
     """
-    models = load_models(model_id)
-    dtest = xgb.DMatrix(X)
+    if models is None:
+        models = load_models(model_id)
 
-    preds = []
-    for i in range(3):
-        preds.append(models[i].predict(dtest))
-    mean_predctions = pd.DataFrame(preds).mean(axis=0)
-    mean_predctions.name = "pred_spread"
+    preds = predict_spreads(models, X)
+    mean_predctions = pd.Series(preds.mean(axis=0), name="pred_spread")
 
     return mean_predctions
 
 
-if __name__ == "__main__":
-    # Load up configs, environment vars, args
-    load_dotenv()
-    config = load_config()
-    args = parse_arguments()
+def predict_games(games, model_id, config, models=None, calibrators=None):
+    """
+    Predict the spread of every provided game.
+
+    Features for all of the games' (season, daynum) pairs are fetched in one query and
+    scored with one DMatrix, so a whole date range costs the same handful of round trips
+    as a single day.
 
-    # Load game data
-    games = get_scheduled_games(args.date, config)
+    Args:
+        games (pandas.DataFrame): Games from get_scheduled_games.
+        model_id (str): The ID of the XGBoost model to use for predictions.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        models (list, optional): Models already returned by load_models(model_id).
+        calibrators (list, optional): Calibrators already returned by load_calibrators(model_id).
+
+    Returns:
+        pandas.DataFrame: The games with their predicted spreads and win probabilities, in the
+            layout of the predictions table. win_prob is empty for models without calibrators.
+    """
+    games = games.reset_index(drop=True)
 
     # Create features for games
     X = get_game_features(games, config)
 
-    # Load up models and generate predictions
-    predictions = generate_predictions(args.model_id, X)
+    # Generate predictions
+    if models is None:
+        models = load_models(model_id)
+    if calibrators is None:
+        calibrators = load_calibrators(model_id)
+    spreads = predict_spreads(models, X)
+    win_prob = calibrate_predictions(spreads, calibrators)
 
-    game_predictions = games[["t1_teamid", "t2_teamid"]].merge(
-        predictions, how="left", left_index=True, right_index=True
-    )
-    game_predictions = game_predictions.merge(
-        games[
-            [
-                "season",
-                "daynum",
-                "id",
-                "t1_teamid",
-                "t2_teamid",
-                "game_id",
-                "home_display_name",
-                "away_display_name",
-            ]
-        ],
-        how="left",
-        on=["t1_teamid", "t2_teamid"],
-    )
+    game_predictions = games[
+        [
+            "t1_teamid",
+            "t2_teamid",
+            "season",
+            "daynum",
+            "id",
+            "game_id",
+            "home_display_name",
+            "away_display_name",
+        ]
+    ].copy()
+    game_predictions.insert(2, "pred_spread", spreads.mean(axis=0))
+    game_predictions.insert(3, "win_prob", np.nan if win_prob is None else win_prob)
+
+    return game_predictions
+
+
+if __name__ == "__main__":
+    # Load up args, configs, environment vars
+    args = parse_arguments()
+    load_dotenv()
+    config = load_config()
 
-    insert_dataframe(game_predictions, "predictions", config)
+    # Load game data for one date or a whole range
+    if args.date is not None:
+        games = get_scheduled_games(args.date, config)
+    else:
+        games = get_scheduled_games(args.start, config, end_date=args.end)
+
+    if games.empty:
+        print("No scheduled games found")
+    else:
+        # Load up models once and generate predictions
+        models = load_models(args.model_id)
+        calibrators = load_calibrators(args.model_id)
+        game_predictions = predict_games(
+            games, args.model_id, config, models=models, calibrators=calibrators
+        )
+
+        # Add any columns an older predictions table is missing before writing to it
+        from ..data.initialize_datasets import create_predictions_table
+
+        create_predictions_table(config)
+
+        # Link the predictions to this run's metrics
+        game_predictions["run_id"] = get_run_id()
+        copy_dataframe(game_predictions, "predictions", config)
@@ -0,0 +1,328 @@
+import argparse
+from collections import OrderedDict
+from concurrent.futures import Future
+from dotenv import load_dotenv
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import numpy as np
+import pandas as pd
+import queue
+import threading
+import time
+import xgboost as xgb
+
+from ..utils import execute_sql_query, load_config
+from .calibration import SpreadCalibrator, calibrate_predictions
+from .predict_model import build_game_features, get_team_features, predict_spreads
+
+GAME_COLUMNS = ["season", "daynum", "t1_teamid", "t2_teamid", "location"]
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run the prediction service")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument(
+        "--max-models",
+        type=int,
+        default=4,
+        help="Number of model ids kept loaded in memory",
+    )
+    parser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=5.0,
+        help="How long to collect concurrent requests into one batch",
+    )
+    return parser.parse_args()
+
+
+class ModelRegistry:
+    """
+    Boosters and calibrators for each model id in training_runs, kept in memory with LRU eviction.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        max_models (int, optional): The number of model ids kept loaded. Default is 4.
+    """
+
+    def __init__(self, config, max_models=4):
+        self.config = config
+        self.max_models = max_models
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, model_id):
+        # Models are saved under src/models/<model_id>/, so match that path component exactly
+        model_files_query = """
+        SELECT
+        fileLocation
+        FROM training_runs
+        WHERE %s = ANY(string_to_array(fileLocation, '/'))
+        ORDER BY fileLocation;
+        """
+        model_files = execute_sql_query(
+            **self.config, query=model_files_query, params=(model_id,)
+        )
+        if not model_files:
+            raise KeyError(f"No training runs found for model {model_id}")
+        models = [xgb.Booster(model_file=row[0]) for row in model_files]
+        calibrators = [SpreadCalibrator.load(row[0]) for row in model_files]
+        return models, calibrators
+
+    def get(self, model_id):
+        """
+        Get the boosters and calibrators for a model id, loading them on first use.
+
+        Args:
+            model_id (str): The ID of the model, i.e. its directory under src/models/.
+
+        Returns:
+            tuple: The loaded XGBoost boosters and their SpreadCalibrators (None for
+                models trained without one).
+        """
+        with self._lock:
+            if model_id in self._models:
+                self._models.move_to_end(model_id)
+                return self._models[model_id]
+
+            models = self._load(model_id)
+            self._models[model_id] = models
+            if len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return models
+
+
+class PredictionService:
+    """
+    Scores matchups with warm models, micro-batching concurrent requests.
+
+    Requests are queued and a single worker thread collects everything that arrives
+    within batch_window seconds, fetches any team features it has not cached, and
+    scores each model id's games with one DMatrix. If a batch fails, its requests are
+    scored one at a time so only the bad request gets the error.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        max_models (int, optional): The number of model ids kept loaded. Default is 4.
+        batch_window (float, optional): Seconds to collect requests into a batch. Default is 0.005.
+        feature_ttl (float, optional): Seconds team features are cached for, so new
+            training data is picked up. Default is 300.
+        max_feature_days (int, optional): The number of (season, daynum) feature sets
+            kept in the cache. Default is 64.
+    """
+
+    def __init__(
+        self,
+        config,
+        max_models=4,
+        batch_window=0.005,
+        feature_ttl=300,
+        max_feature_days=64,
+    ):
+        self.config = config
+        self.registry = ModelRegistry(config, max_models=max_models)
+        self.batch_window = batch_window
+        self.feature_ttl = feature_ttl
+        self.max_feature_days = max_feature_days
+        self._team_features = OrderedDict()
+        self._requests = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def predict(self, model_id, games):
+        """
+        Predict the spread and win probability of each game.
+
+        Args:
+            model_id (str): The ID of the model to use for predictions.
+            games (pandas.DataFrame): Games with season, daynum, t1_teamid, t2_teamid
+                and location columns.
+
+        Returns:
+            tuple: The mean predicted spread of each game (numpy.ndarray) and the mean
+                win probability (numpy.ndarray, or None if the model has no calibrators).
+        """
+        if games.empty:
+            return np.empty(0), np.empty(0)
+
+        future = Future()
+        self._requests.put((model_id, games[GAME_COLUMNS], future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.perf_counter() + self.batch_window
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            for model_id in {request[0] for request in batch}:
+                requests = [request for request in batch if request[0] == model_id]
+                try:
+                    models, calibrators = self.registry.get(model_id)
+                except Exception as error:
+                    for _, _, future in requests:
+                        future.set_exception(error)
+                    continue
+
+                try:
+                    self._score(models, calibrators, requests)
+                except Exception as error:
+                    if len(requests) == 1:
+                        requests[0][2].set_exception(error)
+                        continue
+
+                    # Rescore one at a time so a bad request only fails its own future
+                    for request in requests:
+                        try:
+                            self._score(models, calibrators, [request])
+                        except Exception as error:
+                            request[2].set_exception(error)
+
+    def _get_team_features(self, games):
+        now = time.monotonic()
+        game_days = set(games[["season", "daynum"]].itertuples(index=False, name=None))
+
+        missing = [
+            day
+            for day in game_days
+            if day not in self._team_features
+            or now - self._team_features[day][0] > self.feature_ttl
+        ]
+        if missing:
+            fetched = get_team_features(
+                pd.DataFrame(missing, columns=["season", "daynum"]), self.config
+            )
+            for day in missing:
+                season, daynum = day
+                day_features = fetched[
+                    (fetched["season"] == season) & (fetched["daynum"] == daynum)
+                ]
+                self._team_features[day] = (now, day_features)
+
+        for day in game_days:
+            self._team_features.move_to_end(day)
+        while len(self._team_features) > max(self.max_feature_days, len(game_days)):
+            self._team_features.popitem(last=False)
+
+        return pd.concat(
+            [self._team_features[day][1] for day in game_days], ignore_index=True
+        )
+
+    def _score(self, models, calibrators, requests):
+
+        games = pd.concat([request[1] for request in requests], ignore_index=True)
+        team_features = self._get_team_features(games)
+        X = build_game_features(games, team_features)
+
+        spreads = predict_spreads(models, X)
+        preds = spreads.mean(axis=0)
+        win_prob = calibrate_predictions(spreads, calibrators)
+
+        start = 0
+        for _, request_games, future in requests:
+            end = start + len(request_games)
+            future.set_result(
+                (preds[start:end], None if win_prob is None else win_prob[start:end])
+            )
+            start = end
+
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler for the prediction service.
+
+    POST /predict with a JSON body of {"model_id": ..., "games": [{"season": ...,
+    "daynum": ..., "t1_teamid": ..., "t2_teamid": ..., "location": ...}]} returns
+    {"pred_spread": [...], "win_prob": [...]}, with win_prob null for models without
+    calibrators. GET /health returns {"status": "ok"}.
+    """
+
+    service = None
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            games = pd.DataFrame(request["games"], columns=GAME_COLUMNS)
+            preds, win_prob = self.service.predict(str(request["model_id"]), games)
+        except (KeyError, ValueError) as error:
+            self._send_json(400, {"error": str(error)})
+            return
+        except Exception as error:
+            self._send_json(500, {"error": str(error)})
+            return
+
+        self._send_json(
+            200,
+            {
+                "pred_spread": [float(p) for p in preds],
+                "win_prob": None if win_prob is None else [float(p) for p in win_prob],
+            },
+        )
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(service, host="127.0.0.1", port=8765):
+    """
+    Serve predictions over HTTP until interrupted.
+
+    Args:
+        service (PredictionService): The service answering requests.
+        host (str, optional): The host to bind. Default is 127.0.0.1.
+        port (int, optional): The port to listen on. Default is 8765.
+    """
+    PredictionRequestHandler.service = service
+    server = ThreadingHTTPServer((host, port), PredictionRequestHandler)
+    print(f"Serving predictions on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    # Load up args, configs, environment vars
+    args = parse_arguments()
+    load_dotenv()
+    config = load_config()
+
+    service = PredictionService(
+        config,
+        max_models=args.max_models,
+        batch_window=args.batch_window_ms / 1000,
+    )
+    serve(service, host=args.host, port=args.port)
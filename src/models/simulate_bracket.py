@@ -0,0 +1,306 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Simulate a tournament bracket from matchup predictions"
+    )
+    parser.add_argument(
+        "--seeds",
+        type=str,
+        required=True,
+        help="CSV of Seed and TeamID, e.g. Kaggle's MNCAATourneySeeds.csv",
+    )
+    parser.add_argument(
+        "--slots",
+        type=str,
+        required=True,
+        help="CSV of Slot, StrongSeed and WeakSeed, e.g. Kaggle's MNCAATourneySlots.csv",
+    )
+    parser.add_argument(
+        "--predictions",
+        type=str,
+        required=True,
+        help="Matchup predictions (ID, Pred) written by predict_matchups",
+    )
+    parser.add_argument(
+        "--season", type=int, help="Season to select when the files hold several"
+    )
+    parser.add_argument(
+        "--n-sims", type=int, default=1000000, help="The number of tournaments"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100000,
+        help="Tournaments simulated per batch of random draws",
+    )
+    parser.add_argument("--n-jobs", type=int, default=1, help="Worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="advancement.csv",
+        help="Where to write the round-advancement probabilities",
+    )
+    return parser.parse_args()
+
+
+def slot_round(slot):
+    """
+    Get the round of a bracket slot.
+
+    Args:
+        slot (str): A slot name such as R1W1 or R6CH. Play-in slots (e.g. W16) have no round prefix.
+
+    Returns:
+        int: The round, with 0 for the play-in games.
+    """
+    if slot.startswith("R") and slot[1:2].isdigit():
+        return int(slot[1])
+    return 0
+
+
+def build_bracket(seeds, slots):
+    """
+    Compile a bracket into arrays the simulator can index.
+
+    Every seed and slot label gets a column in the winners array. Seed columns hold
+    their team and each slot, in round order, is filled with the winner of its
+    StrongSeed and WeakSeed columns.
+
+    Args:
+        seeds (pandas.DataFrame): Seed and TeamID of every team in the bracket.
+        slots (pandas.DataFrame): Slot, StrongSeed and WeakSeed of every game.
+
+    Returns:
+        dict: team_ids (numpy.ndarray), the team index held by each seed column
+            (seed_teams), the slots' strong, weak and winner columns, and each slot's round.
+    """
+    slots = slots.assign(Round=slots["Slot"].map(slot_round))
+    slots = slots.sort_values(["Round", "Slot"], kind="stable").reset_index(drop=True)
+
+    seed_labels = list(seeds["Seed"])
+    labels = {label: i for i, label in enumerate(seed_labels + list(slots["Slot"]))}
+
+    team_ids = np.sort(seeds["TeamID"].unique())
+    seed_teams = np.searchsorted(team_ids, seeds["TeamID"].to_numpy())
+
+    return {
+        "team_ids": team_ids,
+        "seed_teams": seed_teams.astype(np.int16),
+        "n_columns": len(labels),
+        "strong": np.array([labels[s] for s in slots["StrongSeed"]]),
+        "weak": np.array([labels[s] for s in slots["WeakSeed"]]),
+        "winner": np.array([labels[s] for s in slots["Slot"]]),
+        "rounds": slots["Round"].to_numpy(),
+    }
+
+
+def build_probability_matrix(predictions, team_ids):
+    """
+    Build the probability that each team beats each other team.
+
+    Args:
+        predictions (pandas.DataFrame): ID ("season_t1_t2") and Pred rows from predict_matchups,
+            where Pred is the probability that T1 wins. Pairs predicted in only one
+            ordering are mirrored.
+        team_ids (numpy.ndarray): The sorted team IDs in the bracket.
+
+    Returns:
+        numpy.ndarray: A (teams, teams) float32 matrix where [i, j] is the probability
+            that team i beats team j.
+
+    Raises:
+        ValueError: If a Pred is not a probability, or a pair of teams has no prediction.
+    """
+    matchups = predictions["ID"].str.split("_", expand=True)
+    t1 = matchups[1].astype(int).to_numpy()
+    t2 = matchups[2].astype(int).to_numpy()
+    probs = predictions["Pred"].to_numpy(dtype=np.float64)
+    if ((probs < 0) | (probs > 1)).any():
+        raise ValueError("Pred must be a win probability between 0 and 1, not a spread")
+
+    # Keep only matchups between teams in the bracket
+    in_bracket = np.isin(t1, team_ids) & np.isin(t2, team_ids)
+    t1_index = np.searchsorted(team_ids, t1[in_bracket])
+    t2_index = np.searchsorted(team_ids, t2[in_bracket])
+
+    P = np.full((len(team_ids), len(team_ids)), np.nan)
+    P[t1_index, t2_index] = probs[in_bracket]
+    P = np.where(np.isnan(P), 1 - P.T, P)
+    np.fill_diagonal(P, 0.5)
+
+    missing = np.isnan(P)
+    if missing.any():
+        i, j = np.argwhere(missing)[0]
+        raise ValueError(f"No prediction for {team_ids[i]} against {team_ids[j]}")
+
+    return P.astype(np.float32)
+
+
+def simulate_batch(bracket, P, n_sims, rng):
+    """
+    Simulate a batch of tournaments and count how often each team wins each round.
+
+    Args:
+        bracket (dict): A bracket from build_bracket.
+        P (numpy.ndarray): The matrix from build_probability_matrix.
+        n_sims (int): The number of tournaments.
+        rng (numpy.random.Generator): The random number generator.
+
+    Returns:
+        numpy.ndarray: A (rounds, teams) array of win counts.
+    """
+    n_teams = len(bracket["team_ids"])
+    rounds = bracket["rounds"]
+
+    winners = np.empty((bracket["n_columns"], n_sims), dtype=np.int16)
+    winners[: len(bracket["seed_teams"])] = bracket["seed_teams"][:, None]
+
+    # Draw every game's random numbers at once
+    draws = rng.random((len(rounds), n_sims), dtype=np.float32)
+
+    counts = np.zeros((rounds.max() + 1, n_teams), dtype=np.int64)
+    for game in range(len(rounds)):
+        strong = winners[bracket["strong"][game]]
+        weak = winners[bracket["weak"][game]]
+        winner = np.where(draws[game] < P[strong, weak], strong, weak)
+        winners[bracket["winner"][game]] = winner
+        counts[rounds[game]] += np.bincount(winner, minlength=n_teams)
+
+    return counts
+
+
+def _simulate_chunk(bracket, P, n_sims, seed_sequence):
+    """
+    Simulate one chunk of tournaments with its own random stream.
+
+    Args:
+        bracket (dict): A bracket from build_bracket.
+        P (numpy.ndarray): The matrix from build_probability_matrix.
+        n_sims (int): The number of tournaments.
+        seed_sequence (numpy.random.SeedSequence): The chunk's seed.
+
+    Returns:
+        numpy.ndarray: A (rounds, teams) array of win counts.
+    """
+    return simulate_batch(bracket, P, n_sims, np.random.default_rng(seed_sequence))
+
+
+def simulate_tournaments(bracket, P, n_sims, batch_size=100000, n_jobs=1, seed=0):
+    """
+    Simulate tournaments and estimate each team's probability of winning each round.
+
+    The simulations are split into batches of batch_size, each with its own seed
+    spawned from seed, so the results do not depend on n_jobs.
+
+    Args:
+        bracket (dict): A bracket from build_bracket.
+        P (numpy.ndarray): The matrix from build_probability_matrix.
+        n_sims (int): The number of tournaments.
+        batch_size (int, optional): Tournaments per batch. Default is 100000.
+        n_jobs (int, optional): Worker processes; 1 runs in this process. Default is 1.
+        seed (int, optional): Seed for the random number generator. Default is 0.
+
+    Returns:
+        pandas.DataFrame: One row per team with the probability of winning a game in each round.
+    """
+    batches = [
+        min(batch_size, n_sims - start) for start in range(0, n_sims, batch_size)
+    ]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(batches))
+
+    if n_jobs == 1:
+        results = map(
+            _simulate_chunk,
+            [bracket] * len(batches),
+            [P] * len(batches),
+            batches,
+            seed_sequences,
+        )
+        counts = sum(results)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = executor.map(
+                _simulate_chunk,
+                [bracket] * len(batches),
+                [P] * len(batches),
+                batches,
+                seed_sequences,
+            )
+            counts = sum(results)
+
+    advancement = pd.DataFrame(
+        (counts / n_sims).T,
+        columns=["PlayIn" if r == 0 else f"R{r}" for r in range(counts.shape[0])],
+    )
+    advancement.insert(0, "TeamID", bracket["team_ids"])
+
+    # Teams without a play-in game are through it
+    if "PlayIn" in advancement.columns:
+        played_in = np.zeros(len(bracket["team_ids"]), dtype=bool)
+        play_in_games = bracket["rounds"] == 0
+        n_seeds = len(bracket["seed_teams"])
+        for column in np.concatenate(
+            [bracket["strong"][play_in_games], bracket["weak"][play_in_games]]
+        ):
+            if column < n_seeds:
+                played_in[bracket["seed_teams"][column]] = True
+        advancement.loc[~played_in, "PlayIn"] = 1.0
+
+    return advancement
+
+
+def read_table(path):
+    """
+    Read a CSV or Parquet file.
+
+    Args:
+        path (str): The file to read; a .parquet suffix is read as Parquet, otherwise CSV.
+
+    Returns:
+        pandas.DataFrame: The file's contents.
+    """
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    # Load the bracket for the season
+    seeds = read_table(args.seeds)
+    slots = read_table(args.slots)
+    if args.season is not None:
+        if "Season" in seeds.columns:
+            seeds = seeds[seeds["Season"] == args.season]
+        if "Season" in slots.columns:
+            slots = slots[slots["Season"] == args.season]
+
+    bracket = build_bracket(seeds, slots)
+    P = build_probability_matrix(read_table(args.predictions), bracket["team_ids"])
+
+    advancement = simulate_tournaments(
+        bracket,
+        P,
+        args.n_sims,
+        batch_size=args.batch_size,
+        n_jobs=args.n_jobs,
+        seed=args.seed,
+    )
+    advancement = advancement.merge(seeds[["Seed", "TeamID"]], on="TeamID")
+    advancement.sort_values("Seed").to_csv(args.output, index=False)
+    print(
+        f"Wrote advancement probabilities for {len(advancement)} teams to {args.output}"
+    )
@@ -1,39 +1,95 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
+import hashlib
 import numpy as np
 import os
 import pandas as pd
+from sklearn.metrics import log_loss
 from sklearn.model_selection import KFold
+import weakref
 import xgboost as xgb
 
-from ..utils import execute_sql_query, insert_dataframe, load_config
+from ..data.table_cache import CACHE_DIR, load_cached_table
+from ..utils import (
+    copy_dataframe,
+    copy_sql_query,
+    get_run_id,
+    load_config,
+    stream_sql_query,
+)
+from .calibration import SpreadCalibrator, fit_spline_calibrator, save_calibrator
 
 
-def load_training_data(config):
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run the train_model script")
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=1,
+        help="Number of processes to run the cross-validation repeats in",
+    )
+    parser.add_argument(
+        "--threads-per-worker",
+        type=int,
+        default=None,
+        help="XGBoost threads for each cross-validation process",
+    )
+    parser.add_argument(
+        "--recalibrate",
+        type=str,
+        metavar="MODEL_ID",
+        help="Refit a trained model's calibrators from its saved out-of-fold predictions",
+    )
+    parser.add_argument(
+        "--jit",
+        action="store_true",
+        help="Compute the Cauchy objective with a numba-compiled kernel (requires numba)",
+    )
+    return parser.parse_args()
+
+
+def load_training_data(config, method="cache", itersize=50000):
     """
     Load training data from the training_data_kaggle table.
 
     Args:
         config (dict): A dictionary containing database connection parameters.
+        method (str, optional): "cache" (default) serves the data from a local Parquet cache
+            that is refreshed when boxscores_kaggle or training_data_kaggle change. "copy"
+            sends the table with COPY TO STDOUT and parses it with pandas' CSV reader, which
+            is the fastest database path. "stream" reads it through a server-side cursor in
+            chunks of itersize rows, keeping only one chunk of Python objects in memory at a time.
+        itersize (int, optional): The number of rows per chunk when streaming. Default is 50000.
 
     Returns:
         pandas.DataFrame: A DataFrame containing the loaded training data.
     """
-    training_data_query = """ 
+    training_data_query = """
         SELECT
-        * 
-        FROM training_data_kaggle 
-        WHERE DayNum >= 90;
-    """
-    training_data = execute_sql_query(
-        database=config["database"],
-        user=config["user"],
-        password=config["password"],
-        host=config["host"],
-        port=config["port"],
-        query=training_data_query,
-        return_pandas=True,
-    )
+        *
+        FROM training_data_kaggle
+        WHERE DayNum >= 90
+    """
+    if method == "cache":
+        training_data = load_cached_table(
+            config,
+            "training_data_kaggle",
+            training_data_query,
+            ["boxscores_kaggle", "training_data_kaggle"],
+        )
+    elif method == "stream":
+        chunks = list(stream_sql_query(config, training_data_query, itersize=itersize))
+        training_data = pd.concat(chunks, ignore_index=True)
+    else:
+        training_data = copy_sql_query(config, training_data_query)
     return training_data
 
 
@@ -45,7 +101,7 @@ def preprocess_data(training_data):
         training_data (pandas.DataFrame): A DataFrame containing training data.
 
     Returns:
-        tuple: A tuple containing features (X) and target variable (y).
+        tuple: A tuple containing float32 features (X) and target variable (y).
     """
     y = training_data["t1_score"] - training_data["t2_score"]
 
@@ -95,8 +151,74 @@ def preprocess_data(training_data):
     ]
     features = [f.lower() for f in features]
 
-    X = training_data[features].values
-    return X, y
+    X = training_data[features].to_numpy(dtype=np.float32)
+    return X, y.to_numpy(dtype=np.float32)
+
+
+def data_fingerprint(X, y):
+    """
+    Hash the training data so results computed on it can be recognised later.
+
+    Args:
+        X (numpy.ndarray): Features for training.
+        y (numpy.ndarray): Target variable for training.
+
+    Returns:
+        str: A hex digest that changes whenever any feature or target value changes.
+    """
+    X = np.ascontiguousarray(X)
+    y = np.ascontiguousarray(y)
+
+    digest = hashlib.sha256()
+    digest.update(f"{X.shape} {X.dtype} {y.dtype}".encode())
+    digest.update(X.tobytes())
+    digest.update(y.tobytes())
+    return digest.hexdigest()
+
+
+def cache_training_dmatrix(X, y, cache_dir=CACHE_DIR):
+    """
+    Save the training DMatrix as an XGBoost binary keyed by the data fingerprint.
+
+    The binary is only written when no file exists for the fingerprint, so repeated
+    runs on unchanged training data reuse it. Writing a new binary deletes the ones
+    left by earlier fingerprints, so the cache holds a single training matrix.
+
+    Args:
+        X (numpy.ndarray): Features for training.
+        y (numpy.ndarray): Target variable for training.
+        cache_dir (str, optional): The directory holding the cache files. Default is data/cache.
+
+    Returns:
+        str: The path of the DMatrix binary.
+    """
+    path = os.path.join(cache_dir, f"dmatrix_{data_fingerprint(X, y)}.buffer")
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        xgb.DMatrix(X, label=y).save_binary(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        for name in os.listdir(cache_dir):
+            stale = os.path.join(cache_dir, name)
+            if name.startswith("dmatrix_") and stale != path:
+                os.remove(stale)
+    return path
+
+
+def load_training_dmatrix(X, y, dmatrix_path=None):
+    """
+    Get the training DMatrix, from its cached binary when there is one.
+
+    Args:
+        X (numpy.ndarray): Features for training.
+        y (numpy.ndarray): Target variable for training.
+        dmatrix_path (str, optional): A binary from cache_training_dmatrix.
+
+    Returns:
+        xgb.DMatrix: The training data.
+    """
+    if dmatrix_path is not None:
+        return xgb.DMatrix(dmatrix_path)
+    return xgb.DMatrix(X, label=y)
 
 
 def cauchyobj(preds, dtrain):
@@ -118,40 +240,445 @@ def cauchyobj(preds, dtrain):
     return grad, hess
 
 
-def train_and_evaluate_models(X, y, param, repeat_cv=3):
+class CauchyObjective:
+    """
+    Reusable Cauchy objective for XGBoost, equivalent to cauchyobj.
+
+    Labels are read once per DMatrix and cached, and the gradient and hessian are
+    written into preallocated buffers, so a boosting round does no label copies and
+    only a handful of in-place array operations.
+
+    Args:
+        c (float, optional): The Cauchy scale. Default is 5000.
+        jit (bool, optional): If True, compute grad/hess with a numba-compiled kernel.
+            Requires numba to be installed. Default is False.
+    """
+
+    def __init__(self, c=5000, jit=False):
+        self.c2 = float(c) ** 2
+        self._buffers = weakref.WeakKeyDictionary()
+        self._kernel = _compile_cauchy_kernel() if jit else None
+
+    def _get_buffers(self, dtrain):
+        buffers = self._buffers.get(dtrain)
+        if buffers is None:
+            labels = dtrain.get_label()
+            buffers = (
+                labels,
+                np.empty_like(labels),
+                np.empty_like(labels),
+                np.empty_like(labels),
+            )
+            self._buffers[dtrain] = buffers
+        return buffers
+
+    def __call__(self, preds, dtrain):
+        labels, grad, hess, denominator = self._get_buffers(dtrain)
+
+        if self._kernel is not None:
+            self._kernel(preds, labels, self.c2, grad, hess)
+            return grad, hess
+
+        # With x = preds - labels and d = x**2 + c**2:
+        # grad = x * c**2 / d and hess = c**2 * (c**2 - x**2) / d**2
+        np.subtract(preds, labels, out=grad)
+        np.multiply(grad, grad, out=hess)
+        np.add(hess, self.c2, out=denominator)
+        np.subtract(self.c2, hess, out=hess)
+        np.multiply(hess, self.c2, out=hess)
+        np.multiply(grad, self.c2, out=grad)
+        np.divide(grad, denominator, out=grad)
+        np.multiply(denominator, denominator, out=denominator)
+        np.divide(hess, denominator, out=hess)
+        return grad, hess
+
+
+def _compile_cauchy_kernel():
+    """
+    Compile the fused Cauchy grad/hess loop with numba.
+
+    Returns:
+        callable: kernel(preds, labels, c2, grad, hess) that fills grad and hess in place.
+    """
+    import numba
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def kernel(preds, labels, c2, grad, hess):
+        for i in numba.prange(preds.shape[0]):
+            x = preds[i] - labels[i]
+            x2 = x * x
+            d = x2 + c2
+            grad[i] = x * c2 / d
+            hess[i] = c2 * (c2 - x2) / (d * d)
+
+    return kernel
+
+
+def get_objective(param, jit=False):
+    """
+    Get the custom objective to train with for a set of parameters.
+
+    Args:
+        param (dict): Parameters for XGBoost model. If param sets a built-in "objective",
+            e.g. "reg:pseudohubererror", XGBoost's native objective is used instead.
+        jit (bool, optional): If True, use the numba-compiled Cauchy kernel. Default is False.
+
+    Returns:
+        CauchyObjective or None: The objective to pass as obj, or None for a built-in one.
+    """
+    if "objective" in param:
+        return None
+    return CauchyObjective(jit=jit)
+
+
+def run_cv_repeat(dtrain, param, seed, verbose_eval=50, jit=False):
+    """
+    Run one repeat of 5-fold cross-validation.
+
+    Args:
+        dtrain (xgb.DMatrix): The training data.
+        param (dict): Parameters for XGBoost model.
+        seed (int): The random state used to shuffle the folds.
+        verbose_eval (int or bool, optional): How often to print evaluation results. Default is 50.
+        jit (bool, optional): If True, use the numba-compiled Cauchy kernel. Default is False.
+
+    Returns:
+        pandas.DataFrame: The cross-validation history returned by xgb.cv.
+    """
+    return xgb.cv(
+        params=param,
+        dtrain=dtrain,
+        obj=get_objective(param, jit=jit),
+        num_boost_round=800,
+        folds=KFold(n_splits=5, shuffle=True, random_state=seed),
+        early_stopping_rounds=25,
+        verbose_eval=verbose_eval,
+    )
+
+
+# DMatrix built once per cross-validation worker process
+_worker_dtrain = None
+
+
+def _init_cv_worker(X, y, dmatrix_path=None):
+    """
+    Build the training DMatrix once in a cross-validation worker process.
+
+    Args:
+        X (numpy.ndarray): Features for training.
+        y (numpy.ndarray): Target variable for training.
+        dmatrix_path (str, optional): A binary from cache_training_dmatrix to load instead.
+    """
+    global _worker_dtrain
+    _worker_dtrain = load_training_dmatrix(X, y, dmatrix_path)
+
+
+def _worker_initargs(X, y, dmatrix_path=None):
+    """
+    Get the arguments for _init_cv_worker, leaving out X and y when a cached binary exists.
+
+    Args:
+        X (numpy.ndarray): Features for training.
+        y (numpy.ndarray): Target variable for training.
+        dmatrix_path (str, optional): A binary from cache_training_dmatrix.
+
+    Returns:
+        tuple: The initializer arguments.
+    """
+    if dmatrix_path is not None:
+        return (None, None, dmatrix_path)
+    return (X, y)
+
+
+def _run_cv_repeat_in_worker(param, seed, jit=False):
+    """
+    Run one repeat of cross-validation on the worker's DMatrix.
+
+    Args:
+        param (dict): Parameters for XGBoost model.
+        seed (int): The random state used to shuffle the folds.
+        jit (bool, optional): If True, use the numba-compiled Cauchy kernel. Default is False.
+
+    Returns:
+        pandas.DataFrame: The cross-validation history returned by xgb.cv.
+    """
+    return run_cv_repeat(_worker_dtrain, param, seed, verbose_eval=False, jit=jit)
+
+
+def train_and_evaluate_models(
+    X,
+    y,
+    param,
+    repeat_cv=3,
+    n_jobs=1,
+    threads_per_worker=None,
+    dmatrix_path=None,
+    jit=False,
+):
     """
     Train and evaluate XGBoost models using cross-validation.
 
+    Repeat i always shuffles its folds with random_state=i, so running the repeats in
+    parallel gives the same results as running them one after another.
+
     Args:
         X (numpy.ndarray): Features for training.
         y (numpy.ndarray): Target variable for training.
         param (dict): Parameters for XGBoost model.
         repeat_cv (int, optional): Number of times to repeat cross-validation. Default is 3.
+        n_jobs (int, optional): Number of worker processes to spread the repeats across.
+            Default is 1, which runs the repeats serially in this process.
+        threads_per_worker (int, optional): XGBoost nthread for each worker process. Default
+            is None, which leaves nthread as set in param.
+        dmatrix_path (str, optional): A binary from cache_training_dmatrix. When given the
+            DMatrix is loaded from it, and X is not sent to worker processes.
+        jit (bool, optional): If True, compute the Cauchy objective with the numba-compiled
+            kernel. Default is False.
 
     Returns:
         tuple: A tuple containing iteration counts and validation mean absolute errors.
     """
-    dtrain = xgb.DMatrix(X, label=y)
-    xgb_cv = []
-    for i in range(repeat_cv):
-        print(f"Fold repeater {i}")
-        xgb_cv.append(
-            xgb.cv(
-                params=param,
-                dtrain=dtrain,
-                obj=cauchyobj,
-                num_boost_round=800,
-                folds=KFold(n_splits=5, shuffle=True, random_state=i),
-                early_stopping_rounds=25,
-                verbose_eval=50,
+    if n_jobs == 1:
+        dtrain = load_training_dmatrix(X, y, dmatrix_path)
+        xgb_cv = []
+        for i in range(repeat_cv):
+            print(f"Fold repeater {i}")
+            xgb_cv.append(run_cv_repeat(dtrain, param, i, jit=jit))
+    else:
+        worker_param = dict(param)
+        if threads_per_worker is not None:
+            worker_param["nthread"] = threads_per_worker
+
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_cv_worker,
+            initargs=_worker_initargs(X, y, dmatrix_path),
+        ) as executor:
+            xgb_cv = list(
+                executor.map(
+                    _run_cv_repeat_in_worker,
+                    [worker_param] * repeat_cv,
+                    range(repeat_cv),
+                    [jit] * repeat_cv,
+                )
             )
-        )
+
+    return summarize_cv(xgb_cv)
+
+
+def summarize_cv(xgb_cv):
+    """
+    Get the best iteration and validation error of each cross-validation repeat.
+
+    Args:
+        xgb_cv (list): Cross-validation histories returned by xgb.cv.
+
+    Returns:
+        tuple: A tuple containing iteration counts and validation mean absolute errors.
+    """
     iteration_counts = [np.argmin(x["test-mae-mean"].values) for x in xgb_cv]
     val_mae = [np.min(x["test-mae-mean"].values) for x in xgb_cv]
     return iteration_counts, val_mae
 
 
-def train_and_save_models(X, y, param, iteration_counts, new_folder_path, repeat_cv=3):
+def _predict_oof_fold(dtrain, param, num_boost_round, train_index, val_index):
+    """
+    Train on one fold's training rows and predict its validation rows.
+
+    Args:
+        dtrain (xgb.DMatrix): The full training data.
+        param (dict): Parameters for XGBoost model.
+        num_boost_round (int): The number of boosting rounds.
+        train_index (numpy.ndarray): The fold's training rows.
+        val_index (numpy.ndarray): The fold's validation rows.
+
+    Returns:
+        numpy.ndarray: Predictions for the validation rows.
+    """
+    # Row-sliced views of the full DMatrix avoid copying X for every fold
+    dtrain_i = dtrain.slice(train_index)
+    dval_i = dtrain.slice(val_index)
+    model = xgb.train(params=param, dtrain=dtrain_i, num_boost_round=num_boost_round)
+    return model.predict(dval_i)
+
+
+def _predict_oof_fold_in_worker(param, num_boost_round, train_index, val_index):
+    """
+    Train and predict one out-of-fold split on the worker's DMatrix.
+
+    Args:
+        param (dict): Parameters for XGBoost model.
+        num_boost_round (int): The number of boosting rounds.
+        train_index (numpy.ndarray): The fold's training rows.
+        val_index (numpy.ndarray): The fold's validation rows.
+
+    Returns:
+        numpy.ndarray: Predictions for the validation rows.
+    """
+    return _predict_oof_fold(
+        _worker_dtrain, param, num_boost_round, train_index, val_index
+    )
+
+
+def get_oof_predictions(
+    X,
+    y,
+    param,
+    iteration_counts,
+    repeat_cv=3,
+    n_jobs=1,
+    threads_per_worker=None,
+    dmatrix_path=None,
+):
+    """
+    Get out-of-fold predicted spreads for each cross-validation repeat.
+
+    Repeat i uses the same folds as cross-validation (random_state=i) and trains
+    each fold for iteration_counts[i] rounds. The DMatrix is built once (once per
+    worker process when n_jobs > 1) and each fold trains on row slices of it.
+
+    Args:
+        X (numpy.ndarray): Features for training.
+        y (numpy.ndarray): Target variable for training.
+        param (dict): Parameters for XGBoost model.
+        iteration_counts (list): Iteration counts obtained from cross-validation.
+        repeat_cv (int, optional): Number of times to repeat cross-validation. Default is 3.
+        n_jobs (int, optional): Number of worker processes to spread the folds across.
+            Default is 1, which trains the folds serially in this process.
+        threads_per_worker (int, optional): XGBoost nthread for each worker process. Default
+            is None, which leaves nthread as set in param.
+        dmatrix_path (str, optional): A binary from cache_training_dmatrix. When given the
+            DMatrix is loaded from it, and X is not sent to worker processes.
+
+    Returns:
+        list: One array of out-of-fold predictions per repeat.
+    """
+    y = np.asarray(y)
+
+    folds = []
+    for i in range(repeat_cv):
+        kfold = KFold(n_splits=5, shuffle=True, random_state=i)
+        for train_index, val_index in kfold.split(X, y):
+            folds.append((i, train_index, val_index))
+
+    if n_jobs == 1:
+        dtrain = load_training_dmatrix(X, y, dmatrix_path)
+        fold_preds = [
+            _predict_oof_fold(
+                dtrain, param, iteration_counts[i], train_index, val_index
+            )
+            for i, train_index, val_index in folds
+        ]
+    else:
+        worker_param = dict(param)
+        if threads_per_worker is not None:
+            worker_param["nthread"] = threads_per_worker
+
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_cv_worker,
+            initargs=_worker_initargs(X, y, dmatrix_path),
+        ) as executor:
+            fold_preds = list(
+                executor.map(
+                    _predict_oof_fold_in_worker,
+                    [worker_param] * len(folds),
+                    [iteration_counts[i] for i, _, _ in folds],
+                    [train_index for _, train_index, _ in folds],
+                    [val_index for _, _, val_index in folds],
+                )
+            )
+
+    oof_preds = [y.astype("float64").copy() for _ in range(repeat_cv)]
+    for (i, _, val_index), preds in zip(folds, fold_preds):
+        oof_preds[i][val_index] = preds
+    return oof_preds
+
+
+def oof_predictions_path(model_dir, model_id):
+    """
+    Get the file the out-of-fold predictions of a training run are saved to.
+
+    Args:
+        model_dir (str): The folder holding the run's models.
+        model_id (str): The ID of the model.
+
+    Returns:
+        str: The path of the .npz file.
+    """
+    return os.path.join(model_dir, f"oof_predictions_{model_id}.npz")
+
+
+def save_oof_predictions(oof_preds, y, path):
+    """
+    Save out-of-fold predictions and the targets they were made for.
+
+    Args:
+        oof_preds (list): Out-of-fold predictions from get_oof_predictions.
+        y (numpy.ndarray): Target variable for training.
+        path (str): The .npz file to write.
+    """
+    np.savez(path, oof_preds=np.array(oof_preds), y=np.asarray(y))
+
+
+def load_oof_predictions(path):
+    """
+    Load out-of-fold predictions saved by save_oof_predictions.
+
+    Args:
+        path (str): The .npz file to read.
+
+    Returns:
+        tuple: A list of out-of-fold prediction arrays, one per repeat, and the targets.
+    """
+    with np.load(path) as data:
+        return list(data["oof_preds"]), data["y"]
+
+
+def recalibrate_models(model_id):
+    """
+    Refit a model's calibrators from its saved out-of-fold predictions without retraining.
+
+    Args:
+        model_id (str): The ID of the model, i.e. its directory under src/models/.
+    """
+    model_dir = f"src/models/{model_id}"
+    oof_preds, y = load_oof_predictions(oof_predictions_path(model_dir, model_id))
+    model_paths = [
+        os.path.join(model_dir, f"xgboost_model_{model_id}_{str(i)}.model")
+        for i in range(len(oof_preds))
+    ]
+    calibrate_models(oof_preds, y, model_paths)
+
+
+def calibrate_models(oof_preds, y, model_paths):
+    """
+    Fit a spread-to-probability calibrator per model and save it next to the model.
+
+    Args:
+        oof_preds (list): Out-of-fold predictions from get_oof_predictions.
+        y (numpy.ndarray): Target variable for training.
+        model_paths (list): The saved model file of each repeat.
+    """
+    for i, model_path in enumerate(model_paths):
+        calibrator = fit_spline_calibrator(oof_preds[i], y)
+        save_calibrator(calibrator, model_path)
+
+        spline_fit = SpreadCalibrator(calibrator)(oof_preds[i])
+        print(f"logloss of cvsplit {i}: {log_loss(np.where(y > 0, 1, 0), spline_fit)}")
+
+
+def train_and_save_models(
+    X,
+    y,
+    param,
+    iteration_counts,
+    new_folder_path,
+    repeat_cv=3,
+    val_mae=None,
+    now=None,
+    dmatrix_path=None,
+):
     """
     Train XGBoost models and save them to a specified folder.
 
@@ -160,13 +687,22 @@ def train_and_save_models(X, y, param, iteration_counts, new_folder_path, repeat
         y (numpy.ndarray): Target variable for training.
         param (dict): Parameters for XGBoost model.
         iteration_counts (list): Iteration counts obtained from cross-validation.
-        new_folder_path (str): Path to the folder where models will be saved.
+        new_folder_path (str): Path to the folder where models will be saved. Its name
+            is the model ID.
         repeat_cv (int, optional): Number of times to repeat cross-validation. Default is 3.
+        val_mae (list, optional): Validation mean absolute errors from cross-validation.
+        now (datetime, optional): The training timestamp. Default is the current time.
+        dmatrix_path (str, optional): A binary from cache_training_dmatrix to load the
+            DMatrix from.
 
     Returns:
         pandas.DataFrame: DataFrame containing information about the training run.
     """
-    dtrain = xgb.DMatrix(X, label=y)
+    model_id = os.path.basename(os.path.normpath(new_folder_path))
+    if now is None:
+        now = datetime.now()
+
+    dtrain = load_training_dmatrix(X, y, dmatrix_path)
 
     training_run_data = []
 
@@ -181,7 +717,7 @@ def train_and_save_models(X, y, param, iteration_counts, new_folder_path, repeat
                 verbose_eval=50,
             )
         )
-        filename = f"xgboost_model_{datetime_str}_{str(i)}.model"
+        filename = f"xgboost_model_{model_id}_{str(i)}.model"
         pred_models[i].save_model(os.path.join(new_folder_path, filename))
 
         training_run_data.append(
@@ -189,8 +725,9 @@ def train_and_save_models(X, y, param, iteration_counts, new_folder_path, repeat
                 "trainingTimestamp": now,
                 "fileLocation": new_folder_path + "/" + filename,
                 "iterationCounts": int(iteration_counts[i] * 1.05),
-                "valMae": val_mae[i],
+                "valMae": None if val_mae is None else val_mae[i],
                 "trainingExamples": len(X),
+                "runId": get_run_id(),
             }
         )
 
@@ -198,16 +735,99 @@ def train_and_save_models(X, y, param, iteration_counts, new_folder_path, repeat
     return training_run_data
 
 
-if __name__ == "__main__":
-    # Load up configs, environment vars
-    load_dotenv()
-    config = load_config()
+def run_training(
+    X,
+    y,
+    param,
+    iteration_counts,
+    val_mae,
+    config,
+    n_jobs=1,
+    threads_per_worker=None,
+    dmatrix_path=None,
+):
+    """
+    Train, calibrate and register the final models for a set of parameters.
+
+    The models, their calibrators and out-of-fold predictions are saved in a new
+    src/models/<model_id> folder and the run is recorded in training_runs.
+
+    Args:
+        X (numpy.ndarray): Features for training.
+        y (numpy.ndarray): Target variable for training.
+        param (dict): Parameters for XGBoost model.
+        iteration_counts (list): Iteration counts obtained from cross-validation.
+        val_mae (list): Validation mean absolute errors from cross-validation.
+        config (dict): A dictionary containing database connection parameters.
+        n_jobs (int, optional): Number of processes for the out-of-fold folds. Default is 1.
+        threads_per_worker (int, optional): XGBoost nthread for each worker process.
+        dmatrix_path (str, optional): A binary from cache_training_dmatrix to load the
+            DMatrix from.
+
+    Returns:
+        str: The ID of the new model.
+    """
+    # Create a new folder for saving models
+    now = datetime.now()
+    datetime_str = now.strftime("%Y%m%d%H%M%S")
+    new_folder_path = f"src/models/{datetime_str}"
+    os.mkdir(new_folder_path)
+
+    # Train and save final models
+    training_run_data = train_and_save_models(
+        X,
+        y,
+        param,
+        iteration_counts,
+        new_folder_path,
+        val_mae=val_mae,
+        now=now,
+        dmatrix_path=dmatrix_path,
+    )
+
+    # Save out-of-fold predictions and fit spread-to-probability calibrators from them
+    oof_preds = get_oof_predictions(
+        X,
+        y,
+        param,
+        iteration_counts,
+        n_jobs=n_jobs,
+        threads_per_worker=threads_per_worker,
+        dmatrix_path=dmatrix_path,
+    )
+    save_oof_predictions(
+        oof_preds, y, oof_predictions_path(new_folder_path, datetime_str)
+    )
+    calibrate_models(oof_preds, y, training_run_data["fileLocation"])
+
+    # Save training run data
+    copy_dataframe(training_run_data, "training_runs", config)
+
+    return datetime_str
+
 
+def train_models(config, n_jobs=1, threads_per_worker=None, jit=False):
+    """
+    Cross-validate, train, calibrate and save models on the current training data.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        n_jobs (int, optional): Number of processes to run the cross-validation repeats in.
+        threads_per_worker (int, optional): XGBoost nthread for each worker process.
+        jit (bool, optional): If True, cross-validate with the numba-compiled Cauchy kernel.
+
+    Returns:
+        str: The ID of the saved models.
+    """
     # Load training data
     training_data = load_training_data(config)
 
     # Seperate observations and results
     X, y = preprocess_data(training_data)
+    del training_data
+
+    # Build the DMatrix once and reuse its binary across CV and final training
+    dmatrix_path = cache_training_dmatrix(X, y)
 
     # Define parameters
     param = {}
@@ -221,18 +841,43 @@ if __name__ == "__main__":
     param["gamma"] = 10
     param["max_depth"] = 3
 
-    iteration_counts, val_mae = train_and_evaluate_models(X, y, param)
-
-    # Create a new folder for saving models
-    now = datetime.now()
-    datetime_str = now.strftime("%Y%m%d%H%M%S")
-    new_folder_path = f"src/models/{datetime_str}"
-    os.mkdir(new_folder_path)
+    iteration_counts, val_mae = train_and_evaluate_models(
+        X,
+        y,
+        param,
+        n_jobs=n_jobs,
+        threads_per_worker=threads_per_worker,
+        dmatrix_path=dmatrix_path,
+        jit=jit,
+    )
 
-    # Train and save final models
-    training_run_data = train_and_save_models(
-        X, y, param, iteration_counts, new_folder_path
+    # Train, calibrate and save the final models
+    return run_training(
+        X,
+        y,
+        param,
+        iteration_counts,
+        val_mae,
+        config,
+        n_jobs=n_jobs,
+        threads_per_worker=threads_per_worker,
+        dmatrix_path=dmatrix_path,
     )
 
-    # Save training run data
-    insert_dataframe(training_run_data, "training_runs", config)
+
+if __name__ == "__main__":
+    # Load up args, configs, environment vars
+    args = parse_arguments()
+    load_dotenv()
+    config = load_config()
+
+    if args.recalibrate is not None:
+        # Refit calibrators only, reusing the saved out-of-fold predictions
+        recalibrate_models(args.recalibrate)
+    else:
+        train_models(
+            config,
+            n_jobs=args.n_jobs,
+            threads_per_worker=args.threads_per_worker,
+            jit=args.jit,
+        )
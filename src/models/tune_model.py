@@ -0,0 +1,458 @@
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dotenv import load_dotenv
+import hashlib
+from hyperopt import (
+    JOB_STATE_DONE,
+    JOB_STATE_RUNNING,
+    STATUS_OK,
+    STATUS_RUNNING,
+    Trials,
+    hp,
+    space_eval,
+    tpe,
+)
+from hyperopt.base import Domain
+from hyperopt.pyll import scope
+import json
+import numpy as np
+
+from ..utils import create_table, execute_sql_query, load_config
+from . import train_model
+from .train_model import (
+    cache_training_dmatrix,
+    data_fingerprint,
+    load_training_data,
+    preprocess_data,
+    run_cv_repeat,
+    run_training,
+    summarize_cv,
+)
+
+# Parameters shared by every trial
+BASE_PARAM = {
+    "eval_metric": "mae",
+    "booster": "gbtree",
+    "num_parallel_tree": 3,
+}
+
+SEARCH_SPACE = {
+    "eta": hp.loguniform("eta", np.log(0.01), np.log(0.3)),
+    "max_depth": scope.int(hp.quniform("max_depth", 2, 8, 1)),
+    "min_child_weight": hp.qloguniform("min_child_weight", np.log(1), np.log(200), 1),
+    "subsample": hp.uniform("subsample", 0.3, 1.0),
+    "colsample_bytree": hp.uniform("colsample_bytree", 0.4, 1.0),
+    "gamma": hp.uniform("gamma", 0, 20),
+}
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Tune the XGBoost parameters with hyperopt"
+    )
+    parser.add_argument(
+        "--max-evals",
+        type=int,
+        default=50,
+        help="Total trials for this training data, including ones already stored",
+    )
+    parser.add_argument(
+        "--n-jobs", type=int, default=1, help="Trials evaluated in parallel"
+    )
+    parser.add_argument(
+        "--threads-per-worker",
+        type=int,
+        default=None,
+        help="XGBoost threads for each trial process",
+    )
+    parser.add_argument(
+        "--repeat-cv", type=int, default=3, help="Cross-validation repeats per trial"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for TPE")
+    parser.add_argument(
+        "--train",
+        action="store_true",
+        help="Train, calibrate and save the final models with the best trial's parameters",
+    )
+    return parser.parse_args()
+
+
+def create_tuning_trials_table(config):
+    """
+    Create the 'tuning_trials' table in the PostgreSQL database if it does not exist.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+    """
+    table_name = "tuning_trials"
+    table_definition = f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            dataFingerprint VARCHAR NOT NULL,
+            searchKey VARCHAR NOT NULL DEFAULT '',
+            paramHash VARCHAR NOT NULL,
+            params JSONB,
+            vals JSONB,
+            iterationCounts JSONB,
+            valMae JSONB,
+            loss DOUBLE PRECISION,
+            completedTimestamp TIMESTAMP DEFAULT NOW())
+    """
+    create_table(**config, table_name=table_name, table_definition=table_definition)
+
+    # Tables created before searches were keyed hold trials from unknown searches,
+    # which get an empty key and are never resumed
+    execute_sql_query(
+        **config,
+        query=f"""
+        ALTER TABLE {table_name}
+            ADD COLUMN IF NOT EXISTS searchKey VARCHAR NOT NULL DEFAULT '';
+        ALTER TABLE {table_name} DROP CONSTRAINT IF EXISTS {table_name}_pkey;
+        CREATE UNIQUE INDEX IF NOT EXISTS {table_name}_trial_key
+            ON {table_name} (dataFingerprint, searchKey, paramHash);
+        """,
+    )
+
+
+def search_key(repeat_cv):
+    """
+    Hash what a trial's loss depends on besides its data and parameters.
+
+    Trials are only resumed by a search with the same search space, shared
+    parameters and number of cross-validation repeats.
+
+    Args:
+        repeat_cv (int): Number of times each trial repeats cross-validation.
+
+    Returns:
+        str: A hex digest that changes when SEARCH_SPACE, BASE_PARAM or repeat_cv change.
+    """
+    search = {
+        "space": {label: str(node) for label, node in sorted(SEARCH_SPACE.items())},
+        "base_param": BASE_PARAM,
+        "repeat_cv": repeat_cv,
+    }
+    return hashlib.sha256(json.dumps(search, sort_keys=True).encode()).hexdigest()
+
+
+def param_hash(param):
+    """
+    Hash a set of XGBoost parameters.
+
+    Args:
+        param (dict): Parameters for XGBoost model.
+
+    Returns:
+        str: A hex digest that is the same for equal parameters in any order.
+    """
+    return hashlib.sha256(json.dumps(param, sort_keys=True).encode()).hexdigest()
+
+
+def load_trials(config, fingerprint, search_hash):
+    """
+    Load the stored trials of a search on a training data fingerprint.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        fingerprint (str): The training data fingerprint from data_fingerprint.
+        search_hash (str): The search's key from search_key.
+
+    Returns:
+        dict: Stored trials keyed by parameter hash, each with params, vals,
+            iteration_counts, val_mae and loss.
+    """
+    trials_query = """
+    SELECT
+    paramHash, params, vals, iterationCounts, valMae, loss
+    FROM tuning_trials
+    WHERE dataFingerprint = %s AND searchKey = %s
+    ORDER BY completedTimestamp;
+    """
+    rows = execute_sql_query(
+        **config, query=trials_query, params=(fingerprint, search_hash)
+    )
+    return {
+        row[0]: {
+            "params": row[1],
+            "vals": row[2],
+            "iteration_counts": row[3],
+            "val_mae": row[4],
+            "loss": row[5],
+        }
+        for row in rows
+    }
+
+
+def save_trial(config, fingerprint, search_hash, trial):
+    """
+    Store a finished trial.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        fingerprint (str): The training data fingerprint from data_fingerprint.
+        search_hash (str): The search's key from search_key.
+        trial (dict): The trial's params, vals, iteration_counts, val_mae and loss.
+    """
+    insert_query = """
+    INSERT INTO tuning_trials
+        (dataFingerprint, searchKey, paramHash, params, vals, iterationCounts, valMae, loss)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (dataFingerprint, searchKey, paramHash) DO NOTHING;
+    """
+    execute_sql_query(
+        **config,
+        query=insert_query,
+        params=(
+            fingerprint,
+            search_hash,
+            param_hash(trial["params"]),
+            json.dumps(trial["params"]),
+            json.dumps(trial["vals"]),
+            json.dumps(trial["iteration_counts"]),
+            json.dumps(trial["val_mae"]),
+            trial["loss"],
+        ),
+    )
+
+
+def _evaluate_param_in_worker(param, repeat_cv):
+    """
+    Cross-validate one set of parameters on the worker's DMatrix.
+
+    Args:
+        param (dict): Parameters for XGBoost model.
+        repeat_cv (int): Number of times to repeat cross-validation.
+
+    Returns:
+        tuple: A tuple containing iteration counts and validation mean absolute errors.
+    """
+    xgb_cv = [
+        run_cv_repeat(train_model._worker_dtrain, param, i, verbose_eval=False)
+        for i in range(repeat_cv)
+    ]
+    return summarize_cv(xgb_cv)
+
+
+def _add_trial(trials, domain, vals, loss=None, tid=None):
+    """
+    Record a trial in hyperopt's history so TPE learns from it.
+
+    A trial without a loss is recorded as running. TPE scores running trials as
+    infinitely bad, a constant liar that keeps the next suggestion away from them
+    until _complete_trial gives them their real loss.
+
+    Args:
+        trials (hyperopt.Trials): The search history.
+        domain (hyperopt.base.Domain): The search domain.
+        vals (dict): The trial's hyperopt values, each a list of zero or one values.
+        loss (float, optional): The trial's loss. Default is None, for a running trial.
+        tid (int, optional): The trial id TPE suggested it under. A new id is used by default.
+
+    Returns:
+        dict: The trial's document in trials.
+    """
+    if tid is None:
+        tid = trials.new_trial_ids(1)[0]
+    misc = {
+        "tid": tid,
+        "cmd": domain.cmd,
+        "workdir": domain.workdir,
+        "idxs": {label: [tid] if value else [] for label, value in vals.items()},
+        "vals": vals,
+    }
+    if loss is None:
+        result, state = {"status": STATUS_RUNNING}, JOB_STATE_RUNNING
+    else:
+        result, state = {"loss": loss, "status": STATUS_OK}, JOB_STATE_DONE
+    doc = trials.new_trial_docs([tid], [None], [result], [misc])[0]
+    doc["state"] = state
+    trials.insert_trial_docs([doc])
+    trials.refresh()
+    return doc
+
+
+def _complete_trial(trials, doc, loss):
+    """
+    Replace a running trial's constant-liar loss with its real one.
+
+    Args:
+        trials (hyperopt.Trials): The search history.
+        doc (dict): The running trial's document from _add_trial.
+        loss (float): The trial's loss.
+    """
+    doc["result"] = {"loss": loss, "status": STATUS_OK}
+    doc["state"] = JOB_STATE_DONE
+    trials.refresh()
+
+
+def tune_parameters(
+    X,
+    y,
+    config,
+    max_evals=50,
+    n_jobs=1,
+    threads_per_worker=None,
+    repeat_cv=3,
+    seed=0,
+    dmatrix_path=None,
+):
+    """
+    Search the XGBoost parameters with hyperopt's TPE, evaluating trials in parallel.
+
+    TPE suggests one trial at a time, and a new trial is suggested whenever a worker
+    is free. Trials still being evaluated are in the history as running, so the
+    suggestions made meanwhile move away from them rather than repeating them.
+    Every trial is cross-validated like train_and_evaluate_models and stored in
+    tuning_trials under the training data fingerprint, the search's key and its
+    parameter hash. Stored trials of the same search on the same data seed the
+    search, so an interrupted search resumes where it stopped, and parameters
+    that were already evaluated are never cross-validated again.
+
+    Args:
+        X (numpy.ndarray): Features for training.
+        y (numpy.ndarray): Target variable for training.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        max_evals (int, optional): Total trials, including stored ones. Default is 50.
+        n_jobs (int, optional): Number of trials evaluated at a time, each in its own
+            worker process. Default is 1.
+        threads_per_worker (int, optional): XGBoost nthread for each worker process. Default
+            is None, which leaves nthread unset.
+        repeat_cv (int, optional): Number of times to repeat cross-validation. Default is 3.
+        seed (int, optional): Seed for TPE. Default is 0.
+        dmatrix_path (str, optional): A binary from cache_training_dmatrix for the workers
+            to load instead of receiving X.
+
+    Returns:
+        dict: The best trial's params, vals, iteration_counts, val_mae and loss.
+
+    Raises:
+        ValueError: If no trials are stored or evaluated, i.e. max_evals is not positive.
+    """
+    create_tuning_trials_table(config)
+    fingerprint = data_fingerprint(X, y)
+    search_hash = search_key(repeat_cv)
+    stored = load_trials(config, fingerprint, search_hash)
+
+    domain = Domain(lambda param: None, SEARCH_SPACE)
+    trials = Trials()
+    for trial in stored.values():
+        if set(trial["vals"]) == set(domain.params):
+            _add_trial(trials, domain, trial["vals"], trial["loss"])
+    print(f"Resuming from {len(trials)} stored trials")
+
+    # Draw from a fresh stream on resume so TPE does not replay the stored trials
+    rstate = np.random.default_rng([seed, len(trials)])
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=train_model._init_cv_worker,
+        initargs=train_model._worker_initargs(X, y, dmatrix_path),
+    ) as executor:
+        # Cross-validations in progress: param hash -> (future, param, vals, running docs)
+        running = {}
+        while len(trials) < max_evals or running:
+            # Keep every worker busy, asking TPE for one trial at a time
+            while len(running) < n_jobs and len(trials) < max_evals:
+                tid = trials.new_trial_ids(1)[0]
+                doc = tpe.suggest([tid], domain, trials, rstate.integers(2**31 - 1))[0]
+                vals = {
+                    label: [float(v) for v in value]
+                    for label, value in doc["misc"]["vals"].items()
+                }
+                param = dict(
+                    BASE_PARAM,
+                    **space_eval(SEARCH_SPACE, {k: v[0] for k, v in vals.items() if v}),
+                )
+                key = param_hash(param)
+
+                # Only cross-validate parameters that have not been evaluated on this data
+                if key in stored:
+                    _add_trial(trials, domain, vals, stored[key]["loss"], tid=tid)
+                    continue
+
+                running_doc = _add_trial(trials, domain, vals, tid=tid)
+                if key not in running:
+                    worker_param = dict(param)
+                    if threads_per_worker is not None:
+                        worker_param["nthread"] = threads_per_worker
+                    future = executor.submit(
+                        _evaluate_param_in_worker, worker_param, repeat_cv
+                    )
+                    running[key] = (future, param, vals, [])
+                running[key][3].append(running_doc)
+
+            wait(
+                [future for future, _, _, _ in running.values()],
+                return_when=FIRST_COMPLETED,
+            )
+            for key, (future, param, vals, docs) in list(running.items()):
+                if not future.done():
+                    continue
+                del running[key]
+
+                iteration_counts, val_mae = future.result()
+                trial = {
+                    "params": param,
+                    "vals": vals,
+                    "iteration_counts": [int(i) for i in iteration_counts],
+                    "val_mae": [float(m) for m in val_mae],
+                    "loss": float(np.mean(val_mae)),
+                }
+                save_trial(config, fingerprint, search_hash, trial)
+                stored[key] = trial
+                for doc in docs:
+                    _complete_trial(trials, doc, trial["loss"])
+
+            losses = [loss for loss in trials.losses() if loss is not None]
+            print(f"Trial {len(losses)}/{max_evals}: best loss {min(losses):.4f}")
+
+    if not stored:
+        raise ValueError(
+            f"No trials to choose from; max_evals is {max_evals} and none are stored"
+        )
+    return min(stored.values(), key=lambda trial: trial["loss"])
+
+
+if __name__ == "__main__":
+    # Load up args, configs, environment vars
+    args = parse_arguments()
+    load_dotenv()
+    config = load_config()
+
+    # Load training data
+    training_data = load_training_data(config)
+    X, y = preprocess_data(training_data)
+    del training_data
+    dmatrix_path = cache_training_dmatrix(X, y)
+
+    best_trial = tune_parameters(
+        X,
+        y,
+        config,
+        max_evals=args.max_evals,
+        n_jobs=args.n_jobs,
+        threads_per_worker=args.threads_per_worker,
+        repeat_cv=args.repeat_cv,
+        seed=args.seed,
+        dmatrix_path=dmatrix_path,
+    )
+    print("Best parameters:", best_trial["params"])
+    print("Validation MAE:", best_trial["val_mae"])
+
+    if args.train:
+        # Train the final models with the best trial's parameters
+        run_training(
+            X,
+            y,
+            best_trial["params"],
+            best_trial["iteration_counts"],
+            best_trial["val_mae"],
+            config,
+            n_jobs=args.n_jobs,
+            threads_per_worker=args.threads_per_worker,
+            dmatrix_path=dmatrix_path,
+        )
@@ -0,0 +1,433 @@
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import load_dotenv
+import hashlib
+import json
+import os
+import time
+
+from .utils import (
+    execute_sql_query,
+    get_pool_max_connections,
+    load_config,
+    metrics_enabled,
+    stage_metrics,
+    table_hash,
+)
+
+STATE_PATH = "data/cache/pipeline_state.json"
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Run the pipeline stages whose inputs or code changed"
+    )
+    parser.add_argument(
+        "stages",
+        nargs="*",
+        help="Stages to bring up to date, with the stages they depend on. Default is every stage",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run the stages even if their inputs and code are unchanged",
+    )
+    parser.add_argument(
+        "--n-workers", type=int, default=2, help="Independent stages run at a time"
+    )
+    parser.add_argument("--list", action="store_true", help="List the stages and exit")
+    return parser.parse_args()
+
+
+def _build_features(config):
+    """
+    Import build_features for a stage, handing it the database configuration.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+
+    Returns:
+        module: src.features.build_features.
+    """
+    from .features import build_features
+
+    # build_features reads the configuration from a module global
+    build_features.config = config
+    return build_features
+
+
+def drop_outputs(table_names, config):
+    """
+    Drop a stage's output tables and anything built on them before the stage rebuilds them.
+
+    Args:
+        table_names (list): The tables to drop.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+    """
+    execute_sql_query(
+        **config,
+        query=f"DROP TABLE IF EXISTS {', '.join(table_names)} CASCADE;",
+    )
+
+
+def _run_sdv_kagglestyle(config):
+    drop_outputs(["boxscores_sdv_kagglestyle"], config)
+    _build_features(config).transform_sdv_to_kaggle()
+
+
+def _run_kaggle_recipricol(config):
+    drop_outputs(["boxscores_kaggle_recipricol"], config)
+    _build_features(config).transform_boxscore_to_recipricol(
+        "boxscores_kaggle", "boxscores_kaggle_recipricol"
+    )
+
+
+def _run_sdv_recipricol(config):
+    drop_outputs(["boxscores_sdv_kagglestyle_recipricol"], config)
+    _build_features(config).transform_boxscore_to_recipricol(
+        "boxscores_sdv_kagglestyle", "boxscores_sdv_kagglestyle_recipricol"
+    )
+
+
+def _run_training_data(recipricol_boxscore_table_name, training_data_tablename):
+    def run(config):
+        drop_outputs([training_data_tablename], config)
+        build_features = _build_features(config)
+        build_features.create_training_data_table_windowed(
+            recipricol_boxscore_table_name, training_data_tablename
+        )
+        build_features.add_rolling_features(
+            recipricol_boxscore_table_name, training_data_tablename
+        )
+
+    return run
+
+
+def _run_team_feature_snapshot(config):
+    _build_features(config).refresh_team_feature_snapshot(
+        "training_data_sdv", "team_features_sdv"
+    )
+
+
+def _run_train(config):
+    from .models.train_model import train_models
+
+    train_models(config)
+
+
+# Each stage's input and output tables, the code its results depend on and the
+# function that (re)builds its outputs. Stages that produce a stage's inputs run
+# before it; stages that do not depend on each other, like the Kaggle and SDV
+# branches, run at the same time on their own pooled connections.
+STAGES = {
+    "sdv_kagglestyle": {
+        "inputs": ["boxscores_sdv"],
+        "outputs": ["boxscores_sdv_kagglestyle"],
+        "code": [
+            "src/features/sdv_to_kaggle_query.sql",
+            "src/features/build_features.py",
+        ],
+        "run": _run_sdv_kagglestyle,
+    },
+    "kaggle_recipricol": {
+        "inputs": ["boxscores_kaggle"],
+        "outputs": ["boxscores_kaggle_recipricol"],
+        "code": [
+            "src/features/swap_boxscores.sql",
+            "src/features/build_features.py",
+        ],
+        "run": _run_kaggle_recipricol,
+    },
+    "sdv_recipricol": {
+        "inputs": ["boxscores_sdv_kagglestyle"],
+        "outputs": ["boxscores_sdv_kagglestyle_recipricol"],
+        "code": [
+            "src/features/swap_boxscores.sql",
+            "src/features/build_features.py",
+        ],
+        "run": _run_sdv_recipricol,
+    },
+    "kaggle_training_data": {
+        "inputs": ["boxscores_kaggle_recipricol"],
+        "outputs": ["training_data_kaggle"],
+        "code": [
+            "src/features/create_training_data_window.sql",
+            "src/features/team_boxscore_hashes.sql",
+            "src/features/feature_engine.py",
+            "src/features/build_features.py",
+        ],
+        "run": _run_training_data(
+            "boxscores_kaggle_recipricol", "training_data_kaggle"
+        ),
+    },
+    "sdv_training_data": {
+        "inputs": ["boxscores_sdv_kagglestyle_recipricol"],
+        "outputs": ["training_data_sdv"],
+        "code": [
+            "src/features/create_training_data_window.sql",
+            "src/features/team_boxscore_hashes.sql",
+            "src/features/feature_engine.py",
+            "src/features/build_features.py",
+        ],
+        "run": _run_training_data(
+            "boxscores_sdv_kagglestyle_recipricol", "training_data_sdv"
+        ),
+    },
+    "team_feature_snapshot": {
+        "inputs": ["training_data_sdv"],
+        "outputs": ["team_features_sdv"],
+        "code": [
+            "src/features/create_team_feature_snapshot.sql",
+            "src/features/feature_engine.py",
+            "src/features/build_features.py",
+        ],
+        "run": _run_team_feature_snapshot,
+    },
+    "train": {
+        "inputs": ["training_data_kaggle"],
+        "outputs": [],
+        "code": [
+            "src/models/train_model.py",
+            "src/models/calibration.py",
+            "src/data/table_cache.py",
+        ],
+        "run": _run_train,
+    },
+}
+
+
+def file_hash(path):
+    """
+    Hash the contents of a file.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        str: The file's sha256 hex digest.
+    """
+    with open(path, "rb") as fd:
+        return hashlib.sha256(fd.read()).hexdigest()
+
+
+def stage_fingerprint(stage, config, input_hashes=None):
+    """
+    Hash everything a stage's outputs depend on: its input tables and its code.
+
+    Args:
+        stage (dict): A stage from STAGES.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        input_hashes (dict, optional): table_hash of each input table, if already known.
+
+    Returns:
+        str: A hex digest that only changes when an input table or code file changes.
+    """
+    if input_hashes is None:
+        input_hashes = {table: table_hash(table, config) for table in stage["inputs"]}
+    fingerprint = {
+        "inputs": input_hashes,
+        "code": {path: file_hash(path) for path in stage["code"]},
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+
+def missing_tables(table_names, config):
+    """
+    Find the tables that do not exist.
+
+    Args:
+        table_names (list): The tables to look for.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+
+    Returns:
+        list: The tables that were not found.
+    """
+    missing = []
+    for table_name in table_names:
+        results = execute_sql_query(
+            **config, query=f"SELECT to_regclass('{table_name}') IS NOT NULL;"
+        )
+        if not (results and results[0][0]):
+            missing.append(table_name)
+    return missing
+
+
+def stage_dependencies(stages):
+    """
+    Find the stages each stage depends on from their input and output tables.
+
+    Args:
+        stages (dict): Stages like STAGES.
+
+    Returns:
+        dict: The names of the stages producing each stage's inputs, by stage name.
+    """
+    producers = {
+        table: name for name, stage in stages.items() for table in stage["outputs"]
+    }
+    return {
+        name: {producers[table] for table in stage["inputs"] if table in producers}
+        for name, stage in stages.items()
+    }
+
+
+def load_state(state_path=STATE_PATH):
+    """
+    Load the fingerprint each stage last completed with.
+
+    Args:
+        state_path (str, optional): The state file. Default is data/cache/pipeline_state.json.
+
+    Returns:
+        dict: Fingerprints by stage name.
+    """
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, "r") as fd:
+        return json.load(fd)
+
+
+def save_state(state, state_path=STATE_PATH):
+    """
+    Save the fingerprint each stage last completed with.
+
+    Args:
+        state (dict): Fingerprints by stage name.
+        state_path (str, optional): The state file. Default is data/cache/pipeline_state.json.
+    """
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    with open(state_path + ".tmp", "w") as fd:
+        json.dump(state, fd, indent=2, sort_keys=True)
+    os.replace(state_path + ".tmp", state_path)
+
+
+def run_stage(name, stage, config, last_fingerprint=None, force=False):
+    """
+    Run a stage unless its inputs, code and outputs are unchanged since it last completed.
+
+    Args:
+        name (str): The stage's name.
+        stage (dict): A stage from STAGES.
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        last_fingerprint (str, optional): The fingerprint the stage last completed with.
+        force (bool, optional): If True, run the stage even if it is up to date.
+
+    Returns:
+        str: The fingerprint the stage is now up to date with.
+    """
+    with stage_metrics(name) as counts:
+        input_hashes = {table: table_hash(table, config) for table in stage["inputs"]}
+        counts["rows_in"] = sum(h[0] for h in input_hashes.values() if h)
+
+        fingerprint = stage_fingerprint(stage, config, input_hashes)
+        if (
+            not force
+            and fingerprint == last_fingerprint
+            and not missing_tables(stage["outputs"], config)
+        ):
+            print(f"Skipping {name}: inputs and code are unchanged")
+            return fingerprint
+
+        print(f"Running {name}")
+        start = time.time()
+        stage["run"](config)
+
+        # SQL errors are printed rather than raised, so check the outputs were built
+        missing = missing_tables(stage["outputs"], config)
+        if missing:
+            raise RuntimeError(f"Stage {name} did not create {', '.join(missing)}")
+
+        if metrics_enabled():
+            output_hashes = [table_hash(table, config) for table in stage["outputs"]]
+            counts["rows_out"] = sum(h[0] for h in output_hashes if h)
+
+        print(f"Finished {name} in {time.time() - start:.1f}s")
+        return fingerprint
+
+
+def run_pipeline(
+    config, targets=None, stages=STAGES, force=False, n_workers=2, state_path=STATE_PATH
+):
+    """
+    Bring stages up to date, running independent stages at the same time.
+
+    A stage starts as soon as every stage producing its inputs has finished. It is
+    skipped when its fingerprint (see stage_fingerprint) matches the one it last
+    completed with and its outputs exist. Each finished stage's fingerprint is
+    saved straight away, so an interrupted run resumes from the stages that did
+    not finish.
+
+    Args:
+        config (dict): A dictionary containing the PostgreSQL database configuration parameters.
+        targets (list, optional): Stages to bring up to date, along with the stages they
+            depend on. Default is every stage.
+        stages (dict, optional): The stages. Default is STAGES.
+        force (bool, optional): If True, run every selected stage. Default is False.
+        n_workers (int, optional): Stages run at a time, at most the connection pool's
+            size. Default is 2.
+        state_path (str, optional): The state file. Default is data/cache/pipeline_state.json.
+    """
+    dependencies = stage_dependencies(stages)
+
+    # Select the targets and everything upstream of them
+    selected = set()
+    to_visit = list(targets or stages)
+    while to_visit:
+        name = to_visit.pop()
+        if name not in stages:
+            raise ValueError(f"Unknown stage {name}")
+        if name not in selected:
+            selected.add(name)
+            to_visit.extend(dependencies[name])
+
+    state = load_state(state_path)
+    done = set()
+    running = {}
+    with ThreadPoolExecutor(
+        max_workers=min(n_workers, get_pool_max_connections())
+    ) as executor:
+        while len(done) < len(selected):
+            # Start every stage whose upstream stages have finished
+            for name in stages:
+                if (
+                    name in selected
+                    and name not in done
+                    and name not in running.values()
+                    and dependencies[name] <= done
+                ):
+                    future = executor.submit(
+                        run_stage, name, stages[name], config, state.get(name), force
+                    )
+                    running[future] = name
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                state[name] = future.result()
+                save_state(state, state_path)
+                done.add(name)
+
+
+if __name__ == "__main__":
+    # Load up args, configs, environment vars
+    args = parse_arguments()
+
+    if args.list:
+        dependencies = stage_dependencies(STAGES)
+        for name, stage in STAGES.items():
+            after = ", ".join(sorted(dependencies[name])) or "-"
+            print(
+                f"{name}: after {after}; outputs {', '.join(stage['outputs']) or '-'}"
+            )
+    else:
+        load_dotenv()
+        config = load_config()
+        run_pipeline(
+            config, targets=args.stages, force=args.force, n_workers=args.n_workers
+        )
@@ -1,13 +1,52 @@
+import atexit
 from configparser import ConfigParser
+from contextlib import contextmanager
+import hashlib
+import io
+import json
+import os
 import pandas as pd
 import psycopg2
-import re
+from psycopg2.pool import ThreadedConnectionPool
+import resource
+import threading
+import time
+import uuid
+
+# Largest number of connections each pool keeps open to the database, unless
+# database.ini sets pool_max_connections
+POOL_MAX_CONNECTIONS = 8
+_pool_max_connections = POOL_MAX_CONNECTIONS
+
+_pools = {}
+_pool_lock = threading.RLock()
+_pool_stats = {
+    "connections_opened": 0,
+    "queries_run": 0,
+    "connection_wait_seconds": 0.0,
+}
+
+# Metrics are written to this directory when the environment variable is set, and
+# statements slower than LIDDAR_EXPLAIN_SECONDS are captured with EXPLAIN ANALYZE
+METRICS_DIR_VARIABLE = "LIDDAR_METRICS_DIR"
+EXPLAIN_SECONDS_VARIABLE = "LIDDAR_EXPLAIN_SECONDS"
+
+# Statements EXPLAIN ANALYZE can re-run inside a savepoint and roll back
+EXPLAINABLE_STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_run_id = os.environ.get("LIDDAR_RUN_ID") or uuid.uuid4().hex[:12]
+_metrics_lock = threading.Lock()
+_metric_totals = {}
+_current_stage = threading.local()
 
 
 def load_config(filename="database.ini", section="postgresql"):
     """
     Load database configuration from an INI file.
 
+    An optional pool_max_connections key sets the size of the connection pools
+    instead of being returned with the connection parameters.
+
     Args:
         filename (str): The path to the INI file containing the database configuration.
         section (str): The name of the section in the INI file containing the database configuration.
@@ -30,9 +69,368 @@ def load_config(filename="database.ini", section="postgresql"):
             "Section {0} not found in the {1} file".format(section, filename)
         )
 
+    if "pool_max_connections" in config:
+        set_pool_max_connections(int(config.pop("pool_max_connections")))
+
     return config
 
 
+def set_pool_max_connections(max_connections):
+    """
+    Set the largest number of connections each pool keeps open.
+
+    Only pools created afterwards use the new size.
+
+    Args:
+        max_connections (int): The number of connections.
+    """
+    global _pool_max_connections
+    if max_connections < 1:
+        raise ValueError("pool_max_connections must be at least 1")
+    _pool_max_connections = max_connections
+
+
+def get_pool_max_connections():
+    """
+    Get the largest number of connections each pool keeps open.
+
+    Returns:
+        int: pool_max_connections from database.ini, or POOL_MAX_CONNECTIONS.
+    """
+    return _pool_max_connections
+
+
+class CountingConnectionPool(ThreadedConnectionPool):
+    """
+    A thread-safe psycopg2 connection pool that counts the connections it opens.
+
+    Unlike ThreadedConnectionPool, getconn waits for a connection to be returned
+    when all maxconn connections are in use instead of raising PoolError.
+    """
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self._available = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def _connect(self, key=None):
+        _record_pool_stat("connections_opened", 1)
+        return super()._connect(key)
+
+    def getconn(self, key=None):
+        self._available.acquire()
+        try:
+            return super().getconn(key)
+        except BaseException:
+            self._available.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._available.release()
+
+
+def _record_pool_stat(name, value):
+    """
+    Add to one of the connection pool counters.
+
+    Args:
+        name (str): The name of the counter.
+        value (int or float): The amount to add.
+    """
+    with _pool_lock:
+        _pool_stats[name] += value
+
+
+def get_connection_pool(database_config):
+    """
+    Get the connection pool for a database configuration, creating it on first use.
+
+    Args:
+        database_config (dict): A dictionary containing the database configuration parameters.
+
+    Returns:
+        CountingConnectionPool: The shared pool for that configuration.
+    """
+    key = tuple(sorted(database_config.items()))
+    with _pool_lock:
+        if key not in _pools:
+            _pools[key] = CountingConnectionPool(
+                1, _pool_max_connections, **database_config
+            )
+        return _pools[key]
+
+
+@contextmanager
+def pooled_connection(database_config):
+    """
+    Borrow a connection from the shared pool for the length of one transaction.
+
+    The transaction is committed when the block exits normally and rolled back if
+    it raises, and the connection is then returned to the pool.
+
+    Args:
+        database_config (dict): A dictionary containing the database configuration parameters.
+
+    Yields:
+        psycopg2.extensions.connection: An open database connection.
+    """
+    pool = get_connection_pool(database_config)
+
+    start = time.perf_counter()
+    conn = pool.getconn()
+    _record_pool_stat("connection_wait_seconds", time.perf_counter() - start)
+
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+
+def get_pool_stats():
+    """
+    Get the connection pool counters.
+
+    Returns:
+        dict: The number of connections opened, queries run and seconds spent
+            waiting for a pooled connection.
+    """
+    with _pool_lock:
+        return dict(_pool_stats)
+
+
+def close_connection_pools():
+    """
+    Close every pooled connection.
+    """
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
+def get_run_id():
+    """
+    Get the id of this run, which keys its metrics, training_runs rows and predictions.
+
+    Returns:
+        str: LIDDAR_RUN_ID if it is set, otherwise an id generated for this process.
+    """
+    return _run_id
+
+
+def metrics_enabled():
+    """
+    Check whether metrics are being written.
+
+    Returns:
+        bool: True if LIDDAR_METRICS_DIR is set.
+    """
+    return bool(os.environ.get(METRICS_DIR_VARIABLE))
+
+
+def peak_rss_bytes():
+    """
+    Get the peak resident set size of this process and its finished worker processes.
+
+    Returns:
+        int: The larger of the two peaks, in bytes.
+    """
+    self_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(self_peak, children_peak) * 1024
+
+
+def query_label(query):
+    """
+    Give a query a short stable label for grouping its metrics across runs.
+
+    Args:
+        query (str): The SQL query.
+
+    Returns:
+        str: The first word of the query and a hash of its whitespace-normalized text.
+    """
+    normalized = " ".join(query.split())
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:10]
+    return f"{normalized.split(' ', 1)[0].lower()}_{digest}"
+
+
+def record_metric(
+    kind,
+    name,
+    wall_seconds,
+    rows_in=0,
+    rows_out=0,
+    bytes_in=0,
+    bytes_out=0,
+    **details,
+):
+    """
+    Record one timed operation in the run log and the run's Prometheus totals.
+
+    Nothing is recorded unless LIDDAR_METRICS_DIR is set. Each operation is appended
+    to <dir>/metrics.jsonl straight away; the totals are written to <dir>/liddar.prom
+    when the process exits.
+
+    Args:
+        kind (str): The kind of operation, e.g. execute_sql_query or stage.
+        name (str): The operation's name, e.g. a query_label or stage name.
+        wall_seconds (float): The operation's wall time.
+        rows_in (int, optional): Rows sent to the database.
+        rows_out (int, optional): Rows returned or affected by the database.
+        bytes_in (int, optional): Bytes sent to the database.
+        bytes_out (int, optional): Bytes received from the database.
+        **details: Other fields for the run log, e.g. the query text or its plan.
+    """
+    metrics_dir = os.environ.get(METRICS_DIR_VARIABLE)
+    if not metrics_dir:
+        return
+
+    record = {
+        "run_id": _run_id,
+        "timestamp": time.time(),
+        "stage": getattr(_current_stage, "name", None),
+        "kind": kind,
+        "name": name,
+        "wall_seconds": wall_seconds,
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "peak_rss_bytes": peak_rss_bytes(),
+        **details,
+    }
+
+    with _metrics_lock:
+        if not _metric_totals:
+            os.makedirs(metrics_dir, exist_ok=True)
+            atexit.register(write_prometheus_metrics)
+        with open(os.path.join(metrics_dir, "metrics.jsonl"), "a") as fd:
+            fd.write(json.dumps(record, default=str) + "\n")
+
+        totals = _metric_totals.setdefault(
+            (kind, name),
+            {
+                "calls": 0,
+                "seconds": 0.0,
+                "rows_in": 0,
+                "rows_out": 0,
+                "bytes_in": 0,
+                "bytes_out": 0,
+            },
+        )
+        totals["calls"] += 1
+        totals["seconds"] += wall_seconds
+        for field in ["rows_in", "rows_out", "bytes_in", "bytes_out"]:
+            totals[field] += record[field] or 0
+
+
+def write_prometheus_metrics(metrics_dir=None):
+    """
+    Write the run's metric totals in the Prometheus textfile collector format.
+
+    Args:
+        metrics_dir (str, optional): The directory to write liddar.prom to. Default is
+            LIDDAR_METRICS_DIR.
+    """
+    metrics_dir = metrics_dir or os.environ.get(METRICS_DIR_VARIABLE)
+    if not metrics_dir:
+        return
+
+    lines = []
+    with _metrics_lock:
+        for field, help_text in [
+            ("calls", "Operations run"),
+            ("seconds", "Wall time of the operations in seconds"),
+            ("rows_in", "Rows sent to the database"),
+            ("rows_out", "Rows returned or affected by the database"),
+            ("bytes_in", "Bytes sent to the database"),
+            ("bytes_out", "Bytes received from the database"),
+        ]:
+            metric = f"liddar_operation_{field}_total"
+            lines.append(f"# HELP {metric} {help_text}.")
+            lines.append(f"# TYPE {metric} counter")
+            for (kind, name), totals in sorted(_metric_totals.items()):
+                labels = f'run_id="{_run_id}",kind="{kind}",name="{name}"'
+                lines.append(f"{metric}{{{labels}}} {totals[field]}")
+
+    lines.append("# HELP liddar_peak_rss_bytes Peak resident set size of the run.")
+    lines.append("# TYPE liddar_peak_rss_bytes gauge")
+    lines.append(f'liddar_peak_rss_bytes{{run_id="{_run_id}"}} {peak_rss_bytes()}')
+
+    # Replace the file in one step so the collector never reads a partial file
+    path = os.path.join(metrics_dir, "liddar.prom")
+    with open(path + ".tmp", "w") as fd:
+        fd.write("\n".join(lines) + "\n")
+    os.replace(path + ".tmp", path)
+
+
+@contextmanager
+def stage_metrics(name):
+    """
+    Time a pipeline stage and attribute the queries it runs on this thread to it.
+
+    Args:
+        name (str): The stage's name.
+
+    Yields:
+        dict: Set rows_in and rows_out in it to record the stage's row counts.
+    """
+    counts = {"rows_in": 0, "rows_out": 0}
+    previous = getattr(_current_stage, "name", None)
+    _current_stage.name = name
+    start = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        _current_stage.name = previous
+        record_metric("stage", name, time.perf_counter() - start, **counts)
+
+
+def _explain_slow_statement(cur, query, wall_seconds, params=None):
+    """
+    Capture the plan of a slow statement with EXPLAIN (ANALYZE, BUFFERS).
+
+    The statement is run again inside a savepoint that is then rolled back, so it
+    sees the same transaction (e.g. its temporary tables) and changes nothing.
+    Only single SELECT, WITH, INSERT, UPDATE and DELETE statements are explained,
+    and only when LIDDAR_EXPLAIN_SECONDS is set and the statement took longer.
+
+    Args:
+        cur (psycopg2.extensions.cursor): The cursor the statement ran on.
+        query (str): The statement.
+        wall_seconds (float): How long the statement took.
+        params (tuple or dict, optional): The values bound to the statement's placeholders.
+
+    Returns:
+        list or None: The JSON plan, or None if the statement was not explained.
+    """
+    threshold = os.environ.get(EXPLAIN_SECONDS_VARIABLE)
+    statement = query.strip().rstrip(";").strip()
+    if (
+        not threshold
+        or wall_seconds < float(threshold)
+        or ";" in statement
+        or not statement.upper().startswith(EXPLAINABLE_STATEMENTS)
+    ):
+        return None
+
+    cur.execute("SAVEPOINT liddar_explain")
+    try:
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", params)
+        return cur.fetchone()[0]
+    except psycopg2.Error as error:
+        return [{"error": str(error)}]
+    finally:
+        cur.execute("ROLLBACK TO SAVEPOINT liddar_explain")
+
+
 def create_table(database, user, password, host, port, table_name, table_definition):
     """
     Creates a table in the specified PostgreSQL database.
@@ -47,31 +445,21 @@ def create_table(database, user, password, host, port, table_name, table_definit
         table_definition (str): The SQL CREATE TABLE statement defining the table's columns.
     """
 
-    try:
-        # Connect to the database
-        conn = psycopg2.connect(
-            database=database, user=user, password=password, host=host, port=port
-        )
-
-        # Create a cursor object
-        cur = conn.cursor()
-
-        # Execute the CREATE TABLE statement
-        cur.execute(table_definition)
+    database_config = dict(
+        database=database, user=user, password=password, host=host, port=port
+    )
 
-        # Commit the changes
-        conn.commit()
+    try:
+        # Borrow a pooled connection, committed when the block exits
+        with pooled_connection(database_config) as conn:
+            with conn.cursor() as cur:
+                # Execute the CREATE TABLE statement
+                cur.execute(table_definition)
+                _record_pool_stat("queries_run", 1)
 
     except (Exception, psycopg2.Error) as error:
         print("Error while creating PostgreSQL table", error)
 
-    finally:
-        # Close the database connection
-        if conn:
-            cur.close()
-            conn.close()
-            print("PostgreSQL connection is closed")
-
 
 def insert_dataframe(df, table_name, database_config):
     """
@@ -82,33 +470,130 @@ def insert_dataframe(df, table_name, database_config):
         table_name (str): The name of the table to insert the data into.
         database_config (dict): A dictionary containing the database configuration parameters.
     """
-    conn = None
+    start = time.perf_counter()
     try:
-        conn = psycopg2.connect(**database_config)
-        cur = conn.cursor()
+        with pooled_connection(database_config) as conn:
+            with conn.cursor() as cur:
+                # Create insert template
+                cols = ", ".join(df.columns)
+                placeholders = ", ".join(["%s"] * len(df.columns))
+                sql = f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})"
 
-        # Create insert template
-        cols = ", ".join(df.columns)
-        placeholders = ", ".join(["%s"] * len(df.columns))
-        sql = f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})"
+                # Insert each row
+                for _, row in df.iterrows():
+                    cur.execute(sql, tuple(row))
+                _record_pool_stat("queries_run", len(df))
+    except (Exception, psycopg2.Error) as error:
+        print(error)
 
-        # Insert each row
-        for _, row in df.iterrows():
-            cur.execute(sql, tuple(row))
+    record_metric(
+        "insert_dataframe",
+        table_name,
+        time.perf_counter() - start,
+        rows_in=len(df),
+    )
 
-        conn.commit()
+
+def copy_dataframe(df, table_name, database_config, chunk_size=50000, conn=None):
+    """
+    Bulk load a pandas DataFrame into a PostgreSQL table with COPY FROM STDIN.
+
+    The DataFrame is streamed to the server as CSV in chunks of chunk_size rows,
+    so only one chunk is ever held in the in-memory buffer. Missing values (None,
+    NaN, NaT and pd.NA) are written as NULL.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame to be loaded into the table.
+        table_name (str): The name of the table to load the data into.
+        database_config (dict): A dictionary containing the database configuration parameters.
+        chunk_size (int, optional): The number of rows sent per COPY buffer. Default is 50000.
+        conn (psycopg2.extensions.connection, optional): A connection from pooled_connection
+            to load on, e.g. to fill a temporary staging table in that connection's
+            transaction. By default the load borrows its own pooled connection.
+
+    Raises:
+        psycopg2.Error: If the load fails on conn. Errors on the load's own
+            connection are printed instead.
+    """
+    df = _prepare_copy_dataframe(df)
+    bytes_sent = 0
+
+    def run_copy(conn):
+        nonlocal bytes_sent
+        with conn.cursor() as cur:
+            cols = ", ".join(df.columns)
+            sql = f"COPY {table_name} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+
+            for start in range(0, len(df), chunk_size):
+                buffer = io.StringIO()
+                df.iloc[start : start + chunk_size].to_csv(
+                    buffer, index=False, header=False, na_rep="\\N"
+                )
+                bytes_sent += buffer.tell()
+                buffer.seek(0)
+                cur.copy_expert(sql, buffer)
+                _record_pool_stat("queries_run", 1)
+
+    start = time.perf_counter()
+    own_connection = conn is None
+    try:
+        if not own_connection:
+            run_copy(conn)
+        else:
+            with pooled_connection(database_config) as conn:
+                run_copy(conn)
     except (Exception, psycopg2.Error) as error:
+        # The error aborted the caller's transaction, which has to roll back
+        if not own_connection:
+            raise
         print(error)
-    finally:
-        if conn is not None:
-            cur.close()
-            conn.close()
+
+    record_metric(
+        "copy_dataframe",
+        table_name,
+        time.perf_counter() - start,
+        rows_in=len(df),
+        bytes_in=bytes_sent,
+    )
+
+
+def _prepare_copy_dataframe(df):
+    """
+    Coerce float columns that only hold whole numbers to nullable integers.
+
+    Columns with missing values come out of pandas as floats (e.g. 3.0), which
+    INTEGER columns accept through INSERT but reject as COPY input text.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame to be loaded.
+
+    Returns:
+        pandas.DataFrame: A DataFrame that can be written as COPY input.
+    """
+    df = df.copy()
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_float_dtype(values):
+            non_null = values.dropna()
+            if len(non_null) and (non_null == non_null.round()).all():
+                df[col] = values.astype("Int64")
+    return df
 
 
-def execute_sql_query(database, user, password, host, port, query, return_pandas=False):
+def execute_sql_query(
+    database,
+    user,
+    password,
+    host,
+    port,
+    query,
+    return_pandas=False,
+    conn=None,
+    params=None,
+):
     """
     Executes a SQL query and returns the results if there are any.
-    If the query modifies the database (e.g., CREATE TABLE, INSERT INTO, UPDATE, DELETE),
+    If the query modifies the database (e.g., CREATE TABLE, INSERT INTO, UPDATE, DELETE, DROP),
     it performs the query and returns an empty list.
 
     Args:
@@ -119,44 +604,242 @@ def execute_sql_query(database, user, password, host, port, query, return_pandas
         port (str): The database port.
         query (str): The SQL query to execute.
         return_pandas (bool): If True, the results are returned in a pandas dataframe.
+        conn (psycopg2.extensions.connection, optional): A connection from pooled_connection
+            to run the query on. The query then joins that connection's transaction and is
+            committed when the pooled_connection block exits. By default the query borrows
+            its own pooled connection and is committed straight away.
+        params (tuple or dict, optional): Values bound to %s or %(name)s placeholders in
+            the query by psycopg2. When given, a literal % in the query must be written %%.
 
     Returns:
         list: A list of tuples, where each tuple represents a row of results.
               An empty list is returned if the query modifies the database or if an error occurs.
+
+    Raises:
+        psycopg2.Error: If the query fails on conn. Errors on the query's own
+            connection are printed and an empty list is returned instead.
     """
-    modify_database_regex = re.compile(r"^(CREATE|INSERT|UPDATE|DELETE)", re.IGNORECASE)
+    database_config = dict(
+        database=database, user=user, password=password, host=host, port=port
+    )
+
+    def run_query(conn):
+        with conn.cursor() as cur:
+            # Execute the SQL query
+            start = time.perf_counter()
+            cur.execute(query, params)
+            _record_pool_stat("queries_run", 1)
+
+            # Queries that modify the database return no rows
+            description = cur.description
+            results = [] if description is None else cur.fetchall()
+            wall_seconds = time.perf_counter() - start
+            rowcount = cur.rowcount
+
+            if metrics_enabled():
+                record_metric(
+                    "execute_sql_query",
+                    query_label(query),
+                    wall_seconds,
+                    rows_out=max(rowcount, 0),
+                    bytes_in=len(query.encode()),
+                    # Estimated from the rows' text, as psycopg2 does not report it
+                    bytes_out=sum(len(str(row)) for row in results),
+                    query=" ".join(query.split())[:500],
+                    plan=_explain_slow_statement(cur, query, wall_seconds, params),
+                )
+
+            if description is None:
+                return []
 
-    try:
-        # Connect to the database
-        conn = psycopg2.connect(
-            database=database, user=user, password=password, host=host, port=port
-        )
-        # Create a cursor object
-        cur = conn.cursor()
-        # Execute the SQL query
-        cur.execute(query)
-
-        # Check if the query modifies the database
-        if modify_database_regex.match(query):
-            # Commit the changes
-            conn.commit()
-            results = []
-        else:
             # Fetch the results
-            results = cur.fetchall()
             if return_pandas:
-                columns = [desc[0] for desc in cur.description]
+                columns = [desc[0] for desc in description]
                 results = pd.DataFrame(results, columns=columns)
+            return results
+
+    own_connection = conn is None
+    try:
+        if not own_connection:
+            results = run_query(conn)
+        else:
+            with pooled_connection(database_config) as conn:
+                results = run_query(conn)
 
     except (Exception, psycopg2.Error) as error:
+        # The error aborted the caller's transaction, which has to roll back
+        if not own_connection:
+            raise
         print("Error while executing SQL query:", error)
         results = []
 
-    finally:
-        # Close the database connection
-        if conn:
-            cur.close()
-            conn.close()
-            print("PostgreSQL connection is closed")
+    return results
+
+
+def table_hash(table_name, database_config):
+    """
+    Hash the contents of a table or materialized view, independent of row order.
+
+    Args:
+        table_name (str): The name of the table.
+        database_config (dict): A dictionary containing the database configuration parameters.
+
+    Returns:
+        list or None: The row count and the sum of the rows' hashes, or None if
+            the table does not exist.
+    """
+    results = execute_sql_query(
+        **database_config,
+        query=f"SELECT COUNT(*), SUM(hashtextextended(t::text, 0)) FROM {table_name} t;",
+    )
+    if not results:
+        return None
+    return [int(results[0][0]), str(results[0][1])]
+
+
+# PostgreSQL type OIDs that psycopg2 returns as Decimal
+NUMERIC_TYPE_CODES = {1700}
+
+
+def stream_sql_query(database_config, query, itersize=10000, as_numpy=False):
+    """
+    Stream the results of a SQL query in chunks through a server-side cursor.
+
+    Only one chunk of rows is held on the client at a time. NUMERIC columns, which
+    psycopg2 returns as Decimal, are converted to floats.
+
+    Args:
+        database_config (dict): A dictionary containing the database configuration parameters.
+        query (str): The SQL query to execute.
+        itersize (int, optional): The number of rows fetched per chunk. Default is 10000.
+        as_numpy (bool, optional): If True, chunks are yielded as NumPy arrays instead of
+            pandas DataFrames. Default is False.
+
+    Yields:
+        pandas.DataFrame or numpy.ndarray: The next chunk of rows.
+
+    Raises:
+        psycopg2.Error: If the query fails, including partway through the results, so
+            a caller never mistakes the chunks read so far for the whole result.
+    """
+    with pooled_connection(database_config) as conn:
+        with conn.cursor(name="stream_sql_query") as cur:
+            cur.itersize = itersize
+            cur.execute(query)
+            _record_pool_stat("queries_run", 1)
+
+            while True:
+                rows = cur.fetchmany(itersize)
+                if not rows:
+                    break
+
+                columns = [desc[0] for desc in cur.description]
+                chunk = pd.DataFrame(rows, columns=columns)
+                for desc in cur.description:
+                    if desc[1] in NUMERIC_TYPE_CODES:
+                        chunk[desc[0]] = chunk[desc[0]].astype("float64")
+
+                yield chunk.to_numpy() if as_numpy else chunk
+
+
+class _CountingWriter:
+    """
+    A file-like wrapper that counts the bytes written through it.
+
+    Args:
+        file (file object): The binary file to write to.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.file.write(data)
+
+
+def _read_copy_csv(conn, copy_query):
+    """
+    Parse the CSV output of a COPY TO STDOUT statement while it is being received.
+
+    The COPY runs in a thread that writes into an OS pipe, and pandas reads the
+    other end, so only the pipe's buffer of CSV text is held besides the DataFrame.
+
+    Args:
+        conn (psycopg2.extensions.connection): The connection to run the COPY on.
+        copy_query (str): The COPY ... TO STDOUT WITH CSV HEADER statement.
+
+    Returns:
+        tuple: The parsed pandas.DataFrame and the number of CSV bytes received.
+    """
+    read_fd, write_fd = os.pipe()
+    writer = _CountingWriter(os.fdopen(write_fd, "wb"))
+    copy_errors = []
+
+    def send():
+        try:
+            with writer.file, conn.cursor() as cur:
+                cur.copy_expert(copy_query, writer)
+        except BaseException as error:
+            copy_errors.append(error)
+
+    sender = threading.Thread(target=send, daemon=True)
+    sender.start()
+    try:
+        with os.fdopen(read_fd, "rb") as pipe:
+            results = pd.read_csv(pipe)
+    except Exception:
+        # Closing the pipe stops the COPY; a database error explains the failure best
+        sender.join()
+        database_errors = [e for e in copy_errors if not isinstance(e, OSError)]
+        if database_errors:
+            raise database_errors[0]
+        raise
+    sender.join()
+    if copy_errors:
+        raise copy_errors[0]
+
+    return results, writer.bytes_written
+
+
+def copy_sql_query(database_config, query):
+    """
+    Load the results of a SQL query into a pandas DataFrame with COPY TO STDOUT.
+
+    The rows are sent as CSV and parsed by pandas' vectorized CSV reader as they
+    arrive, which is usually much faster than building a DataFrame from fetchall()
+    tuples, and never holds the whole CSV text in memory.
+
+    Args:
+        database_config (dict): A dictionary containing the database configuration parameters.
+        query (str): The SELECT query to execute, without a trailing semicolon.
+
+    Returns:
+        pandas.DataFrame: The query results. An empty DataFrame is returned if an error occurs.
+    """
+    query = query.strip().rstrip(";")
+
+    start = time.perf_counter()
+    try:
+        with pooled_connection(database_config) as conn:
+            results, bytes_received = _read_copy_csv(
+                conn, f"COPY ({query}) TO STDOUT WITH CSV HEADER"
+            )
+            _record_pool_stat("queries_run", 1)
+
+    except (Exception, psycopg2.Error) as error:
+        print("Error while copying SQL query:", error)
+        results = pd.DataFrame()
+        bytes_received = 0
 
+    record_metric(
+        "copy_sql_query",
+        query_label(query),
+        time.perf_counter() - start,
+        rows_out=len(results),
+        bytes_in=len(query.encode()),
+        bytes_out=bytes_received,
+        query=" ".join(query.split())[:500],
+    )
     return results